@@ -0,0 +1,212 @@
+"""Fingerprinted, precompressed static assets and in-memory HTML pages.
+
+Every file under static/ is read once when the app starts. Assets (CSS, JS,
+images) get a content-hashed URL, e.g. /static/css/style.3f2a9c1b7e04.css,
+plus gzip and (when the optional `brotli` package is installed) brotli
+variants. They are served from memory with a year-long immutable
+Cache-Control.
+
+HTML pages are held in memory with their asset URLs rewritten to the
+fingerprinted ones. They are served with a strong ETag and `no-cache`, so
+browsers revalidate the page cheaply (304) but never re-download an
+unchanged asset.
+
+Unfingerprinted /static URLs still work, through StaticFiles.
+
+The fingerprinted names only exist in memory, so /static must be served by
+the app: on Vercel, vercel.json routes it to the Python function (which
+bundles static/) rather than to a static build.
+
+Configuration:
+    STATIC_AUTO_REBUILD  Rebuild when a file under static/ changes (local development)
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request, Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_AUTO_REBUILD = os.environ.get("STATIC_AUTO_REBUILD", "").lower() in ("1", "true", "yes")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# /static/... references inside quotes or url(...) in HTML
+_STATIC_REF_RE = re.compile(r"""(?<=["'(])/static/[^"'()?#\s]+""")
+
+
+class Asset:
+    """One file held in memory, with its precompressed variants."""
+
+    __slots__ = ("body", "media_type", "digest", "gzip", "br")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.gzip = None
+        self.br = None
+        if len(body) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE_TYPES):
+            self.gzip = _smaller(gzip.compress(body, compresslevel=9, mtime=0), body)
+            if brotli is not None:
+                self.br = _smaller(brotli.compress(body, quality=11), body)
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        """The best encoding the client accepts, or a 304 if its copy is current."""
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        if self.br is not None and "br" in accepted:
+            body, encoding = self.br, "br"
+        elif self.gzip is not None and "gzip" in accepted:
+            body, encoding = self.gzip, "gzip"
+        else:
+            body, encoding = self.body, None
+
+        # Strong ETags are per representation, so each encoding gets its own
+        etag = f'"{self.digest[:32]}{"-" + encoding if encoding else ""}"'
+        headers = {"Cache-Control": cache_control, "ETag": etag}
+        if self.gzip is not None or self.br is not None:
+            headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def _smaller(compressed: bytes, original: bytes) -> Optional[bytes]:
+    return compressed if len(compressed) < len(original) else None
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding.strip().lower())
+    if "*" in accepted:
+        accepted.update(("br", "gzip"))
+    return accepted
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _media_type(path: Path) -> str:
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+class AssetPipeline:
+    """Builds and holds the fingerprinted assets and rewritten pages for one static directory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+        self._assets = {}  # Fingerprinted path relative to /static -> Asset
+        self._pages = {}  # HTML file name relative to root -> Asset
+        self._mtime = None
+        self.build()
+
+    def build(self):
+        assets, pages = {}, {}
+        urls = {}  # Original /static URL -> fingerprinted URL
+        files = self._files()
+
+        for path in files:
+            if path.suffix == ".html":
+                continue
+            rel = path.relative_to(self.root)
+            asset = Asset(path.read_bytes(), _media_type(path))
+            fingerprinted = rel.with_name(f"{rel.stem}.{asset.digest[:12]}{rel.suffix}").as_posix()
+            assets[fingerprinted] = asset
+            urls[f"/static/{rel.as_posix()}"] = f"/static/{fingerprinted}"
+
+        for path in files:
+            if path.suffix != ".html":
+                continue
+            html = path.read_text(encoding="utf-8")
+            html = _STATIC_REF_RE.sub(lambda m: urls.get(m.group(0), m.group(0)), html)
+            pages[path.relative_to(self.root).as_posix()] = Asset(html.encode("utf-8"), "text/html; charset=utf-8")
+
+        with self._lock:
+            self._assets, self._pages = assets, pages
+            self._mtime = self._latest_mtime(files)
+        logger.info(f"Built {len(assets)} static asset(s) and {len(pages)} page(s)"
+                    f"{'' if brotli else ' (brotli not installed, gzip only)'}")
+
+    def _files(self) -> list[Path]:
+        return sorted(p for p in self.root.rglob("*") if p.is_file() and not p.name.startswith("."))
+
+    def _latest_mtime(self, files) -> float:
+        return max((p.stat().st_mtime for p in files), default=0.0)
+
+    def _refresh(self):
+        if not STATIC_AUTO_REBUILD:
+            return
+        files = self._files()
+        if self._latest_mtime(files) != self._mtime or len(files) != len(self._assets) + len(self._pages):
+            self.build()
+
+    def asset(self, path: str) -> Optional[Asset]:
+        self._refresh()
+        return self._assets.get(path)
+
+    def page(self, name: str, request: Request) -> Response:
+        """Serve an HTML page from memory."""
+        self._refresh()
+        return self._pages[name].response(request, REVALIDATE)
+
+
+class StaticAssets:
+    """ASGI app for /static: fingerprinted assets from memory, anything else from disk."""
+
+    def __init__(self, pipeline: AssetPipeline):
+        self.pipeline = pipeline
+        self.fallback = StaticFiles(directory=pipeline.root)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            path, root = scope["path"], scope.get("root_path", "")
+            if root and path.startswith(root):
+                path = path[len(root):]
+            asset = self.pipeline.asset(path.lstrip("/"))
+            if asset is not None:
+                response = asset.response(Request(scope, receive), IMMUTABLE)
+                await response(scope, receive, send)
+                return
+        await self.fallback(scope, receive, send)
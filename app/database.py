@@ -1,26 +1,397 @@
-"""PostgreSQL database connection, schema, and seed data."""
+"""PostgreSQL connections (primary and read replicas), schema, and seed data."""
+import itertools
+import json
+import logging
+import math
 import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
 import psycopg2
+import psycopg2.extensions
+from fastapi import Request
 from psycopg2.extras import RealDictCursor
 
+from app import profiling, tracing
+from app.review_tokens import legacy_digest
+from app.services import analytics
+from app.metrics import (
+    DB_CONNECTION_CHECKOUT, DB_QUERY_DURATION, DB_QUERY_ROWS, DB_READ_ROUTING, DB_REPLICA_LAG, DB_SLOW_QUERIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this get an EXPLAIN (ANALYZE, BUFFERS) captured
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "250"))
+# Capture at most one plan per statement name per interval (seconds)
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"
+
+# Only plain reads are re-run under EXPLAIN ANALYZE
+_READ_ONLY_RE = re.compile(r"^\s*(/\*.*?\*/\s*)*(SELECT|WITH)\b", re.IGNORECASE | re.DOTALL)
+_WRITE_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+# Literals in plan conditions: quoted strings (with '' escapes) and numbers
+_PLAN_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|(?<![\w.$])-?\d+(?:\.\d+)?\b")
+
+# Read replicas: comma-separated DSNs; reads use the primary when unset or none are healthy
+REPLICA_URLS = [dsn.strip() for dsn in os.environ.get("POSTGRES_REPLICA_URLS", "").split(",") if dsn.strip()]
+# Replicas further behind than this are taken out of rotation until they catch up
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+# After a write, that client reads from the primary for this long; never shorter than the lag
+# we tolerate, so the write is visible on any replica by the time reads move back
+REPLICA_STICKY_SECONDS = max(float(os.environ.get("REPLICA_STICKY_SECONDS", "5")), REPLICA_MAX_LAG_SECONDS)
+REPLICA_HEALTH_INTERVAL = float(os.environ.get("REPLICA_HEALTH_INTERVAL", "10"))
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get("REPLICA_CONNECT_TIMEOUT", "2"))
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+_slow_queries = deque(maxlen=50)
+_last_explained: dict[str, float] = {}
+_slow_lock = threading.Lock()
+
+
+def slugify(name: str) -> str:
+    """Normalise a name for lookups; must match the users.slug generated column."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _statement_name(frame) -> str:
+    """Name a statement after its call site, e.g. "auth.get_dashboard:48"."""
+    module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+    return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+def _tag_query(query, name: str):
+    """Prefix the SQL with its call site so it shows up in pg_stat_activity and logs."""
+    if isinstance(query, str):
+        return f"/* {name} */ {query}"
+    if isinstance(query, bytes):
+        return f"/* {name} */ ".encode() + query
+    return query  # psycopg2.sql.Composed etc. are left untouched
+
+
+def _is_read_only(query) -> bool:
+    if not isinstance(query, str):
+        return False
+    return bool(_READ_ONLY_RE.match(query)) and not _WRITE_RE.search(query)
+
+
+def _mask_plan(node):
+    """
+    A plan with the literals in its conditions replaced by '?'.
+
+    Parameters are interpolated before EXPLAIN runs, so plan conditions
+    carry emails, token digests and ids; only the plan's shape is kept.
+    """
+    if isinstance(node, dict):
+        return {key: _mask_plan(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_mask_plan(value) for value in node]
+    if isinstance(node, str):
+        return _PLAN_LITERAL_RE.sub("?", node)
+    return node
+
+
+def slow_queries() -> list[dict]:
+    """Most recent slow statements captured in this process, newest first."""
+    with _slow_lock:
+        return list(reversed(_slow_queries))
+
+
+class InstrumentedCursor(RealDictCursor):
+    """
+    RealDictCursor that tags each statement with its call site, records
+    latency and row counts, and captures a plan for slow reads.
+    """
+
+    def execute(self, query, vars=None):
+        name = _statement_name(sys._getframe(1))
+        with tracing.span("db.query", kind="client", statement=name) as span:
+            start = time.perf_counter()
+            try:
+                return super().execute(_tag_query(query, name), vars)
+            finally:
+                elapsed = time.perf_counter() - start
+                DB_QUERY_DURATION.observe(elapsed, name)
+                profiling.record_phase("db", elapsed)
+                if self.rowcount >= 0:
+                    DB_QUERY_ROWS.observe(self.rowcount, name)
+                    if span is not None:
+                        span.set_attribute("db.rows", self.rowcount)
+                if elapsed * 1000 >= SLOW_QUERY_MS:
+                    self._record_slow(name, query, vars, elapsed)
+
+    def _record_slow(self, name: str, query, vars, elapsed: float):
+        DB_SLOW_QUERIES.inc(1, name)
+        entry = {
+            "statement": name,
+            "duration_ms": round(elapsed * 1000, 1),
+            "query": query if isinstance(query, str) else str(query),
+            "plan": None,
+            "captured_at": datetime.now().isoformat(),
+        }
+
+        now = time.monotonic()
+        with _slow_lock:
+            due = now - _last_explained.get(name, float("-inf")) >= SLOW_QUERY_EXPLAIN_INTERVAL
+            if due:
+                _last_explained[name] = now
+
+        if (due and SLOW_QUERY_EXPLAIN and self.name is None
+                and not self.connection.autocommit and _is_read_only(query)):
+            plan = self._explain(query, vars)
+            entry["plan"] = _mask_plan(plan) if plan is not None else None
+
+        with _slow_lock:
+            _slow_queries.append(entry)
+        logger.warning(
+            f"Slow query {name} took {entry['duration_ms']}ms"
+            + (f"; plan: {json.dumps(entry['plan'])}" if entry["plan"] else "")
+        )
 
-def get_connection():
-    """Get a database connection."""
+    def _explain(self, query, vars):
+        """Run EXPLAIN (ANALYZE, BUFFERS) inside a savepoint so the caller's transaction is untouched."""
+        cur = self.connection.cursor(cursor_factory=psycopg2.extensions.cursor)
+        try:
+            cur.execute("SAVEPOINT slow_query_explain")
+            try:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, vars)
+                return cur.fetchone()[0]
+            except psycopg2.Error as e:
+                logger.warning(f"Could not capture plan: {e}")
+                return None
+            finally:
+                cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        except psycopg2.Error:
+            return None
+        finally:
+            cur.close()
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose commits are recorded as trace spans."""
+
+    def commit(self):
+        with tracing.span("db.commit", kind="client"):
+            return super().commit()
+
+
+def get_connection(dsn: Optional[str] = None, **kwargs):
+    """Get a database connection (the primary unless a DSN is given)."""
     return psycopg2.connect(
-        os.environ.get("POSTGRES_URL"),
-        cursor_factory=RealDictCursor
+        dsn or os.environ.get("POSTGRES_URL"),
+        connection_factory=InstrumentedConnection,
+        cursor_factory=InstrumentedCursor,
+        **kwargs
     )
 
 
-def get_db():
-    """Dependency for FastAPI endpoints."""
-    conn = get_connection()
+# Replication lag as seen by a standby; 0 when fully replayed or not a standby at all
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END AS lag_seconds
+"""
+
+
+class Replica:
+    """One read replica and what its last health check found."""
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.host = psycopg2.extensions.parse_dsn(dsn).get("host", "?")
+        self.healthy = True
+        self.lag = None
+        self.error = None
+        self.checked_at = float("-inf")
+
+    def check_due(self) -> bool:
+        return time.monotonic() - self.checked_at >= REPLICA_HEALTH_INTERVAL
+
+    def mark(self, healthy: bool, lag: Optional[float] = None, error: Optional[str] = None):
+        if healthy != self.healthy:
+            log = logger.info if healthy else logger.warning
+            log(f"Read replica {self.host} {'back in rotation' if healthy else 'out of rotation'}"
+                + (f": {error}" if error else ""))
+        self.healthy, self.lag, self.error = healthy, lag, error
+        self.checked_at = time.monotonic()
+        if lag is not None:
+            DB_REPLICA_LAG.set(lag, self.host)
+
+    def stats(self) -> dict:
+        return {"host": self.host, "healthy": self.healthy, "lag_seconds": self.lag, "error": self.error}
+
+
+class ReplicaPool:
+    """
+    Round-robin over the configured replicas, skipping any that are down or
+    lagging by more than REPLICA_MAX_LAG_SECONDS.
+
+    A replica's health is re-checked on checkout at most every
+    REPLICA_HEALTH_INTERVAL seconds, and one taken out of rotation is retried
+    on the same schedule, so no background thread is needed.
+    """
+
+    def __init__(self, dsns: list[str]):
+        self.replicas = [Replica(dsn) for dsn in dsns]
+        self._next = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def connect(self):
+        """A connection to a healthy replica, or None to read from the primary."""
+        count = len(self.replicas)
+        start = next(self._next)
+        for i in range(count):
+            replica = self.replicas[(start + i) % count]
+            due = replica.check_due()
+            if not replica.healthy and not due:
+                continue
+            try:
+                conn = get_connection(replica.dsn, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+            except psycopg2.Error as e:
+                replica.mark(False, error=" ".join(str(e).split()))
+                continue
+            if due and not self._check(replica, conn):
+                conn.close()
+                continue
+            return conn
+        return None
+
+    def _check(self, replica: Replica, conn) -> bool:
+        try:
+            cur = conn.cursor()
+            cur.execute(REPLICA_LAG_SQL)
+            lag = cur.fetchone()["lag_seconds"]
+            conn.rollback()
+        except psycopg2.Error as e:
+            replica.mark(False, error=" ".join(str(e).split()))
+            return False
+        lag = float(lag) if lag is not None else None
+        if lag is None or lag > REPLICA_MAX_LAG_SECONDS:
+            replica.mark(False, lag, f"lagging {lag if lag is not None else 'unknown'}s")
+            return False
+        replica.mark(True, lag)
+        return True
+
+    def stats(self) -> list[dict]:
+        return [replica.stats() for replica in self.replicas]
+
+
+replicas = ReplicaPool(REPLICA_URLS)
+
+
+def _checkout(pool: str, connect):
+    start = time.perf_counter()
+    conn = connect()
+    if conn is not None:
+        DB_CONNECTION_CHECKOUT.observe(time.perf_counter() - start, pool)
+    return conn
+
+
+def _sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+def get_db(request: Request):
+    """Dependency for endpoints that write: always the primary.
+
+    A successful unsafe request (POST, PUT, ...) also pins that client's reads
+    to the primary for a short while; see ReadYourWritesMiddleware.
+    """
+    # No pool yet: checkout time is the cost of a fresh connect
+    conn = _checkout("primary", get_connection)
+    if request.method not in SAFE_METHODS:
+        request.state.db_wrote = True
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def read_connection(sticky: bool = False):
+    """A read-only connection on a healthy replica, else the primary (always the primary if `sticky`).
+
+    The caller closes it. Streamed responses use this directly, since they
+    outlive a request dependency.
+    """
+    conn = None
+    if not replicas:
+        target = "primary"
+    elif sticky:
+        target = "sticky"
+    else:
+        conn = _checkout("replica", replicas.connect)
+        target = "replica" if conn is not None else "fallback"
+    if conn is None:
+        conn = _checkout("primary", get_connection)
+    DB_READ_ROUTING.inc(1, target)
+    conn.set_session(readonly=True)
+    return conn
+
+
+def get_read_db(request: Request):
+    """Dependency for read-only endpoints: a healthy replica, else the primary.
+
+    Clients inside their read-your-writes window read from the primary. The
+    session is read-only wherever it lands, so a write on a read route fails
+    in development too rather than only once replicas are configured.
+    """
+    conn = read_connection(_sticky(request))
     try:
         yield conn
     finally:
         conn.close()
 
 
+def replica_stats() -> dict:
+    """Replica health for the ops API."""
+    return {
+        "replicas": replicas.stats(),
+        "sticky_seconds": REPLICA_STICKY_SECONDS,
+        "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+    }
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware that sets the primary-stickiness cookie on successful
+    responses to requests that wrote through get_db.
+
+    Done here rather than in the dependency so it also covers handlers that
+    return a Response directly. Only active when replicas are configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if (message["type"] == "http.response.start" and message["status"] < 400
+                    and scope.get("state", {}).get("db_wrote")):
+                until = int(time.time() + REPLICA_STICKY_SECONDS) + 1
+                cookie = (f"{STICKY_COOKIE}={until}; Max-Age={math.ceil(REPLICA_STICKY_SECONDS)}; "
+                          "Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
 def init_db():
     """Initialize database schema."""
     conn = get_connection()
@@ -53,10 +424,23 @@ def init_db():
             email TEXT NOT NULL,
             relationship TEXT NOT NULL,
             frequency TEXT NOT NULL,
-            token TEXT UNIQUE NOT NULL,
+            -- SHA-256 of a pre-signing link token; NULL for signed ones (see app.review_tokens)
+            token_digest BYTEA,
             created_at TIMESTAMP DEFAULT NOW()
         );
 
+        -- Migration: replace plaintext tokens with their digest
+        ALTER TABLE reviewers ADD COLUMN IF NOT EXISTS token_digest BYTEA;
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'reviewers' AND column_name = 'token') THEN
+                UPDATE reviewers SET token_digest = sha256(convert_to(token, 'UTF8')) WHERE token_digest IS NULL;
+                ALTER TABLE reviewers DROP COLUMN token;
+            END IF;
+        END
+        $$;
+
         CREATE TABLE IF NOT EXISTS reviews (
             id SERIAL PRIMARY KEY,
             reviewer_id INTEGER NOT NULL REFERENCES reviewers(id),
@@ -77,15 +461,151 @@ def init_db():
             finalised_at TIMESTAMP,
             updated_at TIMESTAMP DEFAULT NOW()
         );
+        ALTER TABLE summaries ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+        -- Recurring themes found locally when the summary was generated (see app.services.themes)
+        ALTER TABLE summaries ADD COLUMN IF NOT EXISTS themes JSONB;
 
-        CREATE INDEX IF NOT EXISTS idx_feedback_cycles_subject ON feedback_cycles(subject_user_id);
+        -- Stored responses for Idempotency-Key retries (see app.idempotency)
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            request_hash TEXT NOT NULL,
+            status_code INTEGER,
+            response TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (scope, key)
+        );
+        -- Expired keys are purged oldest first (see app.idempotency.purge_expired)
+        CREATE INDEX IF NOT EXISTS idempotency_keys_created_at_idx ON idempotency_keys (created_at);
+
+        -- Every version of every summary (see app.services.summary_history)
+        CREATE TABLE IF NOT EXISTS summary_versions (
+            id SERIAL PRIMARY KEY,
+            cycle_id INTEGER NOT NULL REFERENCES feedback_cycles(id),
+            version INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            content TEXT NOT NULL,
+            weighting_explanation TEXT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE (cycle_id, version)
+        );
+
+        -- Versions are never rewritten; rows are only deleted with their cycle
+        CREATE OR REPLACE FUNCTION summary_versions_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'summary_versions is append-only';
+        END
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS summary_versions_append_only ON summary_versions;
+        CREATE TRIGGER summary_versions_append_only BEFORE UPDATE ON summary_versions
+            FOR EACH ROW EXECUTE FUNCTION summary_versions_append_only();
+
+        -- Precomputed org-wide aggregates (see app.services.analytics)
+        CREATE TABLE IF NOT EXISTS analytics_relationship_monthly (
+            month DATE NOT NULL,
+            relationship TEXT NOT NULL,
+            invited INTEGER NOT NULL DEFAULT 0,
+            submitted INTEGER NOT NULL DEFAULT 0,
+            submit_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (month, relationship)
+        );
+
+        CREATE TABLE IF NOT EXISTS analytics_submit_latency (
+            month DATE NOT NULL,
+            relationship TEXT NOT NULL,
+            bucket SMALLINT NOT NULL,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, relationship, bucket)
+        );
+
+        CREATE TABLE IF NOT EXISTS analytics_manager (
+            manager_user_id INTEGER PRIMARY KEY REFERENCES users(id),
+            cycles INTEGER NOT NULL DEFAULT 0,
+            invited INTEGER NOT NULL DEFAULT 0,
+            submitted INTEGER NOT NULL DEFAULT 0,
+            complete_cycles INTEGER NOT NULL DEFAULT 0,
+            finalised_cycles INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+
+        -- (owner, created_at, id) serves keyset pagination (see app.pagination) as an
+        -- index range scanned backwards, and "latest cycle for a subject" as a top-1 scan
+        DROP INDEX IF EXISTS idx_feedback_cycles_subject;
+        DROP INDEX IF EXISTS idx_feedback_cycles_subject_created;
+        CREATE INDEX IF NOT EXISTS idx_feedback_cycles_subject_keyset ON feedback_cycles(subject_user_id, created_at, id);
         CREATE INDEX IF NOT EXISTS idx_feedback_cycles_creator ON feedback_cycles(created_by_user_id);
-        CREATE INDEX IF NOT EXISTS idx_feedback_cycles_manager ON feedback_cycles(manager_user_id);
+        DROP INDEX IF EXISTS idx_feedback_cycles_manager;
+        CREATE INDEX IF NOT EXISTS idx_feedback_cycles_manager_keyset ON feedback_cycles(manager_user_id, created_at, id);
         CREATE INDEX IF NOT EXISTS idx_reviewers_cycle ON reviewers(cycle_id);
-        CREATE INDEX IF NOT EXISTS idx_reviewers_token ON reviewers(token);
-        CREATE INDEX IF NOT EXISTS idx_reviewers_email ON reviewers(email);
-        CREATE INDEX IF NOT EXISTS idx_reviews_reviewer ON reviews(reviewer_id);
-        CREATE INDEX IF NOT EXISTS idx_summaries_cycle ON summaries(cycle_id);
+        DROP INDEX IF EXISTS idx_reviewers_token;
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_reviewers_token_digest ON reviewers(token_digest)
+            WHERE token_digest IS NOT NULL;
+        DROP INDEX IF EXISTS idx_reviewers_email;
+        CREATE INDEX IF NOT EXISTS idx_reviewers_email_keyset ON reviewers(email, created_at, id);
+
+        -- Full-text search documents (see app.routes.search). Must stay in step with
+        -- SEARCH_CONFIG and REVIEW_FIELDS there; the answers outrank the free-text extras
+        ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(start_doing, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(stop_doing, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(continue_doing, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(example, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(additional, '')), 'C')
+        ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_reviews_search ON reviews USING GIN (search_vector);
+        CREATE INDEX IF NOT EXISTS idx_reviews_submitted_at ON reviews(submitted_at);
+        ALTER TABLE summaries ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(content, '')), 'A')
+        ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_summaries_search ON summaries USING GIN (search_vector);
+
+        -- Exact and normalised names for manager dashboard lookups by name or slug (see slugify)
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS slug TEXT
+            GENERATED ALWAYS AS (trim(both '-' from regexp_replace(lower(name), '[^a-z0-9]+', '-', 'g'))) STORED;
+        CREATE INDEX IF NOT EXISTS idx_users_slug ON users(slug);
+        CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+    """)
+
+    # Migration: one review per reviewer. Double submissions from before the
+    # constraint keep the first review; the index then backs ON CONFLICT in submit_review
+    cur.execute("""
+        DELETE FROM reviews r
+        USING reviews earlier
+        WHERE r.reviewer_id = earlier.reviewer_id AND earlier.id < r.id;
+        DROP INDEX IF EXISTS idx_reviews_reviewer;
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_reviews_reviewer ON reviews(reviewer_id);
+    """)
+
+    # Migration: one summary per cycle. Rows from before history was kept become
+    # "legacy" versions; where a cycle has duplicates, the finalised or newest one is
+    # kept as current and the rest survive only in the history
+    cur.execute("""
+        WITH ordered AS (
+            SELECT s.*, row_number() OVER (
+                PARTITION BY s.cycle_id
+                ORDER BY COALESCE(s.finalised, FALSE), s.updated_at NULLS FIRST, s.id
+            ) AS n
+            FROM summaries s
+            WHERE NOT EXISTS (SELECT 1 FROM summary_versions v WHERE v.cycle_id = s.cycle_id)
+        ),
+        archived AS (
+            INSERT INTO summary_versions (cycle_id, version, source, content, weighting_explanation, created_at)
+            SELECT cycle_id, n, 'legacy', content, weighting_explanation, COALESCE(updated_at, NOW()) FROM ordered
+        ),
+        latest AS (
+            SELECT DISTINCT ON (cycle_id) id, n FROM ordered ORDER BY cycle_id, n DESC
+        ),
+        renumbered AS (
+            UPDATE summaries s SET version = latest.n FROM latest WHERE s.id = latest.id
+        )
+        DELETE FROM summaries s
+        USING ordered
+        WHERE s.id = ordered.id AND ordered.id NOT IN (SELECT id FROM latest)
+    """)
+    cur.execute("""
+        DROP INDEX IF EXISTS idx_summaries_cycle;
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_summaries_cycle ON summaries(cycle_id);
     """)
 
     # Migration: Fix manager_user_id on demo cycles where Sam is reviewer with 'manager' relationship
@@ -97,6 +617,9 @@ def init_db():
         AND fc.manager_user_id IS NULL
     """)
 
+    # Migration: build the analytics aggregates for data from before they were kept
+    analytics.rebuild_if_empty(cur)
+
     conn.commit()
     cur.close()
     conn.close()
@@ -140,7 +663,7 @@ def seed_demo_data():
     )
     cycle_id = cur.fetchone()["id"]
 
-    # Create reviewers with tokens
+    # Create reviewers with fixed (legacy-format) tokens, stored as digests
     reviewers_data = [
         ("Sam Taylor", "sam@demo.360feedback", "manager", "weekly", "demo-sam-token-abc123"),
         ("Jordan Lee", "jordan@demo.360feedback", "peer", "weekly", "demo-jordan-token-def456"),
@@ -151,8 +674,8 @@ def seed_demo_data():
     reviewer_ids = []
     for name, email, relationship, frequency, token in reviewers_data:
         cur.execute(
-            "INSERT INTO reviewers (cycle_id, name, email, relationship, frequency, token) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
-            (cycle_id, name, email, relationship, frequency, token)
+            "INSERT INTO reviewers (cycle_id, name, email, relationship, frequency, token_digest) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
+            (cycle_id, name, email, relationship, frequency, legacy_digest(token))
         )
         reviewer_ids.append(cur.fetchone()["id"])
 
@@ -181,6 +704,7 @@ def seed_demo_data():
             (reviewer_id, start, stop, cont, example, additional)
         )
 
+    analytics.rebuild(cur)
     conn.commit()
     cur.close()
     conn.close()
@@ -0,0 +1,113 @@
+"""Idempotency-Key support for POST endpoints.
+
+A client sends the same `Idempotency-Key` header on every retry of one
+logical request. The first request to claim a key does the work and stores
+its response in the same transaction. Later requests with that key get the
+stored response back, marked with `Idempotent-Replayed: true`, without
+repeating the work.
+
+Claiming is an INSERT on the key's primary key, so a retry that arrives while
+the first attempt is still running waits on the row lock and then replays the
+committed result. If the first attempt fails, its transaction rolls back, the
+claim goes with it, and the retry runs normally.
+
+Keys are scoped per resource (e.g. one reviewer) so they cannot collide
+across callers. Reusing a key for a different payload is a 422.
+
+Expired keys are deleted as new ones are claimed, PURGE_BATCH at a time, so
+the table stays bounded without a scheduled job.
+
+Configuration:
+    IDEMPOTENCY_TTL_HOURS  How long a key is honoured (default 24)
+"""
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+MAX_KEY_LENGTH = 255
+PURGE_BATCH = 100
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Claim a key, taking over one that has expired. Returns a row only when this
+# request now owns the key.
+CLAIM_KEY_SQL = """
+INSERT INTO idempotency_keys (scope, key, request_hash)
+VALUES (%(scope)s, %(key)s, %(request_hash)s)
+ON CONFLICT (scope, key) DO UPDATE
+    SET request_hash = EXCLUDED.request_hash, status_code = NULL, response = NULL, created_at = NOW()
+    WHERE idempotency_keys.created_at < NOW() - make_interval(secs => %(ttl_seconds)s)
+RETURNING scope
+"""
+
+# Delete a batch of expired keys, skipping any another transaction holds
+PURGE_EXPIRED_SQL = """
+DELETE FROM idempotency_keys
+WHERE ctid IN (
+    SELECT ctid FROM idempotency_keys
+    WHERE created_at < NOW() - make_interval(secs => %(ttl_seconds)s)
+    ORDER BY created_at
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+)
+"""
+
+# The stored outcome of a claimed key
+STORED_RESPONSE_SQL = """
+SELECT request_hash, status_code, response FROM idempotency_keys WHERE scope = %s AND key = %s
+"""
+
+# Record the response of the request that owns a key
+STORE_RESPONSE_SQL = """
+UPDATE idempotency_keys SET status_code = %s, response = %s WHERE scope = %s AND key = %s
+"""
+
+
+def request_hash(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def purge_expired(cur, limit: int = PURGE_BATCH) -> int:
+    """Delete up to `limit` keys past their TTL; returns how many were deleted."""
+    cur.execute(PURGE_EXPIRED_SQL, {"ttl_seconds": IDEMPOTENCY_TTL_HOURS * 3600, "limit": limit})
+    return cur.rowcount
+
+
+def claim(cur, scope: str, key: Optional[str], body_hash: str) -> Optional[Response]:
+    """
+    Claim `key` for this request.
+
+    Returns None when the caller should do the work (no key was sent, or it
+    is new), or the stored response to replay.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    purge_expired(cur)
+    cur.execute(CLAIM_KEY_SQL, {
+        "scope": scope, "key": key, "request_hash": body_hash, "ttl_seconds": IDEMPOTENCY_TTL_HOURS * 3600,
+    })
+    if cur.fetchone():
+        return None
+
+    cur.execute(STORED_RESPONSE_SQL, (scope, key))
+    stored = cur.fetchone()
+    if stored["request_hash"] != body_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if stored["status_code"] is None:
+        # Only possible if the owner committed without storing a response
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    return Response(
+        content=stored["response"], status_code=stored["status_code"],
+        media_type="application/json", headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def store(cur, scope: str, key: Optional[str], status_code: int, body: str):
+    """Record the response for a claimed key; call before committing the work."""
+    if key is not None:
+        cur.execute(STORE_RESPONSE_SQL, (status_code, body, scope, key))
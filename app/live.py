@@ -0,0 +1,239 @@
+"""Live dashboard updates: Postgres LISTEN/NOTIFY fanned out over Server-Sent Events.
+
+Writes that change what a dashboard shows call notify_cycle() inside their
+transaction. Postgres delivers the notification on commit and drops it on
+rollback, so clients never hear about changes that did not happen.
+
+Each worker process holds a single LISTEN connection, read from the event
+loop with add_reader, and fans events out to in-memory per-topic subscriber
+queues. An open stream costs one small queue and one idle coroutine, with no
+database connection or thread, so a worker can hold thousands.
+
+Topics are "cycle:<id>" and "user:<email>". Events carry only the type and
+ids, and clients re-fetch what they display. When a subscriber falls behind,
+or the listener reconnects and may have missed events, the client is sent a
+"resync" event instead.
+
+Configuration:
+    SSE_HEARTBEAT_SECONDS  Comment line sent on idle streams (default 15)
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Optional
+
+from app.metrics import LIVE_EVENTS, SSE_CLIENTS
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "feedback_events"
+HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+SUBSCRIBER_QUEUE_SIZE = 32
+RECONNECT_MAX_SECONDS = 30.0
+
+# One event for a cycle, addressed to the cycle and to its subject's, its
+# manager's and optionally one more (reviewer) email
+NOTIFY_CYCLE_SQL = """
+SELECT pg_notify(%(channel)s, json_build_object(
+    'type', %(type)s,
+    'cycle_id', fc.id,
+    'emails', array_remove(ARRAY[lower(s.email), lower(m.email), lower(%(email)s::text)], NULL)
+)::text)
+FROM feedback_cycles fc
+JOIN users s ON fc.subject_user_id = s.id
+LEFT JOIN users m ON fc.manager_user_id = m.id
+WHERE fc.id = %(cycle_id)s
+"""
+
+
+def notify_cycle(cur, event_type: str, cycle_id: int, email: Optional[str] = None):
+    """Queue a live-update event for a cycle; it is sent when the transaction commits."""
+    cur.execute(NOTIFY_CYCLE_SQL, {"channel": CHANNEL, "type": event_type, "cycle_id": cycle_id, "email": email})
+
+
+def cycle_topic(cycle_id: int) -> str:
+    return f"cycle:{cycle_id}"
+
+
+def user_topic(email: str) -> str:
+    return f"user:{email.lower()}"
+
+
+class Subscriber:
+    """One open stream: a bounded queue of events for its topics."""
+
+    __slots__ = ("topics", "queue")
+
+    def __init__(self, topics: tuple):
+        self.topics = topics
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event: replace the backlog with a resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class Hub:
+    """Per-process LISTEN connection and topic -> subscribers fan-out."""
+
+    def __init__(self):
+        self._topics = defaultdict(set)
+        self._conn = None
+        self._loop = None
+        self._task = None
+        self._start_lock = None
+        self._ids = itertools.count(1)
+
+    def subscribe(self, topics: tuple) -> Subscriber:
+        subscriber = Subscriber(topics)
+        for topic in topics:
+            self._topics[topic].add(subscriber)
+        SSE_CLIENTS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for topic in subscriber.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+        SSE_CLIENTS.dec()
+
+    def publish(self, event: dict):
+        """Deliver an event to every subscriber of its cycle or any of its emails (once each)."""
+        cycle_id = event.get("cycle_id")
+        topics = [cycle_topic(cycle_id)] if cycle_id is not None else []
+        topics += [user_topic(email) for email in event.get("emails", ())]
+        # Addressees stay server-side: subscribers only learn what changed, not who else was told
+        outgoing = {"id": next(self._ids), "type": event.get("type", "unknown"), "cycle_id": cycle_id}
+        delivered = set()
+        for topic in topics:
+            for subscriber in self._topics.get(topic, ()):
+                if subscriber not in delivered:
+                    delivered.add(subscriber)
+                    subscriber.deliver(outgoing)
+        LIVE_EVENTS.inc(1, outgoing["type"])
+
+    def _broadcast_resync(self):
+        event = {"type": "resync", "id": next(self._ids)}
+        for subscriber in {s for subscribers in self._topics.values() for s in subscribers}:
+            subscriber.deliver(event)
+
+    async def ensure_listening(self):
+        """Start the listener on first use (not at import, so the app starts without a DB)."""
+        if self._task is not None:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._task is None:
+                self._loop = asyncio.get_running_loop()
+                self._task = asyncio.create_task(self._listen_forever())
+
+    async def _listen_forever(self):
+        delay = 1.0
+        first = True
+        while True:
+            try:
+                self._conn = await asyncio.to_thread(self._connect)
+            except Exception as e:
+                logger.warning(f"Live updates: LISTEN connection failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                continue
+
+            delay = 1.0
+            if not first:
+                self._broadcast_resync()  # Events may have been missed while disconnected
+            first = False
+
+            lost = self._loop.create_future()
+            self._loop.add_reader(self._conn.fileno(), self._on_readable, lost)
+            try:
+                await lost
+            finally:
+                self._loop.remove_reader(self._conn.fileno())
+                self._close()
+            logger.warning("Live updates: LISTEN connection lost, reconnecting")
+
+    def _connect(self):
+        from app.database import get_connection
+
+        conn = get_connection()
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(f"LISTEN {CHANNEL}")
+        cur.close()
+        return conn
+
+    def _on_readable(self, lost: asyncio.Future):
+        try:
+            self._conn.poll()
+        except Exception as e:
+            logger.warning(f"Live updates: LISTEN connection error: {e}")
+            if not lost.done():
+                lost.set_result(None)
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                self.publish(json.loads(notify.payload))
+            except (ValueError, TypeError, AttributeError):
+                logger.warning(f"Live updates: ignoring malformed payload {notify.payload[:200]!r}")
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close()
+
+
+hub = Hub()
+
+
+def format_event(event: dict) -> str:
+    """One SSE frame; the event type doubles as the SSE event name."""
+    event_id = event.get("id")
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event.get('type', 'message')}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream(topics: tuple):
+    """Async iterator of SSE frames for a set of topics, with idle heartbeats."""
+    await hub.ensure_listening()
+    subscriber = hub.subscribe(topics)
+    try:
+        # Reconnect delay for EventSource, then an initial event so clients know they are live
+        yield "retry: 5000\n\n" + format_event({"type": "ready"})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscriber)
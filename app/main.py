@@ -6,14 +6,19 @@ if os.environ.get("VERCEL") != "1":
     from dotenv import load_dotenv
     load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import PlainTextResponse
 from pathlib import Path
 
-from app.database import init_db, seed_demo_data
-from app.routes import cycles, review, inbox, manager, auth
+from app.assets import AssetPipeline, StaticAssets
+from app.database import ReadYourWritesMiddleware, init_db, seed_demo_data
+from app.metrics import MetricsMiddleware, render_metrics
+from app.profiling import ProfilingMiddleware
+from app.tracing import TracingMiddleware
+from app.live import hub
+from app.routes import cycles, review, inbox, manager, auth, ops, admin, analytics, search, export, v2, live
+from app.services.summarisation import log_missing_numpy
 
 app = FastAPI(
     title="360 Feedback Tool",
@@ -28,67 +33,102 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Pin a client's reads to the primary briefly after it writes (no-op without replicas)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# On-demand profiling (no-op unless an admin starts a session)
+app.add_middleware(ProfilingMiddleware)
+
+# Request tracing (no-op unless TRACE_EXPORT is set)
+app.add_middleware(TracingMiddleware)
+
+# Request latency by route template (outermost so it times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # Include API routers
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(cycles.router, prefix="/api", tags=["cycles"])
 app.include_router(review.router, prefix="/api", tags=["review"])
 app.include_router(inbox.router, prefix="/api", tags=["inbox"])
 app.include_router(manager.router, prefix="/api", tags=["manager"])
+app.include_router(ops.router, prefix="/api", tags=["ops"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
+app.include_router(analytics.router, prefix="/api", tags=["analytics"])
+app.include_router(search.router, prefix="/api", tags=["search"])
+app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(live.router, prefix="/api", tags=["live"])
+app.include_router(v2.router, prefix="/api/v2", tags=["v2"])
 
 # Serve static files
 static_dir = Path(__file__).parent.parent / "static"
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Fingerprinted, precompressed assets with immutable caching; pages from memory
+assets = AssetPipeline(static_dir)
+app.mount("/static", StaticAssets(assets), name="static")
 
 
 @app.on_event("startup")
 def startup():
-    """Initialize and seed database on startup (local development only)."""
+    """Report missing optional dependencies; initialize and seed the database (local development only)."""
+    log_missing_numpy()
     # Skip database initialization on Vercel serverless
     if os.environ.get("VERCEL") != "1":
         init_db()
         seed_demo_data()
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the live-updates LISTEN connection."""
+    await hub.stop()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
-def serve_index():
+def serve_index(request: Request):
     """Serve landing page."""
-    return FileResponse(static_dir / "index.html")
+    return assets.page("index.html", request)
 
 
 @app.get("/dashboard")
-def serve_dashboard():
+def serve_dashboard(request: Request):
     """Serve user dashboard page."""
-    return FileResponse(static_dir / "dashboard.html")
+    return assets.page("dashboard.html", request)
 
 
 @app.get("/nominate")
-def serve_nominate():
+def serve_nominate(request: Request):
     """Serve employee nomination page."""
-    return FileResponse(static_dir / "nominate.html")
+    return assets.page("nominate.html", request)
 
 
 @app.get("/review/{token}")
-def serve_review(token: str):
+def serve_review(token: str, request: Request):
     """Serve reviewer feedback form."""
-    return FileResponse(static_dir / "review.html")
+    return assets.page("review.html", request)
 
 
 @app.get("/inbox/{email}")
-def serve_inbox(email: str):
+def serve_inbox(email: str, request: Request):
     """Serve reviewer inbox page."""
-    return FileResponse(static_dir / "inbox.html")
+    return assets.page("inbox.html", request)
 
 
 @app.get("/cycle/{cycle_id}")
-def serve_cycle(cycle_id: str):
+def serve_cycle(cycle_id: str, request: Request):
     """Serve cycle management page."""
-    return FileResponse(static_dir / "manager.html")
+    return assets.page("manager.html", request)
 
 
 # Legacy route for backward compatibility
 @app.get("/manager/{employee_identifier}")
-def serve_manager(employee_identifier: str):
+def serve_manager(employee_identifier: str, request: Request):
     """Serve manager dashboard (legacy URL)."""
-    return FileResponse(static_dir / "manager.html")
+    return assets.page("manager.html", request)
@@ -0,0 +1,279 @@
+"""In-process Prometheus-style metrics.
+
+Counters, gauges and histograms are kept in memory and rendered in the
+Prometheus text exposition format by GET /metrics. Each metric caps the
+number of label combinations it will track; once the cap is hit, new
+combinations are folded into a single "__overflow__" series so a burst of
+unexpected label values cannot grow memory without bound.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+DEFAULT_MAX_SERIES = 200
+OVERFLOW_LABEL = "__overflow__"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), max_series: int = DEFAULT_MAX_SERIES):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: tuple) -> tuple:
+        """Series key for labels, folding new ones into overflow once full. Call with lock held."""
+        if labels in self._series or len(self._series) < self.max_series:
+            return labels
+        return (OVERFLOW_LABEL,) * len(self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = list(self._series.items())
+        for labels, value in series:
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, *labels):
+        self.inc(-amount, *labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS, max_series: int = DEFAULT_MAX_SERIES):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        # Non-cumulative counts per bucket (+Inf last); summed at render time
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, labels: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            le_label = 'le="' + le + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le_label)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and callbacks that refresh gauges right before a scrape."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+
+# Database
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database statement latency by statement name.",
+    ("statement",), max_series=500,
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows", "Rows returned or affected per statement.",
+    ("statement",), buckets=ROW_BUCKETS, max_series=500,
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.",
+    ("statement",), max_series=500,
+)
+DB_CONNECTION_CHECKOUT = Histogram(
+    "db_connection_checkout_seconds", "Time to obtain a database connection.",
+    ("pool",),
+)
+DB_READ_ROUTING = Counter(
+    "db_read_routing_total", "Read-only requests by where they were sent (replica, sticky, fallback, primary).",
+    ("target",),
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replication lag seen at the last health check, by replica host.",
+    ("replica",),
+)
+
+# AI providers
+AI_REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds", "Latency of LLM and Whisper calls by model.",
+    ("provider", "model", "outcome"),
+)
+AI_TOKENS = Counter(
+    "ai_tokens_total", "Tokens consumed by model and direction.",
+    ("model", "direction"),
+)
+AI_PROMPT_TOKENS_SAVED = Counter(
+    "ai_prompt_tokens_saved_total", "Estimated prompt tokens saved by collapsing near-duplicate answers.",
+)
+AI_QUEUE_DEPTH = Gauge(
+    "ai_governor_queue_depth", "Calls waiting for AI governor admission.",
+    ("key",),
+)
+AI_IN_FLIGHT = Gauge(
+    "ai_governor_in_flight", "AI calls currently admitted.",
+    ("key",),
+)
+
+# Background work
+BACKGROUND_JOBS = Gauge(
+    "background_jobs", "Background jobs queued or running.",
+    ("job",),
+)
+BACKGROUND_JOB_DURATION = Histogram(
+    "background_job_duration_seconds", "Background job run time.",
+    ("job", "outcome"),
+)
+
+# Admission control
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected with 429, by policy and budget (ip or subject).",
+    ("policy", "scope"),
+)
+
+# Review links
+REVIEW_TOKEN_CHECKS = Counter(
+    "review_token_checks_total", "Review link tokens checked, by result (signed, legacy, forged, unknown_key, malformed).",
+    ("result",),
+)
+
+# Live updates
+SSE_CLIENTS = Gauge(
+    "sse_clients", "Open Server-Sent Events streams.",
+)
+LIVE_EVENTS = Counter(
+    "live_events_total", "Change notifications fanned out to SSE clients, by event type.",
+    ("event",), max_series=50,
+)
+
+
+def _collect_governors():
+    from app.services.ai_governor import governor_stats
+
+    for key, stats in governor_stats().items():
+        AI_QUEUE_DEPTH.set(stats["queue_depth"], key)
+        AI_IN_FLIGHT.set(stats["in_flight"], key)
+
+
+REGISTRY.add_collector(_collect_governors)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every registered metric."""
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by matched route template.
+
+    Uses the route template (e.g. /api/review/{token}) rather than the raw
+    path so tokens and emails never become label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None)
+            if template is None:
+                template = "/static" if scope["path"].startswith("/static/") else "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, scope["method"], template, str(status_holder[0])
+            )
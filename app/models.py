@@ -107,6 +107,23 @@ class InboxItem(BaseModel):
 
 
 # Dashboard models
+class ThemeQuote(BaseModel):
+    """A representative sentence, unattributed."""
+    field: str  # start_doing, stop_doing, continue_doing, example or additional
+    text: str
+
+
+class SummaryTheme(BaseModel):
+    """A point raised by several reviewers (see app.services.themes)."""
+    label: str
+    terms: list[str]
+    weight: float  # Combined weight of the reviewers who raised it
+    reviewer_count: int
+    relationships: dict[str, int]  # Reviewers per relationship label, e.g. {"Peer": 2}
+    fields: dict[str, int]  # Sentences per answer field
+    quotes: list[ThemeQuote]
+
+
 class SummaryResponse(BaseModel):
     id: int
     cycle_id: int
@@ -115,12 +132,35 @@ class SummaryResponse(BaseModel):
     finalised: bool
     finalised_at: Optional[datetime]
     updated_at: datetime
+    version: int = 1
+    themes: Optional[list[SummaryTheme]] = None  # None for summaries generated before themes were kept
 
 
 class SummaryUpdate(BaseModel):
     content: str
 
 
+class SummaryVersionInfo(BaseModel):
+    """One entry in a summary's history."""
+    version: int
+    source: str  # ai, edit, restore or legacy
+    length: int
+    created_at: datetime
+
+
+class SummaryVersion(SummaryVersionInfo):
+    content: str
+    weighting_explanation: Optional[str]
+
+
+class SummaryDiff(BaseModel):
+    from_version: int
+    from_source: str
+    to_version: int
+    to_source: str
+    diff: str  # Unified diff of the content
+
+
 class CycleDashboard(BaseModel):
     """Dashboard view for a feedback cycle."""
     cycle: CycleResponse
@@ -150,6 +190,56 @@ class UserDashboard(BaseModel):
     my_cycles: list[DashboardCycle]  # Cycles where user is the subject
     managed_cycles: list[DashboardCycle]  # Cycles where user is the manager
     pending_reviews: list[InboxItem]  # Reviews user needs to complete
+    # Cursors for the next page of each list, None when it is complete
+    my_cycles_next: Optional[str] = None
+    managed_cycles_next: Optional[str] = None
+    pending_reviews_next: Optional[str] = None
+
+
+class SearchHit(BaseModel):
+    """A review or summary matching a search (see app.routes.search)."""
+    kind: str  # review or summary
+    id: int
+    cycle_id: int
+    cycle_title: Optional[str]
+    subject_name: str
+    relationship: Optional[str] = None  # Reviewer's relationship, for reviews
+    date: datetime  # Submitted (review) or last updated (summary)
+    rank: float
+    highlights: dict[str, str]  # Field -> HTML snippet with <mark>ed matches
+
+
+# Org-wide analytics models (precomputed, see app.services.analytics)
+class RelationshipStats(BaseModel):
+    relationship: str
+    invited: int
+    submitted: int
+    completion_rate: Optional[float]  # submitted / invited
+    mean_hours_to_submit: Optional[float]
+    p50_hours_to_submit: Optional[float]
+    p90_hours_to_submit: Optional[float]
+
+
+class RelationshipReport(BaseModel):
+    as_of: Optional[datetime]  # Last change to the aggregates reported
+    relationships: list[RelationshipStats]
+
+
+class ManagerProgress(BaseModel):
+    manager_user_id: int
+    manager_name: str
+    manager_email: str
+    cycles: int
+    complete_cycles: int  # Every invited reviewer has submitted
+    finalised_cycles: int
+    invited: int
+    submitted: int
+    completion_rate: Optional[float]
+
+
+class ManagerReport(BaseModel):
+    as_of: Optional[datetime]
+    managers: list[ManagerProgress]
 
 
 # Legacy compatibility (to be removed)
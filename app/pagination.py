@@ -0,0 +1,79 @@
+"""Keyset (cursor) pagination over (created_at, id), newest first.
+
+A cursor names the last row of the previous page as
+"<created_at as YYYYMMDDHHMMSSffffff>-<id>", so it is URL-safe, exact to the
+microsecond, and can be built by Postgres inside a JSON query as well as
+here. Page queries fetch limit + 1 rows: the extra row only tells us whether
+there is a next page.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 100
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return f"{created_at.strftime(_CURSOR_FORMAT)}-{row_id}"
+
+
+def cursor_params(cursor: Optional[str]) -> dict:
+    """Query parameters for keyset_sql; both are NULL on the first page."""
+    if not cursor:
+        return {"after_ts": None, "after_id": None}
+    try:
+        ts, row_id = cursor.split("-", 1)
+        return {"after_ts": datetime.strptime(ts, _CURSOR_FORMAT), "after_id": int(row_id)}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def cursor_sql(alias: str) -> str:
+    """SQL expression producing the same cursor string as encode_cursor."""
+    return f"to_char({alias}.created_at, 'YYYYMMDDHH24MISSUS') || '-' || {alias}.id"
+
+
+def keyset_sql(alias: str) -> str:
+    """
+    Rows strictly after the cursor. The parameters are bound client-side, so
+    on the first page the NULL test folds away and otherwise the row
+    comparison is an index range on (..., created_at, id).
+    """
+    return (
+        f"(%(after_ts)s::timestamp IS NULL"
+        f" OR ({alias}.created_at, {alias}.id) < (%(after_ts)s::timestamp, %(after_id)s))"
+    )
+
+
+def page_items_sql(source: str, item: str) -> str:
+    """JSON array of the first %(limit)s rows of `source`; `item` builds each element from alias p."""
+    return f"""COALESCE((
+        SELECT json_agg({item} ORDER BY p.created_at DESC, p.id DESC)
+        FROM (SELECT * FROM {source} ORDER BY created_at DESC, id DESC LIMIT %(limit)s) p
+    ), '[]'::json)"""
+
+
+def next_cursor_sql(source: str) -> str:
+    """Cursor of the last row on the page, or NULL when `source` holds no more rows."""
+    return f"""CASE WHEN (SELECT COUNT(*) FROM {source}) > %(limit)s THEN (
+        SELECT p.cursor FROM {source} p
+        ORDER BY p.created_at DESC, p.id DESC OFFSET %(limit)s - 1 LIMIT 1
+    ) END"""
+
+
+def split_page(rows: list, limit: int) -> tuple[list, Optional[str]]:
+    """
+    Trim a limit + 1 row fetch to one page and return it with the next
+    cursor, dropping the "cursor" column from each row.
+    """
+    page = rows[:limit]
+    next_cursor = page[-1]["cursor"] if len(rows) > limit else None
+    for row in page:
+        row.pop("cursor", None)
+    return page, next_cursor
@@ -0,0 +1,302 @@
+"""On-demand statistical profiler for production workers.
+
+Profiling is off by default. While a session is running (started through the
+admin API for a bounded window), a fraction of requests, optionally limited
+to one route template, are selected. A sampler thread snapshots stacks every
+few milliseconds, but only of threads running a selected request's code: the
+event loop while one of their tasks is the running task, and threadpool
+workers while they run a sync endpoint or dependency for one of them. Other
+requests, background jobs and exporter threads never show up. Selected
+requests also accumulate per-phase timings: DB, response serialisation,
+prompt building, LLM queue wait and LLM call.
+
+When no session is active the middleware is a single attribute check, and
+record_phase is a single context variable lookup.
+"""
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+MAX_WINDOW_SECONDS = 300
+MAX_STACK_DEPTH = 64
+MAX_DISTINCT_STACKS = 10000
+
+# Leaf frames in these files mean the thread is idle, not doing work
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "base_events.py")
+
+PHASES = ("db", "serialisation", "prompt", "llm_queue", "llm")
+
+_phases: ContextVar[Optional[dict]] = ContextVar("profile_phases", default=None)
+
+
+def record_phase(name: str, seconds: float):
+    """Add time to a phase of the current request, if it is being profiled."""
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+class ProfileSession:
+    """A bounded profiling window and the samples collected during it."""
+
+    def __init__(self, duration: float, sample_rate: float, route: Optional[str], interval_ms: float):
+        self.started_at = time.time()
+        self.ends_at = time.monotonic() + min(duration, MAX_WINDOW_SECONDS)
+        self.duration = min(duration, MAX_WINDOW_SECONDS)
+        self.sample_rate = sample_rate
+        self.route = route
+        self.interval = max(interval_ms, 1.0) / 1000.0
+        self.active = True
+        self.in_flight = 0
+        self.requests = 0
+        self.samples = 0
+        self.stacks = Counter()
+        self.phase_totals = defaultdict(lambda: defaultdict(float))
+        # What is running selected requests: their tasks, the event loop
+        # (by thread id) each runs on, and worker threads inside a threadpool call
+        self._tasks = set()
+        self._loops = {}
+        self._workers = Counter()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        _install_hooks()
+        self._thread.start()
+
+    def stop(self):
+        self.active = False
+
+    def _selected_threads(self) -> set:
+        """Threads running a selected request's code right now."""
+        with self._lock:
+            threads = {thread_id for thread_id, calls in self._workers.items() if calls > 0}
+            loops = list(self._loops.items())
+            tasks = set(self._tasks)
+        for thread_id, loop in loops:
+            # Readable from another thread: the loop's running task is a dict lookup
+            if asyncio.current_task(loop) in tasks:
+                threads.add(thread_id)
+        return threads
+
+    def _sample_loop(self):
+        try:
+            while self.active and time.monotonic() < self.ends_at:
+                time.sleep(self.interval)
+                if self.in_flight <= 0:
+                    continue
+                selected = self._selected_threads()
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id not in selected:
+                        continue
+                    stack = _fold(frame)
+                    if stack is None:
+                        continue
+                    with self._lock:
+                        if stack in self.stacks or len(self.stacks) < MAX_DISTINCT_STACKS:
+                            self.stacks[stack] += 1
+                        self.samples += 1
+        finally:
+            self.active = False
+            _uninstall_hooks()
+
+    def begin_request(self) -> dict:
+        """Register the calling task (a selected request) and its event loop."""
+        task = asyncio.current_task()
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self._tasks.add(task)
+            self._loops[threading.get_ident()] = task.get_loop()
+        return {}
+
+    def end_request(self, route: str, phases: dict, total: float):
+        with self._lock:
+            self.in_flight -= 1
+            self._tasks.discard(asyncio.current_task())
+            totals = self.phase_totals[route]
+            totals["requests"] += 1
+            totals["total"] += total
+            for name, seconds in phases.items():
+                totals[name] += seconds
+
+    def enter_worker(self):
+        with self._lock:
+            self._workers[threading.get_ident()] += 1
+
+    def leave_worker(self):
+        with self._lock:
+            thread_id = threading.get_ident()
+            self._workers[thread_id] -= 1
+            if self._workers[thread_id] <= 0:
+                del self._workers[thread_id]
+
+    def folded(self) -> str:
+        """Collapsed stacks ("frame;frame;frame count"), as read by flamegraph.pl and speedscope."""
+        with self._lock:
+            items = self.stacks.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in items) + ("\n" if items else "")
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = {}
+            for route, totals in self.phase_totals.items():
+                requests = totals["requests"] or 1
+                accounted = sum(totals[p] for p in PHASES)
+                phases[route] = {
+                    "requests": int(totals["requests"]),
+                    **{f"{p}_ms_avg": round(totals[p] * 1000 / requests, 2) for p in PHASES},
+                    "other_ms_avg": round((totals["total"] - accounted) * 1000 / requests, 2),
+                    "total_ms_avg": round(totals["total"] * 1000 / requests, 2),
+                }
+            return {
+                "active": self.active,
+                "started_at": self.started_at,
+                "duration_seconds": self.duration,
+                "sample_rate": self.sample_rate,
+                "route": self.route,
+                "interval_ms": self.interval * 1000,
+                "requests_profiled": self.requests,
+                "samples": self.samples,
+                "distinct_stacks": len(self.stacks),
+                "phases": phases,
+            }
+
+
+def _fold(frame) -> Optional[str]:
+    if frame.f_code.co_filename.endswith(IDLE_FILES):
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_session: Optional[ProfileSession] = None
+_session_lock = threading.Lock()
+
+
+def start_session(duration: float, sample_rate: float, route: Optional[str], interval_ms: float) -> ProfileSession:
+    """Start a profiling window, replacing any running one."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.stop()
+        _session = ProfileSession(duration, sample_rate, route, interval_ms)
+        _session.start()
+        return _session
+
+
+def stop_session() -> Optional[ProfileSession]:
+    with _session_lock:
+        if _session is not None:
+            _session.stop()
+        return _session
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _session
+
+
+# Installed only while a session is running: response serialisation is timed
+# by wrapping FastAPI's serialize_response, and threadpool calls made for a
+# selected request (sync endpoints and dependencies) mark their worker thread
+# by wrapping anyio's run_sync, which Starlette's run_in_threadpool calls.
+_original_serialize = None
+_original_run_sync = None
+
+
+def _install_hooks():
+    global _original_serialize, _original_run_sync
+    import anyio.to_thread
+    import fastapi.routing
+
+    if _original_serialize is not None:
+        return
+    _original_serialize = fastapi.routing.serialize_response
+    _original_run_sync = anyio.to_thread.run_sync
+    original_serialize = _original_serialize
+    original_run_sync = _original_run_sync
+
+    async def timed_serialize_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original_serialize(*args, **kwargs)
+        finally:
+            record_phase("serialisation", time.perf_counter() - start)
+
+    async def tracked_run_sync(func, *args, **kwargs):
+        session = _session
+        if _phases.get() is None or session is None:
+            return await original_run_sync(func, *args, **kwargs)
+
+        def in_selected_request(*call_args):
+            session.enter_worker()
+            try:
+                return func(*call_args)
+            finally:
+                session.leave_worker()
+
+        return await original_run_sync(in_selected_request, *args, **kwargs)
+
+    fastapi.routing.serialize_response = timed_serialize_response
+    anyio.to_thread.run_sync = tracked_run_sync
+
+
+def _uninstall_hooks():
+    global _original_serialize, _original_run_sync
+    import anyio.to_thread
+    import fastapi.routing
+
+    with _session_lock:
+        if _session is not None and _session.active:
+            return  # A newer session still needs them
+        if _original_serialize is not None:
+            fastapi.routing.serialize_response = _original_serialize
+            anyio.to_thread.run_sync = _original_run_sync
+            _original_serialize = None
+            _original_run_sync = None
+
+
+def _route_template(scope) -> Optional[str]:
+    from starlette.routing import Match
+
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path_format", None) or getattr(route, "path", None)
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware selecting requests for the active profiling session."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = _session
+        if session is None or not session.active or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_template(scope)
+        if (session.route and route != session.route) or random.random() >= session.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        phases = session.begin_request()
+        token = _phases.set(phases)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _phases.reset(token)
+            session.end_request(route or "unmatched", phases, time.perf_counter() - start)
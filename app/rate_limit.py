@@ -0,0 +1,235 @@
+"""Admission control for the unauthenticated endpoints (review links, inbox).
+
+Each policy has a budget per client IP and per "subject" (the review token or
+inbox email in the path), counted over a sliding window. Over budget is a
+429 with Retry-After. The policies are separate, so cheap reads cannot spend
+the small budget for voice transcription, which costs Whisper and Claude
+calls.
+
+The window is the usual two-counter approximation: the current fixed window's
+count plus the previous window's, weighted by how much of it still overlaps.
+Counters live in sharded dicts, one lock per shard. Rolling over to the next
+window swaps dicts, so stale keys are dropped wholesale without a sweep. The
+allowed path is a hash, a lock and two dict lookups, a couple of microseconds.
+
+Counters are per process by default. With RATE_LIMIT_REDIS_URL set (and the
+optional `redis` package installed), all workers share them through Redis
+instead, at the cost of one round trip per check.
+
+Configuration:
+    RATE_LIMIT_ENABLED        Set to 0 to disable (default 1)
+    RATE_LIMITS               JSON overrides per policy, e.g. {"voice": {"ip": 10, "subject": 5, "window": 60}}
+    RATE_LIMIT_TRUSTED_HOPS   Proxies in front of the app whose X-Forwarded-For is trusted
+                              (default 1 on Vercel, else 0)
+    RATE_LIMIT_REDIS_URL      Shared counters for multi-worker deployments
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.metrics import RATE_LIMITED
+
+try:
+    import redis
+except ImportError:  # Optional: per-process counters only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+TRUSTED_HOPS = int(os.environ.get("RATE_LIMIT_TRUSTED_HOPS", "1" if os.environ.get("VERCEL") == "1" else "0"))
+SHARDS = 16
+
+# Requests per window (seconds) for each client IP and each path subject
+DEFAULT_POLICIES = {
+    "read": {"ip": 120, "subject": 60, "window": 60},  # Review form context, inbox
+    "submit": {"ip": 20, "subject": 10, "window": 60},  # Review submission
+    "voice": {"ip": 20, "subject": 10, "window": 300},  # Whisper + Claude per recording
+}
+
+# Path parameters identifying what a request is about, in order of preference
+SUBJECT_PARAMS = ("token", "email")
+
+
+class _Shard:
+    __slots__ = ("lock", "window", "current", "previous")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.window = 0
+        self.current = {}
+        self.previous = {}
+
+
+def _retry_after(current: int, previous: int, elapsed: float, limit: int, window: float) -> float:
+    """Seconds until the weighted count drops below the limit."""
+    if current < limit:
+        # Within this window, once enough of the previous one has slid out
+        return max((1 - (limit - current) / previous) * window - elapsed, 0.0) if previous else 0.0
+    # In the next window this window's count becomes the weighted "previous"
+    return (window - elapsed) + window * (1 - limit / current)
+
+
+class LocalBackend:
+    """Sliding-window counters in this process."""
+
+    blocking = False
+
+    def __init__(self, shards: int = SHARDS):
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def hit(self, limits: list[tuple[str, int]], window: float) -> Optional[tuple[int, float]]:
+        """
+        Count a request against every (key, limit), or against none of them.
+
+        None if every limit allows it, else (index of the first limit that
+        rejects it, seconds until it would be allowed).
+        """
+        now = time.monotonic()
+        index, elapsed = divmod(now, window)
+        index = int(index)
+        shards = {id(shard): shard for shard in (self._shards[hash(key) % len(self._shards)] for key, _ in limits)}
+        # Lock every shard involved, in a fixed order, so the check and the count are one step
+        locked = sorted(shards.values(), key=id)
+        for shard in locked:
+            shard.lock.acquire()
+        try:
+            counts = []
+            for key, limit in limits:
+                shard = self._shards[hash(key) % len(self._shards)]
+                if index != shard.window:
+                    shard.previous = shard.current if index == shard.window + 1 else {}
+                    shard.current = {}
+                    shard.window = index
+                current = shard.current.get(key, 0)
+                previous = shard.previous.get(key, 0)
+                if current + previous * (1 - elapsed / window) >= limit:
+                    return len(counts), _retry_after(current, previous, elapsed, limit, window)
+                counts.append((shard, key, current))
+            for shard, key, current in counts:
+                shard.current[key] = current + 1
+            return None
+        finally:
+            for shard in locked:
+                shard.lock.release()
+
+
+class RedisBackend:
+    """Sliding-window counters shared by every worker through Redis."""
+
+    blocking = True
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+    def hit(self, limits: list[tuple[str, int]], window: float) -> Optional[tuple[int, float]]:
+        """As LocalBackend.hit: counted against every limit, or (after a rejection) none."""
+        now = time.time()
+        index, elapsed = divmod(now, window)
+        index = int(index)
+        current_keys = [f"ratelimit:{key}:{index}" for key, _ in limits]
+        try:
+            pipe = self._client.pipeline()
+            for (key, _), current_key in zip(limits, current_keys):
+                pipe.incr(current_key)
+                pipe.expire(current_key, int(window * 2) + 1)
+                pipe.get(f"ratelimit:{key}:{index - 1}")
+            results = pipe.execute()
+
+            for position, (_, limit) in enumerate(limits):
+                current, _, previous = results[position * 3:position * 3 + 3]
+                current -= 1  # Count before this request
+                previous = int(previous or 0)
+                if current + previous * (1 - elapsed / window) >= limit:
+                    # Rejected requests do not use up any of the budgets
+                    pipe = self._client.pipeline()
+                    for current_key in current_keys:
+                        pipe.decr(current_key)
+                    pipe.execute()
+                    return position, _retry_after(current, previous, elapsed, limit, window)
+        except redis.RedisError as e:
+            # Fail open: an unreachable Redis must not take the review pages down
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+        return None
+
+
+def _load_policies() -> dict:
+    policies = {name: dict(policy) for name, policy in DEFAULT_POLICIES.items()}
+    raw = os.environ.get("RATE_LIMITS")
+    if raw:
+        try:
+            for name, override in json.loads(raw).items():
+                policies.setdefault(name, {"window": 60}).update(override)
+        except (ValueError, AttributeError):
+            logger.error("RATE_LIMITS is not valid JSON, using defaults")
+    return policies
+
+
+def _load_backend():
+    url = os.environ.get("RATE_LIMIT_REDIS_URL")
+    if url:
+        if redis is not None:
+            return RedisBackend(url)
+        logger.warning("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; "
+                       "rate limits are per process")
+    return LocalBackend()
+
+
+POLICIES = _load_policies()
+backend = _load_backend()
+
+
+def client_ip(request: Request) -> str:
+    """The client address, taken from X-Forwarded-For only as far as trusted proxies vouch for it."""
+    if TRUSTED_HOPS:
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(forwarded) >= TRUSTED_HOPS:
+            return forwarded[-TRUSTED_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(policy: str):
+    """
+    Dependency enforcing a policy's per-IP and per-subject budgets.
+
+    Declare it first, so a rejected request never reaches token checks or
+    opens a database connection.
+    """
+    limits = POLICIES[policy]
+    window = float(limits.get("window", 60))
+    checks = [(scope, int(limits[scope])) for scope in ("ip", "subject") if limits.get(scope)]
+
+    async def dependency(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        subject = next((request.path_params[p] for p in SUBJECT_PARAMS if p in request.path_params), None)
+        scopes, limits = [], []
+        for scope, limit in checks:
+            value = client_ip(request) if scope == "ip" else subject
+            if value is not None:
+                scopes.append(scope)
+                limits.append((f"{policy}:{scope}:{value}", limit))
+        if not limits:
+            return
+        # Counted against both budgets only if both allow it
+        if backend.blocking:
+            rejected = await run_in_threadpool(backend.hit, limits, window)
+        else:
+            rejected = backend.hit(limits, window)
+        if rejected is not None:
+            position, retry_after = rejected
+            RATE_LIMITED.inc(1, policy, scopes[position])
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    return dependency
@@ -0,0 +1,145 @@
+"""Signed reviewer tokens.
+
+A review link token is "<key version>.<reviewer id>.<mac>", where mac is a
+truncated HMAC-SHA256 of the version and id. It is checked in constant time
+before any query, so forged, mistyped or guessed links are rejected without
+touching Postgres. A valid one is resolved by primary key.
+
+Nothing about a signed token is stored: the link for any reviewer can be
+re-derived from its id, which is how the inbox and dashboard show links.
+Tokens issued before signing (random strings, and the demo tokens) are
+stored only as a SHA-256 digest in reviewers.token_digest. None are issued
+any more, and any string of the right shape could be one, so checking them
+costs a query: they are accepted only with REVIEW_TOKEN_ACCEPT_LEGACY=1, for
+deployments with such links still outstanding. The fixed demo tokens are
+always accepted.
+
+Keys are versioned, so a new key can be introduced without breaking links
+already sent. New tokens use the highest version, and any listed version
+verifies. Removing a version revokes every link signed with it.
+
+Configuration:
+    REVIEW_TOKEN_KEYS           "version:secret" pairs, comma-separated, e.g. "2:new-secret,1:old-secret"
+    REVIEW_TOKEN_DEV_KEY        Set to 1 to sign with a public development key when REVIEW_TOKEN_KEYS
+                                is unset (local development only; refused on Vercel)
+    REVIEW_TOKEN_ACCEPT_LEGACY  Accept pre-signing tokens (default 0)
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import re
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.metrics import REVIEW_TOKEN_CHECKS
+
+logger = logging.getLogger(__name__)
+
+MAC_BYTES = 16
+ACCEPT_LEGACY = os.environ.get("REVIEW_TOKEN_ACCEPT_LEGACY", "0") == "1"
+
+# The demo reviewers' links (see app.database.seed_demo_data), accepted without REVIEW_TOKEN_ACCEPT_LEGACY
+DEMO_TOKENS = frozenset({
+    "demo-sam-token-abc123",
+    "demo-jordan-token-def456",
+    "demo-casey-token-ghi789",
+    "demo-riley-token-jkl012",
+})
+
+# Matches reviewers by a resolved token; see resolve()
+REVIEWER_MATCH_SQL = "(r.id = %(reviewer_id)s OR r.token_digest = %(token_digest)s)"
+
+# JSON built by Postgres carries this prefix plus the reviewer id in place of a
+# token, and fill_tokens() swaps in the signed token (the key never goes to SQL)
+TOKEN_PLACEHOLDER = "@reviewer:"
+_PLACEHOLDER_RE = re.compile(r'"token"\s*:\s*"' + re.escape(TOKEN_PLACEHOLDER) + r'(\d+)"')
+
+_SIGNED_RE = re.compile(r"^(\d{1,4})\.(\d{1,12})\.([A-Za-z0-9_-]{22})$")
+# secrets.token_urlsafe(32) output and the demo tokens
+_LEGACY_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+_DEV_KEY = b"development-only-review-token-key"
+
+
+def _load_keys() -> dict[int, bytes]:
+    configured = os.environ.get("REVIEW_TOKEN_KEYS", "")
+    keys = {}
+    for entry in filter(None, (e.strip() for e in configured.split(","))):
+        version, sep, secret = entry.partition(":")
+        if not sep or not version.isdigit() or not secret:
+            raise RuntimeError(f"REVIEW_TOKEN_KEYS entries must be 'version:secret', got {entry.split(':')[0]!r}...")
+        keys[int(version)] = secret.encode("utf-8")
+    if keys:
+        return keys
+    # The development key is public, so anything signed with it can be forged
+    if os.environ.get("REVIEW_TOKEN_DEV_KEY") != "1" or os.environ.get("VERCEL") == "1":
+        raise RuntimeError("REVIEW_TOKEN_KEYS must be set (REVIEW_TOKEN_DEV_KEY=1 allows a development key locally)")
+    logger.warning("REVIEW_TOKEN_KEYS not set; signing review links with the public development key")
+    return {1: _DEV_KEY}
+
+
+KEYS = _load_keys()
+CURRENT_VERSION = max(KEYS)
+
+
+def _mac(version: int, reviewer_id: int) -> str:
+    digest = hmac.new(KEYS[version], f"review:{version}.{reviewer_id}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:MAC_BYTES]).rstrip(b"=").decode()
+
+
+def issue(reviewer_id: int) -> str:
+    """The review link token for a reviewer, signed with the current key."""
+    return f"{CURRENT_VERSION}.{reviewer_id}.{_mac(CURRENT_VERSION, reviewer_id)}"
+
+
+def legacy_digest(token: str) -> bytes:
+    """Stored form of a pre-signing token; matches sha256(convert_to(token, 'UTF8')) in SQL."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def resolve(token: str) -> Optional[dict]:
+    """
+    Check a token without touching the database.
+
+    Returns the parameters for REVIEWER_MATCH_SQL, or None when the token
+    cannot be valid.
+    """
+    match = _SIGNED_RE.match(token)
+    if match:
+        version, reviewer_id = int(match.group(1)), int(match.group(2))
+        if version not in KEYS:
+            REVIEW_TOKEN_CHECKS.inc(1, "unknown_key")
+            return None
+        if not hmac.compare_digest(_mac(version, reviewer_id), match.group(3)):
+            REVIEW_TOKEN_CHECKS.inc(1, "forged")
+            return None
+        REVIEW_TOKEN_CHECKS.inc(1, "signed")
+        return {"reviewer_id": reviewer_id, "token_digest": None}
+
+    if (ACCEPT_LEGACY and _LEGACY_RE.match(token)) or token in DEMO_TOKENS:
+        REVIEW_TOKEN_CHECKS.inc(1, "legacy")
+        return {"reviewer_id": None, "token_digest": legacy_digest(token)}
+
+    REVIEW_TOKEN_CHECKS.inc(1, "malformed")
+    return None
+
+
+def require_token(token: str) -> dict:
+    """
+    Dependency for /review/{token} routes: 404 for a token that cannot be valid.
+
+    Declare it before the database dependency so a bad link is rejected
+    before a connection is opened.
+    """
+    match = resolve(token)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Invalid review link")
+    return match
+
+
+def fill_tokens(json_text: str) -> str:
+    """Replace token placeholders in Postgres-built JSON with signed tokens."""
+    return _PLACEHOLDER_RE.sub(lambda m: f'"token" : "{issue(int(m.group(1)))}"', json_text)
@@ -0,0 +1,53 @@
+"""Admin-only operational API routes."""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from typing import Optional
+
+from app import profiling
+from app.security import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+class ProfileStart(BaseModel):
+    duration_seconds: float = 30  # Capped at profiling.MAX_WINDOW_SECONDS
+    sample_rate: float = 0.1  # Fraction of matching requests to profile
+    route: Optional[str] = None  # Route template, e.g. "/api/auth/dashboard/{email}"
+    interval_ms: float = 5  # Stack sampling interval
+
+
+@router.post("/admin/profiler")
+def start_profiler(request: ProfileStart):
+    """Start a bounded profiling window."""
+    if not 0 < request.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate must be in (0, 1]")
+    session = profiling.start_session(
+        request.duration_seconds, request.sample_rate, request.route, request.interval_ms
+    )
+    return session.report()
+
+
+@router.get("/admin/profiler")
+def get_profile(format: str = "json"):
+    """Results of the current or last profiling window.
+
+    format=folded returns collapsed stacks for flamegraph.pl or speedscope.
+    """
+    session = profiling.current_session()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    if format == "folded":
+        return PlainTextResponse(session.folded())
+    report = session.report()
+    report["folded"] = session.folded()
+    return report
+
+
+@router.delete("/admin/profiler")
+def stop_profiler():
+    """Stop the running profiling window early."""
+    session = profiling.stop_session()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return session.report()
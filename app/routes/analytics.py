@@ -0,0 +1,43 @@
+"""Org-wide analytics API routes (admin only).
+
+Reports read only the precomputed aggregates in app.services.analytics, so
+they cost the same however much history there is.
+"""
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.database import get_db, get_read_db
+from app.models import ManagerReport, RelationshipReport
+from app.security import require_admin
+from app.services import analytics
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/analytics/relationships", response_model=RelationshipReport)
+def get_relationship_report(since: Optional[date] = None, until: Optional[date] = None, db=Depends(get_read_db)):
+    """Completion rate and time-to-submit percentiles by reviewer relationship.
+
+    since/until select reviewers by the month they were invited (inclusive).
+    """
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    return analytics.relationship_report(db.cursor(), since, until)
+
+
+@router.get("/analytics/managers", response_model=ManagerReport)
+def get_manager_report(limit: int = Query(100, ge=1, le=1000), db=Depends(get_read_db)):
+    """Cycle progress per manager, most cycles first."""
+    return analytics.manager_report(db.cursor(), limit)
+
+
+@router.post("/analytics/rebuild")
+def rebuild_analytics(db=Depends(get_db)):
+    """Recompute the aggregates from the base tables (also run on a schedule)."""
+    cur = db.cursor()
+    analytics.rebuild(cur)
+    db.commit()
+    cur.execute("SELECT count(*) AS managers FROM analytics_manager")
+    return {"message": "Analytics rebuilt", "managers": cur.fetchone()["managers"]}
@@ -1,14 +1,103 @@
 """User authentication and dashboard API routes."""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
 
-from app.database import get_db, get_or_create_user
-from app.models import (
-    LoginRequest, UserResponse, UserDashboard,
-    DashboardCycle, InboxItem
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.database import get_db, get_or_create_user, get_read_db
+from app.review_tokens import fill_tokens
+from app.models import DashboardCycle, LoginRequest, UserResponse, UserDashboard
+from app.pagination import (
+    DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER,
+    cursor_params, cursor_sql, keyset_sql, next_cursor_sql, page_items_sql
 )
+from app.routes.inbox import INBOX_ITEM_JSON, INBOX_PAGE_SQL
+from app.services import analytics
 
 router = APIRouter()
 
+# One page (plus one look-ahead row) of the user's cycles as subject or as
+# manager ({owner}), newest first, optionally only active or only finalised
+# ones. Walks the (owner, created_at, id) index and counts reviewers only for
+# the rows on the page. Expects a CTE `u` holding the user's id.
+CYCLES_PAGE_TEMPLATE = f"""
+    SELECT fc.id, fc.title, fc.status, fc.created_at,
+           s.name AS subject_name, m.name AS manager_name,
+           counts.total_reviewers, counts.submitted_count,
+           {cursor_sql("fc")} AS cursor
+    FROM (
+        SELECT fc.* FROM feedback_cycles fc
+        WHERE fc.{{owner}} = (SELECT id FROM u)
+          AND {keyset_sql("fc")}
+          AND (%(cycle_status)s::text IS NULL
+               OR (%(cycle_status)s::text = 'finalised') = EXISTS (
+                   SELECT 1 FROM summaries sm WHERE sm.cycle_id = fc.id AND sm.finalised))
+        ORDER BY fc.created_at DESC, fc.id DESC
+        LIMIT %(limit)s + 1
+    ) fc
+    JOIN users s ON fc.subject_user_id = s.id
+    LEFT JOIN users m ON fc.manager_user_id = m.id
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS total_reviewers, COALESCE(SUM(rc.n), 0)::int AS submitted_count
+        FROM reviewers r
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS n FROM reviews rev WHERE rev.reviewer_id = r.id
+        ) rc ON TRUE
+        WHERE r.cycle_id = fc.id
+    ) counts ON TRUE
+"""
+
+# DashboardCycle as JSON, built from a cycles page row aliased p
+DASHBOARD_CYCLE_JSON = """json_build_object(
+    'id', p.id, 'title', p.title, 'subject_name', p.subject_name,
+    'manager_name', p.manager_name, 'status', p.status,
+    'submitted_count', p.submitted_count, 'total_reviewers', p.total_reviewers,
+    'created_at', p.created_at
+)"""
+
+# First page of each UserDashboard list, plus its next-page cursor, as one
+# JSON document in a single round trip. Keys match the UserDashboard model.
+DASHBOARD_SQL = f"""
+WITH u AS (
+    SELECT id, email, name, COALESCE(is_demo, FALSE) AS is_demo, created_at
+    FROM users
+    WHERE email = %(email)s
+),
+mine AS ({CYCLES_PAGE_TEMPLATE.format(owner="subject_user_id")}),
+managed AS ({CYCLES_PAGE_TEMPLATE.format(owner="manager_user_id")}),
+pending AS ({INBOX_PAGE_SQL})
+SELECT json_build_object(
+    'user', json_build_object(
+        'id', u.id, 'email', u.email, 'name', u.name,
+        'is_demo', u.is_demo, 'created_at', u.created_at
+    ),
+    'my_cycles', {page_items_sql("mine", DASHBOARD_CYCLE_JSON)},
+    'my_cycles_next', {next_cursor_sql("mine")},
+    'managed_cycles', {page_items_sql("managed", DASHBOARD_CYCLE_JSON)},
+    'managed_cycles_next', {next_cursor_sql("managed")},
+    'pending_reviews', {page_items_sql("pending", INBOX_ITEM_JSON)},
+    'pending_reviews_next', {next_cursor_sql("pending")}
+)::text AS dashboard
+FROM u
+"""
+
+# Later pages of one cycles list ("load more"); the pending reviews list
+# pages through GET /api/inbox/{email}.
+_CYCLES_SQL_TEMPLATE = """
+WITH u AS (SELECT id FROM users WHERE email = %(email)s),
+page AS ({page})
+SELECT {items}::text AS items, {next_cursor} AS next_cursor
+"""
+MY_CYCLES_SQL, MANAGED_CYCLES_SQL = (
+    _CYCLES_SQL_TEMPLATE.format(
+        page=CYCLES_PAGE_TEMPLATE.format(owner=owner),
+        items=page_items_sql("page", DASHBOARD_CYCLE_JSON),
+        next_cursor=next_cursor_sql("page"),
+    )
+    for owner in ("subject_user_id", "manager_user_id")
+)
+
+CycleStatus = Optional[Literal["active", "finalised"]]
+
 
 @router.post("/auth/login", response_model=UserResponse)
 def login(request: LoginRequest, db=Depends(get_db)):
@@ -25,121 +114,71 @@ def login(request: LoginRequest, db=Depends(get_db)):
 
 
 @router.get("/auth/dashboard/{email}", response_model=UserDashboard)
-def get_dashboard(email: str, db=Depends(get_db)):
-    """Get user's personal dashboard with their cycles and pending reviews."""
+def get_dashboard(
+    email: str,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cycle_status: CycleStatus = None,
+    review_status: Optional[Literal["pending", "submitted"]] = None,
+    db=Depends(get_read_db),
+):
+    """Get user's personal dashboard with their cycles and pending reviews.
+
+    Each list holds its first `limit` rows, with a `*_next` cursor when there
+    are more. The JSON is assembled by Postgres and returned as-is, skipping
+    per-row Pydantic models; the demo manager fix-up lives in init_db and
+    POST /api/migrate/fix-manager-ids rather than on this read path.
+    """
     cur = db.cursor()
 
-    # Auto-fix: ensure manager_user_id is set on demo cycles
-    cur.execute("""
-        UPDATE feedback_cycles fc
-        SET manager_user_id = (SELECT id FROM users WHERE email = 'sam@demo.360feedback')
-        WHERE fc.subject_user_id IN (SELECT id FROM users WHERE email = 'alex@demo.360feedback')
-        AND fc.manager_user_id IS NULL
-    """)
-    if cur.rowcount > 0:
-        db.commit()
-
-    # Get user
-    cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-    user = cur.fetchone()
+    cur.execute(DASHBOARD_SQL, dashboard_params(email, limit, cycle_status, review_status))
+    row = cur.fetchone()
 
-    if not user:
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get cycles where user is the subject
-    cur.execute(
-        """SELECT fc.id, fc.title, fc.status, fc.created_at, u.name as subject_name,
-                  m.name as manager_name,
-                  (SELECT COUNT(*) FROM reviewers r WHERE r.cycle_id = fc.id) as total_reviewers,
-                  (SELECT COUNT(*) FROM reviewers r
-                   JOIN reviews rev ON r.id = rev.reviewer_id
-                   WHERE r.cycle_id = fc.id) as submitted_count
-           FROM feedback_cycles fc
-           JOIN users u ON fc.subject_user_id = u.id
-           LEFT JOIN users m ON fc.manager_user_id = m.id
-           WHERE fc.subject_user_id = %s
-           ORDER BY fc.created_at DESC""",
-        (user["id"],)
-    )
-    my_cycles = [
-        DashboardCycle(
-            id=row["id"],
-            title=row["title"],
-            subject_name=row["subject_name"],
-            manager_name=row.get("manager_name"),
-            status=row["status"],
-            submitted_count=row["submitted_count"],
-            total_reviewers=row["total_reviewers"],
-            created_at=row["created_at"]
-        )
-        for row in cur.fetchall()
-    ]
-
-    # Get cycles where user is the manager
-    cur.execute(
-        """SELECT fc.id, fc.title, fc.status, fc.created_at, u.name as subject_name,
-                  m.name as manager_name,
-                  (SELECT COUNT(*) FROM reviewers r WHERE r.cycle_id = fc.id) as total_reviewers,
-                  (SELECT COUNT(*) FROM reviewers r
-                   JOIN reviews rev ON r.id = rev.reviewer_id
-                   WHERE r.cycle_id = fc.id) as submitted_count
-           FROM feedback_cycles fc
-           JOIN users u ON fc.subject_user_id = u.id
-           LEFT JOIN users m ON fc.manager_user_id = m.id
-           WHERE fc.manager_user_id = %s
-           ORDER BY fc.created_at DESC""",
-        (user["id"],)
-    )
-    managed_cycles = [
-        DashboardCycle(
-            id=row["id"],
-            title=row["title"],
-            subject_name=row["subject_name"],
-            manager_name=row.get("manager_name"),
-            status=row["status"],
-            submitted_count=row["submitted_count"],
-            total_reviewers=row["total_reviewers"],
-            created_at=row["created_at"]
-        )
-        for row in cur.fetchall()
-    ]
-
-    # Get pending reviews (where user is a reviewer)
-    cur.execute(
-        """SELECT r.id, r.cycle_id, r.relationship, r.frequency, r.token,
-                  u.name as employee_name,
-                  (SELECT COUNT(*) FROM reviews WHERE reviewer_id = r.id) as has_review
-           FROM reviewers r
-           JOIN feedback_cycles fc ON r.cycle_id = fc.id
-           JOIN users u ON fc.subject_user_id = u.id
-           WHERE r.email = %s
-           ORDER BY r.created_at DESC""",
-        (email,)
-    )
-    pending_reviews = [
-        InboxItem(
-            employee_name=row["employee_name"],
-            cycle_id=row["cycle_id"],
-            relationship=row["relationship"],
-            frequency=row["frequency"],
-            token=row["token"],
-            status="submitted" if row["has_review"] > 0 else "pending"
-        )
-        for row in cur.fetchall()
-    ]
-
-    return UserDashboard(
-        user=UserResponse(
-            id=user["id"],
-            email=user["email"],
-            name=user["name"],
-            is_demo=user["is_demo"],
-            created_at=user["created_at"]
-        ),
-        my_cycles=my_cycles,
-        managed_cycles=managed_cycles,
-        pending_reviews=pending_reviews
-    )
+    return Response(content=fill_tokens(row["dashboard"]), media_type="application/json")
+
+
+def dashboard_params(email: str, limit: int = DEFAULT_LIMIT, cycle_status=None, review_status=None) -> dict:
+    return {
+        "email": email, "limit": limit,
+        "cycle_status": cycle_status, "review_status": review_status,
+        **cursor_params(None),
+    }
+
+
+def _cycles_page(sql: str, email: str, cursor: Optional[str], limit: int, status, db) -> Response:
+    cur = db.cursor()
+
+    cur.execute(sql, {"email": email, "limit": limit, "cycle_status": status, **cursor_params(cursor)})
+    row = cur.fetchone()
+
+    headers = {NEXT_CURSOR_HEADER: row["next_cursor"]} if row["next_cursor"] else None
+    return Response(content=row["items"], media_type="application/json", headers=headers)
+
+
+@router.get("/auth/dashboard/{email}/my-cycles", response_model=list[DashboardCycle])
+def get_my_cycles(
+    email: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    status: CycleStatus = None,
+    db=Depends(get_read_db),
+):
+    """Next page of cycles where the user is the subject (cursor in X-Next-Cursor)."""
+    return _cycles_page(MY_CYCLES_SQL, email, cursor, limit, status, db)
+
+
+@router.get("/auth/dashboard/{email}/managed-cycles", response_model=list[DashboardCycle])
+def get_managed_cycles(
+    email: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    status: CycleStatus = None,
+    db=Depends(get_read_db),
+):
+    """Next page of cycles where the user is the manager (cursor in X-Next-Cursor)."""
+    return _cycles_page(MANAGED_CYCLES_SQL, email, cursor, limit, status, db)
 
 
 @router.post("/migrate/fix-manager-ids")
@@ -155,6 +194,8 @@ def fix_manager_ids(db=Depends(get_db)):
         AND fc.manager_user_id IS NULL
     """)
     updated = cur.rowcount
+    if updated:
+        analytics.rebuild(cur)  # Per-manager aggregates moved with the cycles
 
     db.commit()
 
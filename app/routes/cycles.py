@@ -1,10 +1,12 @@
 """Feedback cycle API routes."""
-import secrets
 from fastapi import APIRouter, Depends, HTTPException, Header
 from typing import Optional
 
+from app import review_tokens
 from app.database import get_db, get_or_create_user
+from app.live import notify_cycle
 from app.models import CycleCreate, CycleResponse, ReviewerCreate, ReviewerResponse
+from app.services import analytics
 
 router = APIRouter()
 
@@ -42,6 +44,8 @@ def create_cycle(
         (subject_user_id, created_by_user_id, manager_user_id, cycle.title)
     )
     row = cur.fetchone()
+    analytics.record_cycle_created(cur, row["manager_user_id"])
+    notify_cycle(cur, "cycle_created", row["id"])
     db.commit()
 
     return CycleResponse(
@@ -103,15 +107,15 @@ def add_reviewer(
             detail=f"Invalid frequency. Must be one of: {valid_frequencies}"
         )
 
-    # Generate unique token
-    token = secrets.token_urlsafe(32)
-
+    # The review link is signed from the new id; nothing secret is stored
     cur.execute(
-        """INSERT INTO reviewers (cycle_id, name, email, relationship, frequency, token)
-           VALUES (%s, %s, %s, %s, %s, %s) RETURNING *""",
-        (cycle_id, reviewer.name, reviewer.email, reviewer.relationship, reviewer.frequency, token)
+        """INSERT INTO reviewers (cycle_id, name, email, relationship, frequency)
+           VALUES (%s, %s, %s, %s, %s) RETURNING *""",
+        (cycle_id, reviewer.name, reviewer.email, reviewer.relationship, reviewer.frequency)
     )
     row = cur.fetchone()
+    analytics.record_reviewer_added(cur, cycle_id, row["id"])
+    notify_cycle(cur, "reviewer_added", cycle_id, email=reviewer.email)
     db.commit()
 
     return ReviewerResponse(
@@ -121,7 +125,7 @@ def add_reviewer(
         email=row["email"],
         relationship=row["relationship"],
         frequency=row["frequency"],
-        token=row["token"],
+        token=review_tokens.issue(row["id"]),
         created_at=row["created_at"],
         has_submitted=False
     )
@@ -0,0 +1,61 @@
+"""Bulk export API routes (admin only), streamed as NDJSON or CSV."""
+import logging
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import read_connection
+from app.security import require_admin
+from app.services import export
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/export/{kind}")
+def export_feedback(
+    kind: Literal["summaries", "reviews"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Literal["finalised", "draft", "all"] = "finalised",
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    manager: Optional[str] = Query(None, description="Cycle manager's email"),
+    after: int = Query(0, ge=0, description="Resume after this id (the last row already received)"),
+):
+    """Stream every matching summary or review, in id order.
+
+    The response is chunked and read from a server-side cursor, so it can be
+    arbitrarily large. If a download is cut off, request again with `after`
+    set to the id of the last complete row. See app.services.export for the
+    filters.
+    """
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    params = export.export_params(since, until, status, manager, after)
+
+    def stream():
+        # The connection belongs to the stream, not the request: it is opened
+        # when the first chunk is wanted and closed after the last
+        conn = read_connection()
+        sent = after
+        try:
+            for chunk, checkpoint in export.encode_batches(export.export_rows(conn, kind, params), kind, format):
+                yield chunk
+                sent = checkpoint or sent
+        except Exception:
+            logger.exception(f"Export of {kind} failed after id {sent}; the response is truncated")
+            raise
+        finally:
+            conn.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=export.FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{kind}.{format}"',
+            "X-Accel-Buffering": "no",  # Stream through proxies instead of buffering the whole export
+        },
+    )
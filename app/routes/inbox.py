@@ -1,38 +1,74 @@
 """Reviewer inbox API routes."""
-from fastapi import APIRouter, Depends
+from typing import Literal, Optional
 
-from app.database import get_db
+from fastapi import APIRouter, Depends, Query, Response
+
+from app.database import get_read_db
+from app.review_tokens import TOKEN_PLACEHOLDER, fill_tokens
 from app.models import InboxItem
+from app.rate_limit import rate_limit
+from app.pagination import (
+    DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER,
+    cursor_params, cursor_sql, keyset_sql, next_cursor_sql, page_items_sql
+)
 
 router = APIRouter()
 
+# One page (plus one look-ahead row) of review requests for a reviewer email,
+# newest first, optionally only pending or only submitted. Walks
+# idx_reviewers_email_keyset, and joins only the rows on the page.
+INBOX_PAGE_SQL = f"""
+    SELECT r.id, r.cycle_id, r.relationship, r.frequency, r.created_at,
+           su.name AS employee_name,
+           EXISTS (SELECT 1 FROM reviews rev WHERE rev.reviewer_id = r.id) AS has_review,
+           {cursor_sql("r")} AS cursor
+    FROM (
+        SELECT r.* FROM reviewers r
+        WHERE r.email = %(email)s
+          AND {keyset_sql("r")}
+          AND (%(review_status)s::text IS NULL
+               OR (%(review_status)s::text = 'submitted') = EXISTS (
+                   SELECT 1 FROM reviews rev WHERE rev.reviewer_id = r.id))
+        ORDER BY r.created_at DESC, r.id DESC
+        LIMIT %(limit)s + 1
+    ) r
+    JOIN feedback_cycles fc ON r.cycle_id = fc.id
+    JOIN users su ON fc.subject_user_id = su.id
+"""
+
+# InboxItem as JSON, built from a row of INBOX_PAGE_SQL aliased p. The token is a
+# placeholder that review_tokens.fill_tokens() signs before the JSON is returned.
+INBOX_ITEM_JSON = f"""json_build_object(
+    'employee_name', p.employee_name, 'cycle_id', p.cycle_id,
+    'relationship', p.relationship, 'frequency', p.frequency, 'token', '{TOKEN_PLACEHOLDER}' || p.id,
+    'status', CASE WHEN p.has_review THEN 'submitted' ELSE 'pending' END
+)"""
+
+INBOX_SQL = f"""
+WITH page AS ({INBOX_PAGE_SQL})
+SELECT {page_items_sql("page", INBOX_ITEM_JSON)}::text AS items,
+       {next_cursor_sql("page")} AS next_cursor
+"""
 
-@router.get("/inbox/{email}", response_model=list[InboxItem])
-def get_inbox(email: str, db=Depends(get_db)):
-    """List all pending and submitted reviews for a reviewer email."""
+
+@router.get("/inbox/{email}", response_model=list[InboxItem], dependencies=[Depends(rate_limit("read"))])
+def get_inbox(
+    email: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    status: Optional[Literal["pending", "submitted"]] = None,
+    db=Depends(get_read_db),
+):
+    """List a page of pending and submitted reviews for a reviewer email.
+
+    The cursor for the next page, if any, is in the X-Next-Cursor header.
+    """
     cur = db.cursor()
 
-    cur.execute(
-        """SELECT r.id, r.cycle_id, r.relationship, r.frequency, r.token,
-                  u.name as employee_name,
-                  (SELECT COUNT(*) FROM reviews WHERE reviewer_id = r.id) as has_review
-           FROM reviewers r
-           JOIN feedback_cycles fc ON r.cycle_id = fc.id
-           JOIN users u ON fc.subject_user_id = u.id
-           WHERE r.email = %s
-           ORDER BY r.created_at DESC""",
-        (email,)
-    )
-    rows = cur.fetchall()
-
-    return [
-        InboxItem(
-            employee_name=row["employee_name"],
-            cycle_id=row["cycle_id"],
-            relationship=row["relationship"],
-            frequency=row["frequency"],
-            token=row["token"],
-            status="submitted" if row["has_review"] > 0 else "pending"
-        )
-        for row in rows
-    ]
+    cur.execute(INBOX_SQL, {
+        "email": email, "limit": limit, "review_status": status, **cursor_params(cursor)
+    })
+    row = cur.fetchone()
+
+    headers = {NEXT_CURSOR_HEADER: row["next_cursor"]} if row["next_cursor"] else None
+    return Response(content=fill_tokens(row["items"]), media_type="application/json", headers=headers)
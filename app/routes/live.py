@@ -0,0 +1,22 @@
+"""Server-Sent Events streams of live dashboard updates."""
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.live import cycle_topic, stream, user_topic
+
+router = APIRouter()
+
+# Disable proxy buffering so events are flushed as they happen
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get("/live/cycles/{cycle_id}")
+async def cycle_events(cycle_id: int):
+    """Stream review submissions and summary changes for one cycle."""
+    return StreamingResponse(stream((cycle_topic(cycle_id),)), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/live/users/{email}")
+async def user_events(email: str):
+    """Stream changes to the cycles and review requests on a user's dashboard and inbox."""
+    return StreamingResponse(stream((user_topic(email),)), media_type="text/event-stream", headers=SSE_HEADERS)
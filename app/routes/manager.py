@@ -1,153 +1,130 @@
 """Manager dashboard API routes."""
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
 
-from app.database import get_db
-from app.models import (
-    CycleResponse, ReviewerWithStatus, SummaryResponse,
-    SummaryUpdate, CycleDashboard, EmployeeResponse, ManagerDashboard
-)
-from app.services.summarisation import generate_summary
+from app.database import get_db, get_read_db, slugify
+from app.live import notify_cycle
+from app.models import SummaryResponse, SummaryUpdate, SummaryVersion, SummaryVersionInfo, SummaryDiff, ManagerDashboard
+from app.services.ai_governor import GovernorTimeout, PRIORITY_USER
+from app.services import analytics, summary_history
+from app.services.resilience import CircuitOpenError
+from app.services.summarisation import find_themes, generate_summary, stored_themes
 
 router = APIRouter()
 
+# Whole ManagerDashboard payload for one cycle as a single JSON document.
+# {target} is a query yielding the cycle id; keys match the ManagerDashboard
+# model (including the legacy "employee" wrapper the frontend still reads).
+_MANAGER_DASHBOARD_TEMPLATE = """
+WITH target AS (
+    {target}
+),
+reviewer_rows AS (
+    SELECT r.id, r.name, r.email, r.relationship, r.frequency, r.created_at,
+           EXISTS (SELECT 1 FROM reviews rev WHERE rev.reviewer_id = r.id) AS has_review
+    FROM reviewers r
+    WHERE r.cycle_id = (SELECT id FROM target)
+)
+SELECT json_build_object(
+    'employee', json_build_object(
+        'id', fc.id, 'name', u.name, 'email', u.email, 'created_at', fc.created_at
+    ),
+    'subject_email', u.email,
+    'manager_name', m.name,
+    'manager_email', m.email,
+    'reviewers', COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', rr.id, 'name', rr.name, 'email', rr.email,
+            'relationship', rr.relationship, 'frequency', rr.frequency,
+            'status', CASE WHEN rr.has_review THEN 'submitted' ELSE 'pending' END
+        ) ORDER BY rr.created_at)
+        FROM reviewer_rows rr
+    ), '[]'::json),
+    'summary', (
+        SELECT json_build_object(
+            'id', s.id, 'cycle_id', s.cycle_id, 'content', s.content,
+            'weighting_explanation', s.weighting_explanation,
+            'finalised', COALESCE(s.finalised, FALSE), 'finalised_at', s.finalised_at,
+            'updated_at', s.updated_at, 'version', s.version, 'themes', s.themes
+        )
+        FROM summaries s
+        WHERE s.cycle_id = fc.id
+    ),
+    'submitted_count', (SELECT COUNT(*) FROM reviewer_rows WHERE has_review),
+    'total_reviewers', (SELECT COUNT(*) FROM reviewer_rows)
+)::text AS dashboard
+FROM target
+JOIN feedback_cycles fc ON fc.id = target.id
+JOIN users u ON fc.subject_user_id = u.id
+LEFT JOIN users m ON fc.manager_user_id = m.id
+"""
+
+# Lookup by cycle id
+MANAGER_DASHBOARD_BY_ID_SQL = _MANAGER_DASHBOARD_TEMPLATE.format(
+    target="SELECT id FROM feedback_cycles WHERE id = %(cycle_id)s"
+)
+
+# Lookup by subject name or slug: the most recent cycle for that subject.
+# An exact name wins over a slug match, since slugs collide ("José" and
+# "Jose"). Uses idx_users_name, idx_users_slug and
+# idx_feedback_cycles_subject_keyset (top-1 per subject).
+MANAGER_DASHBOARD_BY_SLUG_SQL = _MANAGER_DASHBOARD_TEMPLATE.format(
+    target="""SELECT latest.id
+    FROM users su
+    CROSS JOIN LATERAL (
+        SELECT id, created_at FROM feedback_cycles
+        WHERE subject_user_id = su.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) latest
+    WHERE su.name = %(name)s OR su.slug = %(slug)s
+    ORDER BY su.name = %(name)s DESC, latest.created_at DESC
+    LIMIT 1"""
+)
+
 
 @router.get("/manager/{cycle_identifier}", response_model=ManagerDashboard)
-def get_manager_dashboard(cycle_identifier: str, db=Depends(get_db)):
+def get_manager_dashboard(cycle_identifier: str, db=Depends(get_read_db)):
     """Get manager dashboard with reviewers, statuses, and summary.
 
     Supports lookup by:
     - Cycle ID (integer)
-    - Subject user name (string)
+    - Subject user name or slug (string, e.g. "Alex Chen" or "alex-chen"),
+      resolving to their most recent cycle; an exact name match wins
+
+    Either way the payload is built by one statement and returned as-is.
     """
     cur = db.cursor()
 
-    # Try as integer ID first
     try:
         cycle_id = int(cycle_identifier)
-        cur.execute(
-            """SELECT fc.*, u.name as subject_name, u.email as subject_email,
-                      m.name as manager_name, m.email as manager_email
-               FROM feedback_cycles fc
-               JOIN users u ON fc.subject_user_id = u.id
-               LEFT JOIN users m ON fc.manager_user_id = m.id
-               WHERE fc.id = %s""",
-            (cycle_id,)
-        )
-        cycle = cur.fetchone()
+        cur.execute(MANAGER_DASHBOARD_BY_ID_SQL, {"cycle_id": cycle_id})
     except ValueError:
-        # Not an integer, try name lookup (finds most recent cycle for that person)
-        cur.execute(
-            """SELECT fc.*, u.name as subject_name, u.email as subject_email,
-                      m.name as manager_name, m.email as manager_email
-               FROM feedback_cycles fc
-               JOIN users u ON fc.subject_user_id = u.id
-               LEFT JOIN users m ON fc.manager_user_id = m.id
-               WHERE u.name = %s
-               ORDER BY fc.created_at DESC
-               LIMIT 1""",
-            (cycle_identifier,)
-        )
-        cycle = cur.fetchone()
+        # A name with no ASCII letters or digits has an empty slug, shared with
+        # every other such name: only an exact name match can find it
+        slug = slugify(cycle_identifier) or None
+        cur.execute(MANAGER_DASHBOARD_BY_SLUG_SQL, {"name": cycle_identifier, "slug": slug})
+    row = cur.fetchone()
 
-    if not cycle:
+    if not row:
         raise HTTPException(status_code=404, detail="Feedback cycle not found")
 
-    cycle_id = cycle["id"]
-
-    # Get reviewers with status
-    cur.execute(
-        """SELECT r.id, r.name, r.email, r.relationship, r.frequency,
-                  (SELECT COUNT(*) FROM reviews WHERE reviewer_id = r.id) as has_review
-           FROM reviewers r
-           WHERE r.cycle_id = %s
-           ORDER BY r.created_at""",
-        (cycle_id,)
-    )
-    reviewers = cur.fetchall()
-
-    reviewers_list = [
-        ReviewerWithStatus(
-            id=r["id"],
-            name=r["name"],
-            email=r["email"],
-            relationship=r["relationship"],
-            frequency=r["frequency"],
-            status="submitted" if r["has_review"] > 0 else "pending"
-        )
-        for r in reviewers
-    ]
-
-    submitted_count = sum(1 for r in reviewers_list if r.status == "submitted")
-
-    # Get summary if exists
-    cur.execute("SELECT * FROM summaries WHERE cycle_id = %s", (cycle_id,))
-    summary = cur.fetchone()
-
-    summary_response = None
-    if summary:
-        summary_response = SummaryResponse(
-            id=summary["id"],
-            cycle_id=summary["cycle_id"],
-            content=summary["content"],
-            weighting_explanation=summary["weighting_explanation"],
-            finalised=bool(summary["finalised"]),
-            finalised_at=summary["finalised_at"],
-            updated_at=summary["updated_at"]
-        )
-
-    # Return legacy format for compatibility
-    return ManagerDashboard(
-        employee=EmployeeResponse(
-            id=cycle["id"],  # Use cycle ID as employee ID for compatibility
-            name=cycle["subject_name"],
-            email=cycle["subject_email"],
-            created_at=cycle["created_at"]
-        ),
-        subject_email=cycle["subject_email"],
-        manager_name=cycle.get("manager_name"),
-        manager_email=cycle.get("manager_email"),
-        reviewers=reviewers_list,
-        summary=summary_response,
-        submitted_count=submitted_count,
-        total_reviewers=len(reviewers_list)
-    )
+    return Response(content=row["dashboard"], media_type="application/json")
 
 
 @router.put("/manager/{cycle_id}/summary", response_model=SummaryResponse)
 def update_summary(cycle_id: int, update: SummaryUpdate, db=Depends(get_db)):
-    """Edit summary content."""
+    """Edit summary content (recorded as a new version)."""
     cur = db.cursor()
 
-    # Check if summary exists
-    cur.execute("SELECT * FROM summaries WHERE cycle_id = %s", (cycle_id,))
-    summary = cur.fetchone()
-
-    if not summary:
-        raise HTTPException(status_code=404, detail="Summary not found")
-
-    if summary["finalised"]:
-        raise HTTPException(status_code=400, detail="Summary is finalised and cannot be edited")
+    row = summary_history.edit_summary(cur, cycle_id, update.content)
+    if not row:
+        _raise_not_writable(cur, cycle_id, "edited")
 
-    # Update summary
-    cur.execute(
-        "UPDATE summaries SET content = %s, updated_at = %s WHERE cycle_id = %s",
-        (update.content, datetime.now(), cycle_id)
-    )
+    notify_cycle(cur, "summary_updated", cycle_id)
     db.commit()
 
-    cur.execute("SELECT * FROM summaries WHERE cycle_id = %s", (cycle_id,))
-    row = cur.fetchone()
-
-    return SummaryResponse(
-        id=row["id"],
-        cycle_id=row["cycle_id"],
-        content=row["content"],
-        weighting_explanation=row["weighting_explanation"],
-        finalised=bool(row["finalised"]),
-        finalised_at=row["finalised_at"],
-        updated_at=row["updated_at"]
-    )
+    return _summary_response(row)
 
 
 @router.post("/manager/{cycle_id}/generate", response_model=SummaryResponse)
@@ -181,7 +158,7 @@ def generate_summary_endpoint(cycle_id: int, db=Depends(get_db)):
 
 @router.post("/manager/{cycle_id}/regenerate", response_model=SummaryResponse)
 def regenerate_summary(cycle_id: int, db=Depends(get_db)):
-    """Regenerate AI summary (replaces existing)."""
+    """Regenerate AI summary (becomes the new current version; earlier ones stay in the history)."""
     cur = db.cursor()
 
     # Check cycle exists
@@ -197,18 +174,14 @@ def regenerate_summary(cycle_id: int, db=Depends(get_db)):
     if not cycle:
         raise HTTPException(status_code=404, detail="Feedback cycle not found")
 
-    # Check if finalised
+    # Fail fast before the AI call; the upsert re-checks atomically
     cur.execute("SELECT finalised FROM summaries WHERE cycle_id = %s", (cycle_id,))
     summary = cur.fetchone()
 
     if summary and summary["finalised"]:
         raise HTTPException(status_code=400, detail="Summary is finalised and cannot be regenerated")
 
-    # Delete existing summary if present
-    cur.execute("DELETE FROM summaries WHERE cycle_id = %s", (cycle_id,))
-    db.commit()
-
-    # Generate new summary
+    # The current summary stays in place until the new one is saved
     return _generate_and_save_summary(cycle_id, cycle["subject_name"], db)
 
 
@@ -217,25 +190,94 @@ def finalise_summary(cycle_id: int, db=Depends(get_db)):
     """Lock summary - no further editing allowed."""
     cur = db.cursor()
 
-    cur.execute("SELECT * FROM summaries WHERE cycle_id = %s", (cycle_id,))
-    summary = cur.fetchone()
+    row = summary_history.finalise_summary(cur, cycle_id)
+    if not row:
+        cur.execute("SELECT 1 FROM summaries WHERE cycle_id = %s", (cycle_id,))
+        if not cur.fetchone():
+            raise HTTPException(status_code=404, detail="Summary not found")
+        raise HTTPException(status_code=400, detail="Summary is already finalised")
 
-    if not summary:
-        raise HTTPException(status_code=404, detail="Summary not found")
+    analytics.record_summary_finalised(cur, cycle_id)
+    notify_cycle(cur, "summary_finalised", cycle_id)
+    db.commit()
 
-    if summary["finalised"]:
-        raise HTTPException(status_code=400, detail="Summary is already finalised")
+    return _summary_response(row)
 
-    now = datetime.now()
-    cur.execute(
-        "UPDATE summaries SET finalised = TRUE, finalised_at = %s, updated_at = %s WHERE cycle_id = %s",
-        (now, now, cycle_id)
+
+@router.get("/manager/{cycle_id}/summary/versions", response_model=list[SummaryVersionInfo])
+def list_summary_versions(cycle_id: int, db=Depends(get_read_db)):
+    """Every version of a cycle's summary, newest first (without content)."""
+    return summary_history.list_versions(db.cursor(), cycle_id)
+
+
+@router.get("/manager/{cycle_id}/summary/versions/{version}", response_model=SummaryVersion)
+def get_summary_version(cycle_id: int, version: int, db=Depends(get_read_db)):
+    """One version of a cycle's summary, with its content."""
+    row = summary_history.get_version(db.cursor(), cycle_id, version)
+    if not row:
+        raise HTTPException(status_code=404, detail="Summary version not found")
+    return row
+
+
+@router.get("/manager/{cycle_id}/summary/diff", response_model=SummaryDiff)
+def diff_summary_versions(
+    cycle_id: int,
+    from_version: Optional[int] = Query(None, description="Defaults to the latest AI-generated version"),
+    to_version: Optional[int] = Query(None, description="Defaults to the current version"),
+    db=Depends(get_read_db),
+):
+    """Unified diff between two versions, by default the latest AI output against the current text."""
+    cur = db.cursor()
+
+    if to_version is None:
+        cur.execute("SELECT version FROM summaries WHERE cycle_id = %s", (cycle_id,))
+        current = cur.fetchone()
+        if not current:
+            raise HTTPException(status_code=404, detail="Summary not found")
+        to_version = current["version"]
+    if from_version is None:
+        from_version = summary_history.latest_ai_version(cur, cycle_id) or max(to_version - 1, 1)
+
+    old = summary_history.get_version(cur, cycle_id, from_version)
+    new = summary_history.get_version(cur, cycle_id, to_version)
+    if not old or not new:
+        raise HTTPException(status_code=404, detail="Summary version not found")
+
+    return SummaryDiff(
+        from_version=old["version"],
+        from_source=old["source"],
+        to_version=new["version"],
+        to_source=new["source"],
+        diff=summary_history.diff_versions(old, new),
     )
+
+
+@router.post("/manager/{cycle_id}/summary/versions/{version}/restore", response_model=SummaryResponse)
+def restore_summary_version(cycle_id: int, version: int, db=Depends(get_db)):
+    """Make an earlier version current again (recorded as a new version)."""
+    cur = db.cursor()
+
+    row = summary_history.restore_version(cur, cycle_id, version)
+    if not row:
+        if not summary_history.get_version(cur, cycle_id, version):
+            raise HTTPException(status_code=404, detail="Summary version not found")
+        _raise_not_writable(cur, cycle_id, "restored")
+
+    notify_cycle(cur, "summary_updated", cycle_id)
     db.commit()
 
-    cur.execute("SELECT * FROM summaries WHERE cycle_id = %s", (cycle_id,))
-    row = cur.fetchone()
+    return _summary_response(row)
+
+
+def _raise_not_writable(cur, cycle_id: int, action: str):
+    """404 or 400 for a summary write that matched no row."""
+    cur.execute("SELECT finalised FROM summaries WHERE cycle_id = %s", (cycle_id,))
+    if not cur.fetchone():
+        raise HTTPException(status_code=404, detail="Summary not found")
+    raise HTTPException(status_code=400, detail=f"Summary is finalised and cannot be {action}")
+
 
+def _summary_response(row: dict) -> SummaryResponse:
     return SummaryResponse(
         id=row["id"],
         cycle_id=row["cycle_id"],
@@ -243,7 +285,9 @@ def finalise_summary(cycle_id: int, db=Depends(get_db)):
         weighting_explanation=row["weighting_explanation"],
         finalised=bool(row["finalised"]),
         finalised_at=row["finalised_at"],
-        updated_at=row["updated_at"]
+        updated_at=row["updated_at"],
+        version=row["version"],
+        themes=row.get("themes")
     )
 
 
@@ -267,28 +311,36 @@ def _generate_and_save_summary(cycle_id: int, subject_name: str, db) -> SummaryR
             detail="At least 2 reviews are required to generate a summary"
         )
 
-    # Generate summary using AI service
-    content, weighting_explanation = generate_summary(
-        employee_name=subject_name,
-        reviews=[dict(r) for r in reviews]
-    )
+    # Generate summary using AI service, with recurring themes found locally first
+    reviews = [dict(r) for r in reviews]
+    themes = find_themes(subject_name, reviews)
+    try:
+        content, weighting_explanation = generate_summary(
+            employee_name=subject_name,
+            reviews=reviews,
+            priority=PRIORITY_USER,
+            themes=themes
+        )
+    except GovernorTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Summary service busy, please try again",
+            headers={"Retry-After": "10"}
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Summary service unavailable",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
 
-    # Save to database
-    now = datetime.now()
-    cur.execute(
-        """INSERT INTO summaries (cycle_id, content, weighting_explanation, updated_at)
-           VALUES (%s, %s, %s, %s) RETURNING *""",
-        (cycle_id, content, weighting_explanation, now)
+    # Save to database (a summary finalised while we were generating is left alone)
+    row = summary_history.save_summary(
+        cur, cycle_id, content, weighting_explanation, themes=stored_themes(themes, reviews)
     )
-    row = cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=400, detail="Summary is finalised and cannot be regenerated")
+    notify_cycle(cur, "summary_updated", cycle_id)
     db.commit()
 
-    return SummaryResponse(
-        id=row["id"],
-        cycle_id=row["cycle_id"],
-        content=row["content"],
-        weighting_explanation=row["weighting_explanation"],
-        finalised=bool(row["finalised"]),
-        finalised_at=row["finalised_at"],
-        updated_at=row["updated_at"]
-    )
+    return _summary_response(row)
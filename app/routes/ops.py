@@ -0,0 +1,33 @@
+"""Operational status API routes (admin only)."""
+from fastapi import APIRouter, Depends
+
+from app.database import replica_stats, slow_queries
+from app.security import require_admin
+from app.services.ai_governor import governor_stats
+from app.services.resilience import breaker_stats
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/ops/ai-governor")
+def get_ai_governor_stats():
+    """Queue depth, in-flight calls and recent wait times per AI provider/model."""
+    return governor_stats()
+
+
+@router.get("/ops/ai-circuits")
+def get_ai_circuit_stats():
+    """Circuit breaker state per AI provider/model."""
+    return breaker_stats()
+
+
+@router.get("/ops/slow-queries")
+def get_slow_queries():
+    """Recent slow statements with their captured EXPLAIN (ANALYZE, BUFFERS) plans (literals masked)."""
+    return slow_queries()
+
+
+@router.get("/ops/replicas")
+def get_replica_stats():
+    """Read replica health and lag as of each replica's last check."""
+    return replica_stats()
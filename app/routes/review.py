@@ -1,12 +1,20 @@
 """Review submission API routes."""
-import io
 import json
 import os
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
-
-from app.database import get_db
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+
+from app import idempotency, review_tokens, tracing
+from app.database import get_db, get_read_db
+from app.live import notify_cycle
+from app.rate_limit import rate_limit
 from app.models import ReviewContext, ReviewSubmit, ReviewResponse
-from app.services.summarisation import regenerate_summary_for_cycle
+from app.services import analytics, cassettes
+from app.services.ai_governor import GovernorTimeout, PRIORITY_INTERACTIVE
+from app.services.providers import create_message, transcribe_audio
+from app.services.resilience import CircuitOpenError
+from app.services.summarisation import schedule_summary_regeneration
 
 router = APIRouter()
 
@@ -138,19 +146,23 @@ Return valid JSON only, no explanation.
 }}"""
 
 
-@router.get("/review/{token}", response_model=ReviewContext)
-def get_review_context(token: str, db=Depends(get_db)):
+@router.get("/review/{token}", response_model=ReviewContext, dependencies=[Depends(rate_limit("read"))])
+def get_review_context(
+    token: str,
+    reviewer_match: dict = Depends(review_tokens.require_token),
+    db=Depends(get_read_db)
+):
     """Get context for a review form (employee name, relationship)."""
     cur = db.cursor()
 
     cur.execute(
-        """SELECT r.name as reviewer_name, r.relationship, r.id as reviewer_id,
+        f"""SELECT r.name as reviewer_name, r.relationship, r.id as reviewer_id,
                   u.name as employee_name
            FROM reviewers r
            JOIN feedback_cycles fc ON r.cycle_id = fc.id
            JOIN users u ON fc.subject_user_id = u.id
-           WHERE r.token = %s""",
-        (token,)
+           WHERE {review_tokens.REVIEWER_MATCH_SQL}""",
+        reviewer_match
     )
     row = cur.fetchone()
 
@@ -172,49 +184,63 @@ def get_review_context(token: str, db=Depends(get_db)):
     )
 
 
-@router.post("/review/{token}", response_model=ReviewResponse)
+# Insert a review unless the reviewer already has one (uq_reviews_reviewer), as one
+# statement. No row: unknown token. Row with a NULL id: already submitted.
+SUBMIT_REVIEW_SQL = f"""
+WITH reviewer AS (
+    SELECT r.id, r.cycle_id, r.email FROM reviewers r WHERE {review_tokens.REVIEWER_MATCH_SQL}
+),
+inserted AS (
+    INSERT INTO reviews (reviewer_id, start_doing, stop_doing, continue_doing, example, additional)
+    SELECT id, %(start_doing)s, %(stop_doing)s, %(continue_doing)s, %(example)s, %(additional)s FROM reviewer
+    ON CONFLICT (reviewer_id) DO NOTHING
+    RETURNING *
+)
+SELECT reviewer.cycle_id, reviewer.email, inserted.*
+FROM reviewer
+LEFT JOIN inserted ON inserted.reviewer_id = reviewer.id
+"""
+
+
+def _idempotency_scope(reviewer_match: dict) -> str:
+    """Idempotency scope for a review link: the reviewer (or a legacy token's digest), never the token."""
+    if reviewer_match["reviewer_id"] is not None:
+        return f"review:reviewer:{reviewer_match['reviewer_id']}"
+    return f"review:digest:{reviewer_match['token_digest'].hex()}"
+
+
+@router.post("/review/{token}", response_model=ReviewResponse, dependencies=[Depends(rate_limit("submit"))])
 def submit_review(
     token: str,
     review: ReviewSubmit,
     background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, description="Reuse on retries to get the original response back"),
+    reviewer_match: dict = Depends(review_tokens.require_token),
     db=Depends(get_db)
 ):
-    """Submit feedback for a review."""
+    """Submit feedback for a review.
+
+    Retries with the same Idempotency-Key replay the first response; without
+    one, a second submission is rejected. Either way only one review is
+    stored and one summary regeneration scheduled.
+    """
     cur = db.cursor()
 
-    # Get reviewer info including cycle_id for background task
-    cur.execute(
-        "SELECT id, cycle_id FROM reviewers WHERE token = %s",
-        (token,)
-    )
-    reviewer = cur.fetchone()
+    scope = _idempotency_scope(reviewer_match)
+    replay = idempotency.claim(cur, scope, idempotency_key, idempotency.request_hash(review.model_dump_json()))
+    if replay is not None:
+        return replay
 
-    if not reviewer:
-        raise HTTPException(status_code=404, detail="Invalid review link")
+    cur.execute(SUBMIT_REVIEW_SQL, {**reviewer_match, **review.model_dump()})
+    row = cur.fetchone()
 
-    # Check if already submitted
-    cur.execute(
-        "SELECT id FROM reviews WHERE reviewer_id = %s",
-        (reviewer["id"],)
-    )
-    existing = cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Invalid review link")
 
-    if existing:
+    if row["id"] is None:
         raise HTTPException(status_code=400, detail="Feedback already submitted")
 
-    # Insert review
-    cur.execute(
-        """INSERT INTO reviews (reviewer_id, start_doing, stop_doing, continue_doing, example, additional)
-           VALUES (%s, %s, %s, %s, %s, %s) RETURNING *""",
-        (reviewer["id"], review.start_doing, review.stop_doing, review.continue_doing, review.example, review.additional)
-    )
-    row = cur.fetchone()
-    db.commit()
-
-    # Trigger summary regeneration in background
-    background_tasks.add_task(regenerate_summary_for_cycle, reviewer["cycle_id"])
-
-    return ReviewResponse(
+    response = ReviewResponse(
         id=row["id"],
         reviewer_id=row["reviewer_id"],
         start_doing=row["start_doing"],
@@ -224,13 +250,27 @@ def submit_review(
         additional=row["additional"],
         submitted_at=row["submitted_at"]
     )
+    idempotency.store(cur, scope, idempotency_key, 200, response.model_dump_json())
+    analytics.record_review_submitted(cur, row["cycle_id"], row["reviewer_id"])
+    notify_cycle(cur, "review_submitted", row["cycle_id"], email=row["email"])
+    db.commit()
+
+    # Trigger summary regeneration in background
+    span = tracing.current_span()
+    if span is not None:
+        span.set_attribute("cycle_id", row["cycle_id"])
+        span.set_attribute("review_id", row["id"])
+    schedule_summary_regeneration(background_tasks, row["cycle_id"], review_id=row["id"])
 
+    return response
 
-@router.post("/review/{token}/voice-transcribe")
+
+@router.post("/review/{token}/voice-transcribe", dependencies=[Depends(rate_limit("voice"))])
 async def transcribe_voice_feedback(
     token: str,
     audio_file: UploadFile = File(...),
     field_name: str = Form(None),
+    reviewer_match: dict = Depends(review_tokens.require_token),
     db=Depends(get_db)
 ):
     """Transcribe and structure voice feedback using Whisper and Claude."""
@@ -238,8 +278,8 @@ async def transcribe_voice_feedback(
 
     # Validate token exists and review not already submitted
     cur.execute(
-        "SELECT id, cycle_id FROM reviewers WHERE token = %s",
-        (token,)
+        f"SELECT r.id, r.cycle_id FROM reviewers r WHERE {review_tokens.REVIEWER_MATCH_SQL}",
+        reviewer_match
     )
     reviewer = cur.fetchone()
 
@@ -261,27 +301,34 @@ async def transcribe_voice_feedback(
     if len(contents) > 10 * 1024 * 1024:  # 10MB
         raise HTTPException(status_code=400, detail="File too large")
 
-    # Prepare audio buffer
-    audio_buffer = io.BytesIO(contents)
-    audio_buffer.name = audio_file.filename or "recording.webm"
+    audio_filename = audio_file.filename or "recording.webm"
 
     # Transcribe with Whisper API (direct HTTP call - Vercel compatible)
     import httpx
 
     openai_api_key = os.environ.get("OPENAI_API_KEY")
-    if not openai_api_key:
+    if not openai_api_key and cassettes.MODE != "replay":
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                'https://api.openai.com/v1/audio/transcriptions',
-                headers={'Authorization': f'Bearer {openai_api_key}'},
-                files={'file': (audio_buffer.name, audio_buffer, 'audio/webm')},
-                data={'model': 'whisper-1', 'response_format': 'text'}
-            )
-            response.raise_for_status()
-            transcript = response.text.strip()
+        transcript = await transcribe_audio(
+            audio_filename, contents, openai_api_key,
+            priority=PRIORITY_INTERACTIVE, hedge=True
+        )
+
+    except GovernorTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription service busy, please try again",
+            headers={"Retry-After": "5"}
+        )
+
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription service unavailable",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
 
     except httpx.HTTPStatusError as e:
         status = e.response.status_code
@@ -309,35 +356,54 @@ async def transcribe_voice_feedback(
             detail="No speech detected. Please speak clearly and try again."
         )
 
-    # Structure with Claude Haiku
-    from anthropic import Anthropic
-    anthropic_client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    # Structure with Claude Haiku (off the event loop, queued behind the governor)
+    if field_name and field_name not in FIELD_EXTRACTION_PROMPTS:
+        raise HTTPException(status_code=400, detail=f"Invalid field name: {field_name}")
 
     try:
         if field_name:
             # Per-field extraction
-            if field_name not in FIELD_EXTRACTION_PROMPTS:
-                raise HTTPException(status_code=400, detail=f"Invalid field name: {field_name}")
-
             prompt = FIELD_EXTRACTION_PROMPTS[field_name].format(transcript=transcript)
-            structured = anthropic_client.messages.create(
+            structured = await run_in_threadpool(
+                create_message,
                 model="claude-3-haiku-20240307",
+                prompt=prompt,
                 max_tokens=1024,  # Increased for detailed 2-5 sentence responses
                 temperature=EXTRACTION_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}]
+                priority=PRIORITY_INTERACTIVE,
+                hedge=True,
+                replay_key=cassettes.fingerprint("extract", field_name, transcript)
             )
             field_value = structured.content[0].text.strip()
             return {"field_value": field_value}
         else:
             # Legacy: Extract all fields (backwards compatible)
-            structured = anthropic_client.messages.create(
+            structured = await run_in_threadpool(
+                create_message,
                 model="claude-3-haiku-20240307",
+                prompt=EXTRACTION_PROMPT.format(transcript=transcript),
                 max_tokens=1024,
                 temperature=EXTRACTION_TEMPERATURE,
-                messages=[{"role": "user", "content": EXTRACTION_PROMPT.format(transcript=transcript)}]
+                priority=PRIORITY_INTERACTIVE,
+                hedge=True,
+                replay_key=cassettes.fingerprint("extract", transcript)
             )
             fields = json.loads(structured.content[0].text)
             return fields
 
+    except GovernorTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Feedback processing busy, please try again",
+            headers={"Retry-After": "5"}
+        )
+
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Feedback processing unavailable",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Processing failed: {str(e)}")
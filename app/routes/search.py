@@ -0,0 +1,167 @@
+"""Full-text search over reviews and summaries.
+
+Documents are the generated `search_vector` columns on reviews and summaries
+(see init_db), each behind a GIN index. Matches are ranked with ts_rank, and
+only the rows on the returned page get highlighted snippets, since
+ts_headline re-parses the text.
+
+Search covers every cycle, so it needs the admin token (HR). Scoping it to
+the cycles someone manages waits for real sign-in: an X-User-Email header is
+only a claim, and would let anyone read snippets of raw reviews. Reviews are
+returned without the reviewer's name or email.
+"""
+import html
+from datetime import date, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.database import get_read_db
+from app.models import SearchHit
+from app.pagination import DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER
+from app.security import require_admin
+
+router = APIRouter()
+
+SEARCH_CONFIG = "english"
+REVIEW_FIELDS = ("start_doing", "stop_doing", "continue_doing", "example", "additional")
+
+# ts_headline marks matches with these; they are swapped for <mark> after escaping
+_START, _STOP = "\ue000", "\ue001"  # Private-use characters, never in typed text
+HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def _headline(column: str) -> str:
+    """Snippet for one field, or NULL when the query does not match that field."""
+    return (
+        f"CASE WHEN to_tsvector('{SEARCH_CONFIG}', coalesce({column}, '')) @@ query.tsq "
+        f"THEN ts_headline('{SEARCH_CONFIG}', {column}, query.tsq, %(headline_options)s) END"
+    )
+
+
+# One page (plus one look-ahead row) of matches, best first. Keyset on
+# (rank, kind, id), so later pages do not re-rank what was already returned.
+SEARCH_SQL = f"""
+WITH query AS (
+    SELECT websearch_to_tsquery('{SEARCH_CONFIG}', %(q)s) AS tsq
+),
+hits AS (
+    SELECT 'review' AS kind, rv.id, r.cycle_id, r.relationship, rv.submitted_at AS at,
+           ts_rank(rv.search_vector, query.tsq) AS rank
+    FROM query, reviews rv
+    JOIN reviewers r ON r.id = rv.reviewer_id
+    WHERE %(include_reviews)s
+      AND rv.search_vector @@ query.tsq
+      AND (%(since)s::date IS NULL OR rv.submitted_at >= %(since)s::date)
+      AND (%(until)s::date IS NULL OR rv.submitted_at < %(until)s::date)
+    UNION ALL
+    SELECT 'summary', s.id, s.cycle_id, NULL, s.updated_at,
+           ts_rank(s.search_vector, query.tsq)
+    FROM query, summaries s
+    WHERE %(include_summaries)s
+      AND s.search_vector @@ query.tsq
+      AND (%(since)s::date IS NULL OR s.updated_at >= %(since)s::date)
+      AND (%(until)s::date IS NULL OR s.updated_at < %(until)s::date)
+),
+page AS (
+    SELECT * FROM hits
+    WHERE %(after_rank)s::real IS NULL
+       OR (rank, kind, id) < (%(after_rank)s::real, %(after_kind)s::text, %(after_id)s::int)
+    ORDER BY rank DESC, kind DESC, id DESC
+    LIMIT %(limit)s + 1
+)
+SELECT page.kind, page.id, page.cycle_id, page.relationship, page.at, page.rank,
+       fc.title AS cycle_title, su.name AS subject_name,
+       {", ".join(f"{_headline('rv.' + field)} AS {field}" for field in REVIEW_FIELDS)},
+       {_headline('s.content')} AS content
+FROM page
+CROSS JOIN query
+JOIN feedback_cycles fc ON fc.id = page.cycle_id
+JOIN users su ON su.id = fc.subject_user_id
+LEFT JOIN reviews rv ON page.kind = 'review' AND rv.id = page.id
+LEFT JOIN summaries s ON page.kind = 'summary' AND s.id = page.id
+ORDER BY page.rank DESC, page.kind DESC, page.id DESC
+"""
+
+
+def _highlight(snippet: str) -> str:
+    """HTML-escape a snippet (it is user-written text) and mark the matched terms."""
+    return html.escape(snippet).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def _encode_cursor(row: dict) -> str:
+    return f"{row['rank']!r}_{row['kind']}_{row['id']}"
+
+
+def _cursor_params(cursor: Optional[str]) -> dict:
+    if not cursor:
+        return {"after_rank": None, "after_kind": None, "after_id": None}
+    try:
+        rank, kind, row_id = cursor.split("_")
+        if kind not in ("review", "summary"):
+            raise ValueError(kind)
+        return {"after_rank": float(rank), "after_kind": kind, "after_id": int(row_id)}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def search_params(q: str, kind: Optional[str] = None, since: Optional[date] = None, until: Optional[date] = None,
+                  limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None) -> dict:
+    """Parameters for SEARCH_SQL; until is inclusive."""
+    return {
+        "q": q,
+        "include_reviews": kind in (None, "review"),
+        "include_summaries": kind in (None, "summary"),
+        "since": since,
+        "until": until + timedelta(days=1) if until else None,
+        "limit": limit,
+        "headline_options": HEADLINE_OPTIONS,
+        **_cursor_params(cursor),
+    }
+
+
+# require_admin runs before get_read_db, so a refused request never opens a connection
+@router.get("/search", response_model=list[SearchHit], dependencies=[Depends(require_admin)])
+def search(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200, description='Web-search syntax: words, "quoted phrases", OR, -exclude'),
+    kind: Optional[Literal["review", "summary"]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db=Depends(get_read_db),
+):
+    """Search reviews and summaries of every cycle (admin token), best matches first.
+
+    since/until bound the submission (or last update) date, inclusive. Each
+    hit's `highlights` holds an HTML snippet per matching field, with matches
+    in <mark>. The cursor for the next page, if any, is in the X-Next-Cursor
+    header.
+    """
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+
+    cur = db.cursor()
+    cur.execute(SEARCH_SQL, search_params(q, kind=kind, since=since, until=until, limit=limit, cursor=cursor))
+    rows = cur.fetchall()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(rows[-1])
+
+    fields = REVIEW_FIELDS + ("content",)
+    return [
+        SearchHit(
+            kind=row["kind"],
+            id=row["id"],
+            cycle_id=row["cycle_id"],
+            cycle_title=row["cycle_title"],
+            subject_name=row["subject_name"],
+            relationship=row["relationship"],
+            date=row["at"],
+            rank=row["rank"],
+            highlights={field: _highlight(row[field]) for field in fields if row[field]},
+        )
+        for row in rows
+    ]
@@ -0,0 +1,203 @@
+"""Lean v2 JSON API.
+
+Read endpoints that serialise DB rows directly with FastJSONResponse instead
+of building per-row Pydantic models, support ?fields= sparse fieldsets, and
+drop the legacy compatibility shapes (the ManagerDashboard "employee" wrapper).
+Handlers return FastJSONResponse themselves, which also skips FastAPI's
+jsonable_encoder pass. Lists page by cursor, and the next cursor is in the body.
+"""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.database import get_read_db
+from app.pagination import DEFAULT_LIMIT, MAX_LIMIT, cursor_params, split_page
+from app.rate_limit import rate_limit
+from app.review_tokens import issue
+from app.routes.auth import CYCLES_PAGE_TEMPLATE
+from app.routes.inbox import INBOX_PAGE_SQL
+from app.serialization import FastJSONResponse, apply_fields, parse_fields, wants
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. id,title or reviewers.name"
+
+USER_FIELDS = dict.fromkeys(["id", "email", "name", "is_demo", "created_at"])
+
+INBOX_ITEM_FIELDS = dict.fromkeys([
+    "employee_name", "cycle_id", "relationship", "frequency", "token", "status", "created_at"
+])
+
+CYCLE_LIST_FIELDS = dict.fromkeys([
+    "id", "title", "status", "created_at", "subject_name", "manager_name",
+    "submitted_count", "total_reviewers"
+])
+
+REVIEWER_FIELDS = dict.fromkeys(["id", "name", "email", "relationship", "frequency", "status"])
+
+SUMMARY_FIELDS = dict.fromkeys([
+    "id", "cycle_id", "content", "weighting_explanation", "finalised", "finalised_at", "updated_at", "version"
+])
+
+CYCLE_FIELDS = {
+    **dict.fromkeys([
+        "id", "title", "status", "created_at",
+        "subject_user_id", "subject_name", "subject_email",
+        "manager_user_id", "manager_name", "manager_email",
+        "submitted_count", "total_reviewers",
+    ]),
+    "reviewers": REVIEWER_FIELDS,
+    "summary": SUMMARY_FIELDS,
+}
+
+# Inbox page rows in their v2 shape
+INBOX_SQL = f"""
+SELECT p.employee_name, p.cycle_id, p.relationship, p.frequency, p.id AS reviewer_id,
+       CASE WHEN p.has_review THEN 'submitted' ELSE 'pending' END AS status,
+       p.created_at, p.cursor
+FROM ({INBOX_PAGE_SQL}) p
+ORDER BY p.created_at DESC, p.id DESC
+"""
+
+# Cycles page rows for a user as subject or as manager
+_CYCLES_SQL_TEMPLATE = """
+WITH u AS (SELECT id FROM users WHERE email = %(email)s)
+SELECT p.id, p.title, p.status, p.created_at, p.subject_name, p.manager_name,
+       p.submitted_count, p.total_reviewers, p.cursor
+FROM ({page}) p
+ORDER BY p.created_at DESC, p.id DESC
+"""
+CYCLES_SQL = {
+    "subject": _CYCLES_SQL_TEMPLATE.format(page=CYCLES_PAGE_TEMPLATE.format(owner="subject_user_id")),
+    "manager": _CYCLES_SQL_TEMPLATE.format(page=CYCLES_PAGE_TEMPLATE.format(owner="manager_user_id")),
+}
+
+CYCLE_SQL = """
+SELECT fc.id, fc.title, fc.status, fc.created_at,
+       fc.subject_user_id, u.name AS subject_name, u.email AS subject_email,
+       fc.manager_user_id, m.name AS manager_name, m.email AS manager_email
+FROM feedback_cycles fc
+JOIN users u ON fc.subject_user_id = u.id
+LEFT JOIN users m ON fc.manager_user_id = m.id
+WHERE fc.id = %s
+"""
+
+REVIEWERS_SQL = """
+SELECT r.id, r.name, r.email, r.relationship, r.frequency,
+       CASE WHEN EXISTS (SELECT 1 FROM reviews rev WHERE rev.reviewer_id = r.id)
+            THEN 'submitted' ELSE 'pending' END AS status
+FROM reviewers r
+WHERE r.cycle_id = %s
+ORDER BY r.created_at
+"""
+
+# Current summary for a cycle (one per cycle, uq_summaries_cycle)
+SUMMARY_SQL = """
+SELECT id, cycle_id, content, weighting_explanation,
+       COALESCE(finalised, FALSE) AS finalised, finalised_at, updated_at, version
+FROM summaries
+WHERE cycle_id = %s
+"""
+
+
+@router.get("/users/{email}")
+def get_user(email: str, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION), db=Depends(get_read_db)):
+    """Get a user by email."""
+    selected = parse_fields(fields, USER_FIELDS)
+    cur = db.cursor()
+
+    cur.execute(
+        "SELECT id, email, name, COALESCE(is_demo, FALSE) AS is_demo, created_at FROM users WHERE email = %s",
+        (email,)
+    )
+    user = cur.fetchone()
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return FastJSONResponse(apply_fields(user, selected))
+
+
+@router.get("/users/{email}/cycles")
+def list_user_cycles(
+    email: str,
+    role: Literal["subject", "manager"] = "subject",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    status: Optional[Literal["active", "finalised"]] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db=Depends(get_read_db),
+):
+    """List a page of cycles where the user is the subject or the manager."""
+    selected = parse_fields(fields, CYCLE_LIST_FIELDS)
+    cur = db.cursor()
+
+    cur.execute(CYCLES_SQL[role], {"email": email, "limit": limit, "cycle_status": status, **cursor_params(cursor)})
+    items, next_cursor = split_page(cur.fetchall(), limit)
+
+    return FastJSONResponse({"items": apply_fields(items, selected), "next_cursor": next_cursor})
+
+
+@router.get("/inbox/{email}", dependencies=[Depends(rate_limit("read"))])
+def list_inbox(
+    email: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    status: Optional[Literal["pending", "submitted"]] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db=Depends(get_read_db),
+):
+    """List a page of review requests for a reviewer email."""
+    selected = parse_fields(fields, INBOX_ITEM_FIELDS)
+    cur = db.cursor()
+
+    cur.execute(INBOX_SQL, {"email": email, "limit": limit, "review_status": status, **cursor_params(cursor)})
+    items, next_cursor = split_page(cur.fetchall(), limit)
+    for item in items:
+        item["token"] = issue(item.pop("reviewer_id"))
+
+    return FastJSONResponse({"items": apply_fields(items, selected), "next_cursor": next_cursor})
+
+
+@router.get("/cycles/{cycle_id}")
+def get_cycle(cycle_id: int, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION), db=Depends(get_read_db)):
+    """Get a cycle with its reviewers, their statuses and the latest summary.
+
+    Reviewers and the summary are only queried when requested.
+    """
+    selected = parse_fields(fields, CYCLE_FIELDS)
+    cur = db.cursor()
+
+    cur.execute(CYCLE_SQL, (cycle_id,))
+    cycle = cur.fetchone()
+
+    if not cycle:
+        raise HTTPException(status_code=404, detail="Feedback cycle not found")
+
+    if wants(selected, "reviewers") or wants(selected, "submitted_count") or wants(selected, "total_reviewers"):
+        cur.execute(REVIEWERS_SQL, (cycle_id,))
+        reviewers = cur.fetchall()
+        cycle["reviewers"] = reviewers
+        cycle["submitted_count"] = sum(1 for r in reviewers if r["status"] == "submitted")
+        cycle["total_reviewers"] = len(reviewers)
+
+    if wants(selected, "summary"):
+        cur.execute(SUMMARY_SQL, (cycle_id,))
+        cycle["summary"] = cur.fetchone()
+
+    return FastJSONResponse(apply_fields(cycle, selected))
+
+
+@router.get("/cycles/{cycle_id}/summary")
+def get_cycle_summary(cycle_id: int, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION), db=Depends(get_read_db)):
+    """Get the latest summary for a cycle."""
+    selected = parse_fields(fields, SUMMARY_FIELDS)
+    cur = db.cursor()
+
+    cur.execute(SUMMARY_SQL, (cycle_id,))
+    summary = cur.fetchone()
+
+    if not summary:
+        raise HTTPException(status_code=404, detail="Summary not found")
+
+    return FastJSONResponse(apply_fields(summary, selected))
@@ -0,0 +1,24 @@
+"""Access guards for operator-only endpoints."""
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+
+def is_admin(x_admin_token: Optional[str]) -> bool:
+    """Whether a request carries the ADMIN_TOKEN shared secret (never, when it is not configured)."""
+    expected = os.environ.get("ADMIN_TOKEN")
+    return bool(expected and x_admin_token and secrets.compare_digest(x_admin_token, expected))
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency guarding admin endpoints with the ADMIN_TOKEN shared secret.
+
+    When ADMIN_TOKEN is not configured the endpoints do not exist (404).
+    """
+    if not os.environ.get("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
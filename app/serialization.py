@@ -0,0 +1,87 @@
+"""Fast JSON responses built straight from DB rows, with sparse fieldsets.
+
+Used by the v2 API. RealDictCursor rows are already dicts, so they are
+encoded by orjson as they come back from Postgres, without building Pydantic
+models or re-validating through response_model.
+
+Sparse fieldsets: `?fields=id,title,reviewers.name` keeps only the named
+keys. A dotted name selects inside a nested object or list of objects, and a
+bare name keeps the whole value.
+"""
+from decimal import Decimal
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, Response
+
+# Allowed fields, as a tree: None marks a leaf, a dict a nested object (or list of objects)
+FieldTree = dict
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+def parse_fields(fields: Optional[str], allowed: FieldTree) -> Optional[FieldTree]:
+    """
+    Parse a ?fields= value into a tree of the requested fields.
+
+    Returns None when no fields were requested (everything is returned), and
+    raises a 400 naming any field not in `allowed`.
+    """
+    if not fields:
+        return None
+
+    tree = {}
+    unknown = []
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        parts = name.split(".")
+        schema = allowed
+        for part in parts:
+            if not isinstance(schema, dict) or part not in schema:
+                unknown.append(name)
+                break
+            schema = schema[part]
+        else:
+            node = tree
+            for part in parts[:-1]:
+                if part in node and node[part] is None:
+                    break  # Whole value already selected
+                node = node.setdefault(part, {})
+            else:
+                node[parts[-1]] = None  # Whole value; wins over any narrower selection
+
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return tree
+
+
+def wants(tree: Optional[FieldTree], name: str) -> bool:
+    """Whether a field was requested, so callers can skip queries for the rest."""
+    return tree is None or name in tree
+
+
+def apply_fields(value, tree: Optional[FieldTree]):
+    """Trim a dict, or a list of dicts, to the fields in `tree`."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        if all(sub is None for sub in tree.values()):
+            # Flat selection, the common case for list pages
+            keys = tuple(tree)
+            return [{key: item[key] for key in keys if key in item} for item in value]
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: apply_fields(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
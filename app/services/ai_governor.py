@@ -0,0 +1,349 @@
+"""Rate limiting and concurrency governor for outbound AI calls.
+
+Every call to Anthropic or OpenAI acquires a lease from the governor for its
+provider and model before it is sent. Each governor combines:
+
+- a requests-per-minute token bucket
+- a tokens-per-minute token bucket (skipped when no TPM budget is set)
+- a concurrency cap
+
+Waiting callers are queued by priority, so interactive voice extraction is
+served ahead of background summary regeneration, and each caller gives up
+with GovernorTimeout once its deadline passes instead of failing immediately.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Priorities (lower is served first)
+PRIORITY_INTERACTIVE = 0  # Reviewer waiting on voice transcription/extraction
+PRIORITY_USER = 5  # Manager explicitly generating a summary
+PRIORITY_BACKGROUND = 10  # Summary regeneration after a review submission
+
+# Default deadlines (seconds spent queueing before giving up) per priority
+DEFAULT_DEADLINES = {
+    PRIORITY_INTERACTIVE: float(os.environ.get("AI_GOVERNOR_INTERACTIVE_DEADLINE", "20")),
+    PRIORITY_USER: float(os.environ.get("AI_GOVERNOR_USER_DEADLINE", "60")),
+    PRIORITY_BACKGROUND: float(os.environ.get("AI_GOVERNOR_BACKGROUND_DEADLINE", "300")),
+}
+
+# Budgets per "provider:model". rpm/tpm are per minute; tpm None disables
+# token budgeting (e.g. Whisper, which is billed per audio minute).
+DEFAULT_LIMITS = {
+    "anthropic:claude-sonnet-4-20250514": {"rpm": 50, "tpm": 40000, "concurrency": 4},
+    "anthropic:claude-3-haiku-20240307": {"rpm": 50, "tpm": 50000, "concurrency": 8},
+    "openai:whisper-1": {"rpm": 50, "tpm": None, "concurrency": 4},
+}
+
+# Fallback for models without an explicit entry
+DEFAULT_PROVIDER_LIMITS = {
+    "anthropic": {"rpm": 50, "tpm": 40000, "concurrency": 4},
+    "openai": {"rpm": 50, "tpm": None, "concurrency": 4},
+}
+
+# Number of recent wait times kept per governor for percentile reporting
+WAIT_SAMPLE_SIZE = 256
+
+
+class GovernorTimeout(Exception):
+    """Raised when a call could not be admitted before its deadline."""
+
+    def __init__(self, key: str, waited: float):
+        super().__init__(f"{key}: no capacity after waiting {waited:.1f}s")
+        self.key = key
+        self.waited = waited
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token estimate for TPM budgeting (~4 characters per token)."""
+    return len(prompt) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Continuously refilling token bucket. Not thread-safe on its own."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, amount: float, now: float) -> bool:
+        self._refill(now)
+        # Requests larger than the whole bucket are admitted once it is full
+        return self.tokens >= min(amount, self.capacity)
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0) if self.rate else 1.0
+
+
+class Lease:
+    """Admission granted by a governor. Release once the call has finished."""
+
+    def __init__(self, governor: "Governor", reserved_tokens: int, waited: float):
+        self.governor = governor
+        self.reserved_tokens = reserved_tokens
+        self.waited = waited
+        self._released = False
+
+    def release(self, tokens_used: Optional[int] = None):
+        """Return the concurrency slot and reconcile TPM with actual usage."""
+        if self._released:
+            return
+        self._released = True
+        self.governor._release(self.reserved_tokens, tokens_used)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens")
+
+    def __init__(self, priority: int, seq: int, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Governor:
+    """Admission control for a single provider/model pair."""
+
+    def __init__(self, key: str, rpm: float, tpm: Optional[float], concurrency: int):
+        self.key = key
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._in_flight = 0
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._granted = 0
+        self._timed_out = 0
+
+    def _can_grant(self, tokens: int, now: float) -> bool:
+        if self._in_flight >= self.concurrency:
+            return False
+        if not self._requests.available(1, now):
+            return False
+        if self._tokens is not None and not self._tokens.available(tokens, now):
+            return False
+        return True
+
+    def _refill_delay(self, tokens: int) -> Optional[float]:
+        """Seconds until the buckets could admit the head waiter, if rate-bound."""
+        if self._in_flight >= self.concurrency:
+            return None  # Woken by a release instead
+        delay = self._requests.seconds_until(1)
+        if self._tokens is not None:
+            delay = max(delay, self._tokens.seconds_until(tokens))
+        return delay
+
+    def acquire(
+        self,
+        priority: int = PRIORITY_BACKGROUND,
+        tokens: int = 0,
+        deadline: Optional[float] = None,
+    ) -> Lease:
+        """
+        Block until the call can be admitted.
+
+        Args:
+            priority: Lower values are admitted first
+            tokens: Estimated tokens for TPM budgeting
+            deadline: Seconds to queue before raising GovernorTimeout
+                (defaults to the deadline configured for the priority)
+
+        Returns:
+            Lease to release once the call completes
+        """
+        if deadline is None:
+            deadline = DEFAULT_DEADLINES.get(priority, DEFAULT_DEADLINES[PRIORITY_BACKGROUND])
+
+        start = time.monotonic()
+        give_up_at = start + deadline
+
+        with self._cond:
+            waiter = _Waiter(priority, next(self._seq), tokens)
+            heapq.heappush(self._queue, waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._queue[0] is waiter and self._can_grant(tokens, now):
+                        heapq.heappop(self._queue)
+                        self._requests.take(1)
+                        if self._tokens is not None:
+                            self._tokens.take(tokens)
+                        self._in_flight += 1
+                        waited = now - start
+                        self._waits.append(waited)
+                        self._granted += 1
+                        # The next waiter may also be admissible now
+                        self._cond.notify_all()
+                        return Lease(self, tokens, waited)
+
+                    remaining = give_up_at - now
+                    if remaining <= 0:
+                        self._queue.remove(waiter)
+                        heapq.heapify(self._queue)
+                        self._timed_out += 1
+                        self._cond.notify_all()
+                        logger.warning(f"{self.key}: call timed out after {now - start:.1f}s in queue")
+                        raise GovernorTimeout(self.key, now - start)
+
+                    timeout = remaining
+                    if self._queue[0] is waiter:
+                        delay = self._refill_delay(tokens)
+                        if delay is not None:
+                            timeout = min(timeout, max(delay, 0.005))
+                    self._cond.wait(timeout)
+            except BaseException:
+                if waiter in self._queue:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    async def acquire_async(
+        self,
+        priority: int = PRIORITY_BACKGROUND,
+        tokens: int = 0,
+        deadline: Optional[float] = None,
+    ) -> Lease:
+        """Async variant of acquire; queues on a worker thread so the event loop stays free."""
+        with self._cond:
+            now = time.monotonic()
+            if not self._queue and self._can_grant(tokens, now):
+                self._requests.take(1)
+                if self._tokens is not None:
+                    self._tokens.take(tokens)
+                self._in_flight += 1
+                self._waits.append(0.0)
+                self._granted += 1
+                return Lease(self, tokens, 0.0)
+
+        # The worker thread keeps queueing if this coroutine is cancelled (e.g. the
+        # losing copy of a hedged call), so whichever side finishes last releases
+        # a lease nobody will use
+        handoff = threading.Lock()
+        state = {"lease": None, "cancelled": False}
+
+        def acquire_for_caller() -> Lease:
+            lease = self.acquire(priority, tokens, deadline)
+            with handoff:
+                if state["cancelled"]:
+                    lease.release()
+                else:
+                    state["lease"] = lease
+            return lease
+
+        try:
+            return await asyncio.to_thread(acquire_for_caller)
+        except asyncio.CancelledError:
+            with handoff:
+                state["cancelled"] = True
+                if state["lease"] is not None:
+                    state["lease"].release()
+            raise
+
+    def _release(self, reserved_tokens: int, tokens_used: Optional[int]):
+        with self._cond:
+            self._in_flight -= 1
+            if self._tokens is not None and tokens_used is not None:
+                difference = reserved_tokens - tokens_used
+                if difference > 0:
+                    self._tokens.give_back(difference)
+                else:
+                    self._tokens.take(-difference)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, in-flight calls and recent wait times."""
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._queue),
+                "granted": self._granted,
+                "timed_out": self._timed_out,
+                "wait_p50": _percentile(waits, 0.50),
+                "wait_p95": _percentile(waits, 0.95),
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return round(sorted_values[index], 4)
+
+
+def _load_limit_overrides() -> dict:
+    """Read AI_GOVERNOR_LIMITS, a JSON object keyed by "provider:model"."""
+    raw = os.environ.get("AI_GOVERNOR_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        logger.error("AI_GOVERNOR_LIMITS is not valid JSON, using defaults")
+        return {}
+
+
+_governors: dict[str, Governor] = {}
+_governors_lock = threading.Lock()
+_limit_overrides = _load_limit_overrides()
+
+
+def get_governor(provider: str, model: str) -> Governor:
+    """Return the shared governor for a provider/model pair."""
+    key = f"{provider}:{model}"
+    governor = _governors.get(key)
+    if governor is not None:
+        return governor
+
+    with _governors_lock:
+        if key not in _governors:
+            limits = dict(DEFAULT_PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMITS["anthropic"]))
+            limits.update(DEFAULT_LIMITS.get(key, {}))
+            limits.update(_limit_overrides.get(key, {}))
+            _governors[key] = Governor(key, limits["rpm"], limits.get("tpm"), limits["concurrency"])
+        return _governors[key]
+
+
+def governor_stats() -> dict:
+    """Stats for every governor that has been used in this process."""
+    return {key: governor.stats() for key, governor in list(_governors.items())}
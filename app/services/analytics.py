@@ -0,0 +1,356 @@
+"""Org-wide analytics, served from precomputed aggregate tables.
+
+Three small tables hold the aggregates HR reports on:
+
+    analytics_relationship_monthly  reviewers invited/submitted per (invite month, relationship)
+    analytics_submit_latency        time-to-submit histogram per (invite month, relationship)
+    analytics_manager               cycle progress per manager
+
+Their size depends on months x relationships and on the number of managers,
+not on how many cycles or reviews exist, so the report endpoints never touch
+feedback_cycles, reviewers or reviews.
+
+They are maintained incrementally. Each write that changes a count calls a
+record_*() function inside its own transaction, which adds the change to the
+affected rows (`x = x + delta`, safe under concurrency). rebuild() recomputes
+everything from the base tables and adds the difference the same way, so it
+never blocks those writes for the length of its scan. It runs on demand, on a
+schedule (scripts/refresh_analytics.py), and after bulk changes such as the
+demo reset.
+
+Time-to-submit percentiles are interpolated within fixed histogram buckets,
+so they are accurate to within a bucket.
+"""
+import bisect
+from typing import Optional
+
+# Lower bounds of the time-to-submit buckets, in hours; bucket 0 is under an hour
+SUBMIT_BUCKET_HOURS = (1, 4, 12, 24, 48, 72, 120, 168, 336, 720)
+SUBMIT_BUCKET_SECONDS = [hours * 3600.0 for hours in SUBMIT_BUCKET_HOURS]
+
+# Serialises count changes per cycle, so two reviews landing together both see
+# the other when deciding whether the cycle is now complete. NO KEY UPDATE does
+# not conflict with the KEY SHARE locks taken by reviewer inserts.
+LOCK_CYCLE_SQL = "SELECT 1 FROM feedback_cycles WHERE id = %s FOR NO KEY UPDATE"
+
+# One reviewer's dimensions and submit time, with its cycle's current counts
+REVIEWER_FACTS_SQL = """
+SELECT r.relationship, date_trunc('month', r.created_at)::date AS month, fc.manager_user_id,
+       GREATEST(EXTRACT(EPOCH FROM rv.submitted_at - r.created_at), 0)::float8 AS submit_seconds,
+       (SELECT count(*) FROM reviewers r2 WHERE r2.cycle_id = r.cycle_id) AS invited,
+       (SELECT count(*) FROM reviewers r2 JOIN reviews rv2 ON rv2.reviewer_id = r2.id
+        WHERE r2.cycle_id = r.cycle_id) AS submitted
+FROM reviewers r
+JOIN feedback_cycles fc ON fc.id = r.cycle_id
+LEFT JOIN reviews rv ON rv.reviewer_id = r.id
+WHERE r.id = %s
+"""
+
+# Add a change to the aggregates. Each part is skipped when its key is NULL.
+APPLY_DELTA_SQL = """
+WITH relationship AS (
+    INSERT INTO analytics_relationship_monthly AS a
+        (month, relationship, invited, submitted, submit_seconds, updated_at)
+    SELECT %(month)s, %(relationship)s, %(invited)s, %(submitted)s, %(submit_seconds)s, NOW()
+    WHERE %(relationship)s::text IS NOT NULL
+    ON CONFLICT (month, relationship) DO UPDATE SET
+        invited = a.invited + EXCLUDED.invited,
+        submitted = a.submitted + EXCLUDED.submitted,
+        submit_seconds = a.submit_seconds + EXCLUDED.submit_seconds,
+        updated_at = EXCLUDED.updated_at
+),
+latency AS (
+    INSERT INTO analytics_submit_latency AS a (month, relationship, bucket, reviews)
+    SELECT %(month)s, %(relationship)s, %(bucket)s, 1
+    WHERE %(bucket)s::int IS NOT NULL
+    ON CONFLICT (month, relationship, bucket) DO UPDATE SET reviews = a.reviews + 1
+)
+INSERT INTO analytics_manager AS a
+    (manager_user_id, cycles, invited, submitted, complete_cycles, finalised_cycles, updated_at)
+SELECT %(manager_user_id)s, %(cycles)s, %(invited)s, %(submitted)s, %(complete_cycles)s, %(finalised_cycles)s, NOW()
+WHERE %(manager_user_id)s::int IS NOT NULL
+ON CONFLICT (manager_user_id) DO UPDATE SET
+    cycles = a.cycles + EXCLUDED.cycles,
+    invited = a.invited + EXCLUDED.invited,
+    submitted = a.submitted + EXCLUDED.submitted,
+    complete_cycles = a.complete_cycles + EXCLUDED.complete_cycles,
+    finalised_cycles = a.finalised_cycles + EXCLUDED.finalised_cycles,
+    updated_at = EXCLUDED.updated_at
+"""
+
+# Full recompute, applied as corrections. One statement sees the base tables
+# and the aggregates in the same snapshot, so (recomputed - stored) is exactly
+# what the stored aggregates got wrong as of then. Adding it with the same
+# `x = x + delta` upserts as record_*() leaves every change committed since
+# the snapshot in place, so nothing is locked while the base tables are
+# scanned: only the corrected aggregate rows, from the upsert to commit.
+REBUILD_SQL = """
+WITH fresh_relationship AS (
+    SELECT date_trunc('month', r.created_at)::date AS month, r.relationship, count(*) AS invited,
+           count(rv.id) AS submitted,
+           COALESCE(sum(GREATEST(EXTRACT(EPOCH FROM rv.submitted_at - r.created_at), 0)), 0)::float8 AS submit_seconds
+    FROM reviewers r
+    LEFT JOIN reviews rv ON rv.reviewer_id = r.id
+    GROUP BY 1, 2
+),
+relationship_correction AS (
+    SELECT month, relationship,
+           COALESCE(f.invited, 0) - COALESCE(old.invited, 0) AS invited,
+           COALESCE(f.submitted, 0) - COALESCE(old.submitted, 0) AS submitted,
+           COALESCE(f.submit_seconds, 0) - COALESCE(old.submit_seconds, 0) AS submit_seconds
+    FROM fresh_relationship f
+    FULL JOIN analytics_relationship_monthly old USING (month, relationship)
+),
+relationship AS (
+    INSERT INTO analytics_relationship_monthly AS a (month, relationship, invited, submitted, submit_seconds, updated_at)
+    SELECT month, relationship, invited, submitted, submit_seconds, NOW()
+    FROM relationship_correction
+    WHERE invited <> 0 OR submitted <> 0 OR submit_seconds <> 0
+    ON CONFLICT (month, relationship) DO UPDATE SET
+        invited = a.invited + EXCLUDED.invited,
+        submitted = a.submitted + EXCLUDED.submitted,
+        submit_seconds = a.submit_seconds + EXCLUDED.submit_seconds,
+        updated_at = EXCLUDED.updated_at
+),
+fresh_latency AS (
+    SELECT date_trunc('month', r.created_at)::date AS month, r.relationship,
+           width_bucket(GREATEST(EXTRACT(EPOCH FROM rv.submitted_at - r.created_at), 0)::float8,
+                        %(bucket_seconds)s::float8[]) AS bucket,
+           count(*) AS reviews
+    FROM reviewers r
+    JOIN reviews rv ON rv.reviewer_id = r.id
+    GROUP BY 1, 2, 3
+),
+latency AS (
+    INSERT INTO analytics_submit_latency AS a (month, relationship, bucket, reviews)
+    SELECT month, relationship, bucket, COALESCE(f.reviews, 0) - COALESCE(old.reviews, 0)
+    FROM fresh_latency f
+    FULL JOIN analytics_submit_latency old USING (month, relationship, bucket)
+    WHERE COALESCE(f.reviews, 0) <> COALESCE(old.reviews, 0)
+    ON CONFLICT (month, relationship, bucket) DO UPDATE SET reviews = a.reviews + EXCLUDED.reviews
+),
+fresh_manager AS (
+    SELECT fc.manager_user_id, count(*) AS cycles, COALESCE(sum(p.invited), 0) AS invited,
+           COALESCE(sum(p.submitted), 0) AS submitted,
+           count(*) FILTER (WHERE p.invited > 0 AND p.submitted = p.invited) AS complete_cycles,
+           count(*) FILTER (WHERE s.finalised) AS finalised_cycles
+    FROM feedback_cycles fc
+    LEFT JOIN (
+        SELECT r.cycle_id, count(*) AS invited, count(rv.id) AS submitted
+        FROM reviewers r
+        LEFT JOIN reviews rv ON rv.reviewer_id = r.id
+        GROUP BY r.cycle_id
+    ) p ON p.cycle_id = fc.id
+    LEFT JOIN summaries s ON s.cycle_id = fc.id
+    WHERE fc.manager_user_id IS NOT NULL
+    GROUP BY fc.manager_user_id
+),
+manager_correction AS (
+    SELECT manager_user_id,
+           COALESCE(f.cycles, 0) - COALESCE(old.cycles, 0) AS cycles,
+           COALESCE(f.invited, 0) - COALESCE(old.invited, 0) AS invited,
+           COALESCE(f.submitted, 0) - COALESCE(old.submitted, 0) AS submitted,
+           COALESCE(f.complete_cycles, 0) - COALESCE(old.complete_cycles, 0) AS complete_cycles,
+           COALESCE(f.finalised_cycles, 0) - COALESCE(old.finalised_cycles, 0) AS finalised_cycles
+    FROM fresh_manager f
+    FULL JOIN analytics_manager old USING (manager_user_id)
+)
+INSERT INTO analytics_manager AS a
+    (manager_user_id, cycles, invited, submitted, complete_cycles, finalised_cycles, updated_at)
+SELECT manager_user_id, cycles, invited, submitted, complete_cycles, finalised_cycles, NOW()
+FROM manager_correction
+WHERE cycles <> 0 OR invited <> 0 OR submitted <> 0 OR complete_cycles <> 0 OR finalised_cycles <> 0
+ON CONFLICT (manager_user_id) DO UPDATE SET
+    cycles = a.cycles + EXCLUDED.cycles,
+    invited = a.invited + EXCLUDED.invited,
+    submitted = a.submitted + EXCLUDED.submitted,
+    complete_cycles = a.complete_cycles + EXCLUDED.complete_cycles,
+    finalised_cycles = a.finalised_cycles + EXCLUDED.finalised_cycles,
+    updated_at = EXCLUDED.updated_at;
+
+-- Rows corrected down to nothing (a row a concurrent delta revived is skipped on recheck)
+DELETE FROM analytics_relationship_monthly WHERE invited = 0 AND submitted = 0;
+DELETE FROM analytics_submit_latency WHERE reviews = 0;
+DELETE FROM analytics_manager WHERE cycles = 0;
+"""
+
+# Aggregates never built: every table is empty (cheap to recheck on an empty database)
+IS_EMPTY_SQL = """
+SELECT NOT EXISTS (SELECT 1 FROM analytics_relationship_monthly)
+   AND NOT EXISTS (SELECT 1 FROM analytics_submit_latency)
+   AND NOT EXISTS (SELECT 1 FROM analytics_manager) AS empty
+"""
+
+# Reviewer counts per relationship over a range of invite months (whole months)
+RELATIONSHIPS_SQL = """
+SELECT relationship, sum(invited)::int AS invited, sum(submitted)::int AS submitted,
+       sum(submit_seconds)::float8 AS submit_seconds, max(updated_at) AS updated_at
+FROM analytics_relationship_monthly
+WHERE (%(since)s::date IS NULL OR month >= date_trunc('month', %(since)s::date))
+  AND (%(until)s::date IS NULL OR month <= %(until)s)
+GROUP BY relationship
+ORDER BY relationship
+"""
+
+LATENCY_SQL = """
+SELECT relationship, bucket, sum(reviews)::int AS reviews
+FROM analytics_submit_latency
+WHERE (%(since)s::date IS NULL OR month >= date_trunc('month', %(since)s::date))
+  AND (%(until)s::date IS NULL OR month <= %(until)s)
+GROUP BY relationship, bucket
+"""
+
+MANAGERS_SQL = """
+SELECT a.manager_user_id, u.name AS manager_name, u.email AS manager_email,
+       a.cycles, a.complete_cycles, a.finalised_cycles, a.invited, a.submitted, a.updated_at
+FROM analytics_manager a
+JOIN users u ON u.id = a.manager_user_id
+ORDER BY a.cycles DESC, a.manager_user_id
+LIMIT %(limit)s
+"""
+
+
+def _delta(**changes) -> dict:
+    params = {
+        "month": None, "relationship": None, "bucket": None, "manager_user_id": None,
+        "cycles": 0, "invited": 0, "submitted": 0, "submit_seconds": 0.0,
+        "complete_cycles": 0, "finalised_cycles": 0,
+    }
+    params.update(changes)
+    return params
+
+
+def submit_bucket(seconds: float) -> int:
+    """Histogram bucket for a time-to-submit; matches width_bucket() in REBUILD_SQL."""
+    return bisect.bisect_right(SUBMIT_BUCKET_SECONDS, seconds)
+
+
+def _reviewer_facts(cur, cycle_id: int, reviewer_id: int) -> Optional[dict]:
+    cur.execute(LOCK_CYCLE_SQL, (cycle_id,))
+    cur.execute(REVIEWER_FACTS_SQL, (reviewer_id,))
+    return cur.fetchone()
+
+
+def record_cycle_created(cur, manager_user_id: Optional[int]):
+    cur.execute(APPLY_DELTA_SQL, _delta(manager_user_id=manager_user_id, cycles=1))
+
+
+def record_reviewer_added(cur, cycle_id: int, reviewer_id: int):
+    facts = _reviewer_facts(cur, cycle_id, reviewer_id)
+    if facts is None:
+        return
+    # A cycle every earlier reviewer had completed is incomplete again
+    before = facts["invited"] - 1
+    reopened = before > 0 and facts["submitted"] == before
+    cur.execute(APPLY_DELTA_SQL, _delta(
+        month=facts["month"], relationship=facts["relationship"], manager_user_id=facts["manager_user_id"],
+        invited=1, complete_cycles=-1 if reopened else 0,
+    ))
+
+
+def record_review_submitted(cur, cycle_id: int, reviewer_id: int):
+    facts = _reviewer_facts(cur, cycle_id, reviewer_id)
+    if facts is None or facts["submit_seconds"] is None:
+        return
+    completed = facts["submitted"] == facts["invited"]
+    cur.execute(APPLY_DELTA_SQL, _delta(
+        month=facts["month"], relationship=facts["relationship"], manager_user_id=facts["manager_user_id"],
+        submitted=1, submit_seconds=facts["submit_seconds"], bucket=submit_bucket(facts["submit_seconds"]),
+        complete_cycles=1 if completed else 0,
+    ))
+
+
+def record_summary_finalised(cur, cycle_id: int):
+    cur.execute("SELECT manager_user_id FROM feedback_cycles WHERE id = %s", (cycle_id,))
+    cycle = cur.fetchone()
+    if cycle is not None:
+        cur.execute(APPLY_DELTA_SQL, _delta(manager_user_id=cycle["manager_user_id"], finalised_cycles=1))
+
+
+def rebuild(cur):
+    """
+    Recompute every aggregate from the base tables and correct the stored ones
+    (the caller commits, which releases the corrected rows).
+    """
+    cur.execute(REBUILD_SQL, {"bucket_seconds": SUBMIT_BUCKET_SECONDS})
+
+
+def rebuild_if_empty(cur) -> bool:
+    """Backfill aggregates that have never been built, e.g. on a new or upgraded database."""
+    cur.execute(IS_EMPTY_SQL)
+    if not cur.fetchone()["empty"]:
+        return False
+    rebuild(cur)
+    return True
+
+
+def percentile(histogram: list[int], fraction: float) -> Optional[float]:
+    """Time-to-submit in hours at a fraction of a bucket histogram, interpolated within the bucket."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    bounds = (0,) + SUBMIT_BUCKET_HOURS
+    for bucket, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            if bucket == len(SUBMIT_BUCKET_HOURS):
+                return float(bounds[bucket])  # Open-ended last bucket: report its lower bound
+            low, high = bounds[bucket], bounds[bucket + 1]
+            return round(low + (high - low) * (rank - seen) / count, 1)
+        seen += count
+    return float(bounds[-1])
+
+
+def _rate(part: int, whole: int) -> Optional[float]:
+    return round(part / whole, 4) if whole else None
+
+
+def relationship_report(cur, since=None, until=None) -> dict:
+    """Completion rate and time-to-submit by reviewer relationship, for reviewers invited in [since, until]."""
+    params = {"since": since, "until": until}
+    cur.execute(LATENCY_SQL, params)
+    histograms = {}
+    for row in cur.fetchall():
+        histogram = histograms.setdefault(row["relationship"], [0] * (len(SUBMIT_BUCKET_HOURS) + 1))
+        histogram[row["bucket"]] += row["reviews"]
+
+    cur.execute(RELATIONSHIPS_SQL, params)
+    rows = cur.fetchall()
+    relationships = []
+    for row in rows:
+        histogram = histograms.get(row["relationship"], [])
+        relationships.append({
+            "relationship": row["relationship"],
+            "invited": row["invited"],
+            "submitted": row["submitted"],
+            "completion_rate": _rate(row["submitted"], row["invited"]),
+            "mean_hours_to_submit": round(row["submit_seconds"] / 3600 / row["submitted"], 1) if row["submitted"] else None,
+            "p50_hours_to_submit": percentile(histogram, 0.5),
+            "p90_hours_to_submit": percentile(histogram, 0.9),
+        })
+    return {
+        "as_of": max((row["updated_at"] for row in rows), default=None),
+        "relationships": relationships,
+    }
+
+
+def manager_report(cur, limit: int) -> dict:
+    """Cycle progress per manager, most cycles first."""
+    cur.execute(MANAGERS_SQL, {"limit": limit})
+    rows = cur.fetchall()
+    managers = [{
+        "manager_user_id": row["manager_user_id"],
+        "manager_name": row["manager_name"],
+        "manager_email": row["manager_email"],
+        "cycles": row["cycles"],
+        "complete_cycles": row["complete_cycles"],
+        "finalised_cycles": row["finalised_cycles"],
+        "invited": row["invited"],
+        "submitted": row["submitted"],
+        "completion_rate": _rate(row["submitted"], row["invited"]),
+    } for row in rows]
+    return {
+        "as_of": max((row["updated_at"] for row in rows), default=None),
+        "managers": managers,
+    }
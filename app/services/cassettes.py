@@ -0,0 +1,175 @@
+"""Record/replay of Claude and Whisper traffic, for deterministic offline runs.
+
+With AI_CASSETTE_MODE=record, every successful provider call made through
+app.services.providers is appended to the cassette file as one JSON line:
+the request, the response, how long the provider took and when. With
+AI_CASSETTE_MODE=replay, the same calls are answered from the cassette
+instead of the network, optionally after the recorded latency. The
+governor, retries and metrics still run as usual, so end-to-end flows
+(generate_summary, voice extraction) can be benchmarked and tested offline.
+
+Calls are matched on provider, model and a replay key. Callers give a key
+that names the inputs rather than the prompt text (a summary's reviews, a
+voice transcript), so a call still finds its recording after a prompt
+template changes. Its prompt is then compared with the recorded one: a
+prompt that grew by more than AI_CASSETTE_MAX_PROMPT_GROWTH fails with
+PromptGrowthError, which catches templates that quietly make every call
+more expensive. Without a key the whole request is the key. A call with no
+recording fails with CassetteMiss; record it again against the live APIs.
+Identical calls are replayed in the order they were recorded, and the last
+recording repeats once they run out.
+
+Cassettes hold prompts, so they contain whatever feedback was sent. Record
+them from demo or synthetic data only.
+
+Configuration:
+    AI_CASSETTE_MODE               off (default), record or replay
+    AI_CASSETTE                    Cassette file (default cassettes/ai.ndjson)
+    AI_CASSETTE_LATENCY            Fraction of each recorded latency to wait on replay
+                                   (default 0: answer at once; 1: as recorded)
+    AI_CASSETTE_MAX_PROMPT_GROWTH  Largest allowed prompt growth on replay, as a fraction (default 0.1)
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+CASSETTE_PATH = os.environ.get("AI_CASSETTE", "cassettes/ai.ndjson")
+REPLAY_LATENCY = float(os.environ.get("AI_CASSETTE_LATENCY", "0"))
+MAX_PROMPT_GROWTH = float(os.environ.get("AI_CASSETTE_MAX_PROMPT_GROWTH", "0.1"))
+
+
+def _load_mode() -> str:
+    mode = os.environ.get("AI_CASSETTE_MODE", "off").lower()
+    if mode not in MODES:
+        logger.error(f"AI_CASSETTE_MODE must be one of {', '.join(MODES)}, got {mode!r}; cassettes are off")
+        return "off"
+    return mode
+
+
+MODE = _load_mode()
+
+
+class CassetteMiss(Exception):
+    """Raised on replay when a call has no recording."""
+
+
+class PromptGrowthError(Exception):
+    """Raised on replay when a prompt is much larger than when it was recorded."""
+
+
+def fingerprint(*parts) -> str:
+    """Stable replay key for a call's inputs."""
+    encoded = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+class Cassette:
+    """One cassette file: appended to when recording, indexed when replaying."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._recordings: Optional[dict[tuple, list[dict]]] = None
+        self._served: dict[tuple, int] = {}
+
+    def _load(self) -> dict[tuple, list[dict]]:
+        recordings = {}
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        entry = orjson.loads(line)
+                        recordings.setdefault((entry["provider"], entry["model"], entry["key"]), []).append(entry)
+        except FileNotFoundError:
+            logger.warning(f"Cassette {self.path} does not exist; every call will miss")
+        return recordings
+
+    def find(self, provider: str, model: str, key: str) -> dict:
+        """The next recording for a call, in recorded order."""
+        with self._lock:
+            if self._recordings is None:
+                self._recordings = self._load()
+            recordings = self._recordings.get((provider, model, key))
+            if not recordings:
+                raise CassetteMiss(f"{provider}:{model} call {key} is not in {self.path}; "
+                                   "record it with AI_CASSETTE_MODE=record")
+            served = self._served.get((provider, model, key), 0)
+            self._served[(provider, model, key)] = served + 1
+            return recordings[min(served, len(recordings) - 1)]
+
+    def append(self, entry: dict):
+        line = orjson.dumps(entry) + b"\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(line)
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """The cassette named by AI_CASSETTE, shared by every call in the process."""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH)
+        return _cassette
+
+
+def record(provider: str, model: str, key: Optional[str], request: dict, response, latency: float,
+           prompt_chars: Optional[int] = None):
+    """Append one successful call (response as JSON-compatible data, latency in seconds)."""
+    get_cassette().append({
+        "provider": provider,
+        "model": model,
+        "key": key or fingerprint(request),
+        "request": request,
+        "prompt_chars": prompt_chars,
+        "response": response,
+        "latency_ms": round(latency * 1000, 1),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+
+
+def _lookup(provider: str, model: str, key: Optional[str], request: dict, prompt_chars: Optional[int]) -> dict:
+    entry = get_cassette().find(provider, model, key or fingerprint(request))
+    recorded = entry.get("prompt_chars")
+    if prompt_chars is not None and recorded and prompt_chars != recorded:
+        growth = prompt_chars / recorded - 1
+        message = (f"{provider}:{model} prompt for call {entry['key']} is {prompt_chars} characters, "
+                   f"{recorded} when recorded ({growth:+.0%})")
+        if growth > MAX_PROMPT_GROWTH:
+            raise PromptGrowthError(message)
+        logger.info(message)
+    return entry
+
+
+def replay(provider: str, model: str, key: Optional[str], request: dict, prompt_chars: Optional[int] = None):
+    """The recorded response for a call, after the scaled recorded latency."""
+    entry = _lookup(provider, model, key, request, prompt_chars)
+    if REPLAY_LATENCY > 0:
+        time.sleep(entry["latency_ms"] / 1000 * REPLAY_LATENCY)
+    return entry["response"]
+
+
+async def replay_async(provider: str, model: str, key: Optional[str], request: dict,
+                       prompt_chars: Optional[int] = None):
+    """replay() for async callers: waits without blocking the event loop."""
+    entry = _lookup(provider, model, key, request, prompt_chars)
+    if REPLAY_LATENCY > 0:
+        await asyncio.sleep(entry["latency_ms"] / 1000 * REPLAY_LATENCY)
+    return entry["response"]
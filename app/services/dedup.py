@@ -0,0 +1,166 @@
+"""Near-duplicate answers within a cycle, collapsed before the summary prompt.
+
+Reviewers paste the same text into several fields, and teams sometimes agree
+their feedback beforehand, so a prompt can carry one point many times over.
+Each answer (one field of one review) is reduced to its set of word 3-grams
+and a MinHash signature. Locality-sensitive hashing over bands of the
+signature proposes candidate pairs, so answers are not compared all against
+all. Each candidate pair is then confirmed with the exact Jaccard similarity
+of the two 3-gram sets. Confirmed pairs are joined into groups.
+
+In the prompt each group appears once, with the reviewers' combined
+calculate_weight() and how many of them wrote it. The answers in the
+reviewer sections become a reference to it (see generate_summary).
+
+NumPy is optional: without it find_duplicates() finds nothing and every
+answer is sent as written.
+
+Configuration:
+    DUPLICATE_SIMILARITY  Minimum Jaccard similarity of two answers' word 3-grams (default 0.6)
+"""
+import os
+import re
+import zlib
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:  # Optional: no collapsing
+    np = None
+
+DUPLICATE_SIMILARITY = float(os.environ.get("DUPLICATE_SIMILARITY", "0.6"))
+SHINGLE_WORDS = 3
+MIN_ANSWER_WORDS = 6  # Shorter answers ("N/A", "Nothing to add") cost less than a reference to them
+NUM_PERM = 64
+BANDS = 16  # 16 bands of 4 rows: pairs at Jaccard 0.6 become candidates ~87% of the time, at 0.3 ~13%
+ROWS = NUM_PERM // BANDS
+
+# Answer fields in prompt order, with how the prompt describes them
+FIELDS = {
+    "start_doing": "start",
+    "stop_doing": "stop",
+    "continue_doing": "continue",
+    "example": "example",
+    "additional": "additional",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_PRIME = (1 << 31) - 1
+
+if np is not None:
+    # Fixed seed: signatures must agree between calls
+    _rng = np.random.default_rng(360)
+    _A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+    _B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+    _BAND_MIX = _rng.integers(1, 1 << 63, ROWS, dtype=np.uint64) | np.uint64(1)
+
+
+def shingles(text: str) -> frozenset:
+    """Word 3-grams of normalised text (case, punctuation and spacing ignored)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < MIN_ANSWER_WORDS:
+        return frozenset()
+    return frozenset(" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1))
+
+
+def _signatures(gram_sets: list[frozenset]):
+    """
+    MinHash signatures, one row per set: per permutation, the smallest
+    (a * hash + b) mod p over the set's 3-grams. All sets are hashed in one
+    matrix operation and reduced per set.
+    """
+    hashes = np.fromiter((zlib.crc32(g.encode()) & _PRIME for grams in gram_sets for g in grams), dtype=np.uint64)
+    starts = np.cumsum([0] + [len(grams) for grams in gram_sets[:-1]])
+    return np.minimum.reduceat((np.outer(hashes, _A) + _B) % _PRIME, starts, axis=0)
+
+
+def _candidate_pairs(signatures) -> set:
+    """Pairs of answers that share at least one LSH band."""
+    # Each band's rows folded into one integer (wrapping uint64 arithmetic)
+    keys = (signatures.reshape(len(signatures), BANDS, ROWS) * _BAND_MIX).sum(axis=2)
+    buckets = {}
+    for index, row in enumerate(keys.tolist()):
+        for band, key in enumerate(row):
+            buckets.setdefault((band, key), []).append(index)
+    pairs = set()
+    for members in buckets.values():
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pairs.add((first, second))
+    return pairs
+
+
+def _find(parent: list[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def find_duplicates(reviews: list[dict], weight_of: Callable[[dict], float]) -> list[dict]:
+    """
+    Groups of near-identical answers, heaviest first.
+
+    Each group has the text to keep (the heaviest reviewer's wording), its
+    members as (review index, field) pairs in prompt order, the reviewers (by
+    index into `reviews`) who wrote it, and their combined weight. A reviewer
+    who pasted the same text into two fields counts once.
+    """
+    if np is None:
+        return []
+
+    answers = []
+    for index, review in enumerate(reviews):
+        for field in FIELDS:
+            grams = shingles(review.get(field) or "")
+            if grams:
+                answers.append((index, field, grams))
+    if len(answers) < 2:
+        return []
+
+    signatures = _signatures([grams for _, _, grams in answers])
+    parent = list(range(len(answers)))
+    for first, second in _candidate_pairs(signatures):
+        a, b = answers[first][2], answers[second][2]
+        if len(a & b) / len(a | b) >= DUPLICATE_SIMILARITY:
+            parent[_find(parent, first)] = _find(parent, second)
+
+    grouped = {}
+    for i in range(len(answers)):
+        grouped.setdefault(_find(parent, i), []).append(i)
+
+    weights = [weight_of(review) for review in reviews]
+    groups = []
+    for members in grouped.values():
+        if len(members) < 2:
+            continue
+        reviewers = sorted({answers[i][0] for i in members})
+        keep = min(members, key=lambda i: (-weights[answers[i][0]], i))
+        index, field, _ = answers[keep]
+        groups.append({
+            "text": reviews[index][field].strip(),
+            "members": [answers[i][:2] for i in sorted(members)],
+            "reviewers": reviewers,
+            "weight": round(sum(weights[r] for r in reviewers), 2),
+        })
+
+    groups.sort(key=lambda g: (-g["weight"], g["members"][0]))
+    return groups
+
+
+def reference(number: int) -> str:
+    """What a collapsed answer becomes in its reviewer's section."""
+    return f"[R{number}]"
+
+
+def digest(groups: list[dict], reviewer_names: list[str]) -> str:
+    """Prompt section listing each repeated point once, with who wrote it and their combined weight."""
+    lines = []
+    for number, group in enumerate(groups, 1):
+        names = ", ".join(reviewer_names[r] for r in group["reviewers"])
+        fields = ", ".join(dict.fromkeys(FIELDS[field] for _, field in group["members"]))
+        count = len(group["reviewers"])
+        said_by = f"{count} reviewers" if count > 1 else "1 reviewer, several answers"
+        lines.append(f'R{number}. "{group["text"]}" ({said_by}: {names}; {fields}; combined weight {group["weight"]})')
+    return "\n".join(lines)
+
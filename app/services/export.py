@@ -0,0 +1,165 @@
+"""Bulk export of summaries and reviews for HRIS ingestion, as NDJSON or CSV.
+
+Rows are read through a server-side (named) cursor, EXPORT_FETCH_SIZE at a
+time, and encoded one batch at a time, so memory stays flat however many rows
+match. Both the HTTP endpoint (app.routes.export) and
+scripts/export_feedback.py stream from export_rows().
+
+Rows come out in id order and every row carries its id. That id is the
+checkpoint: an interrupted export resumes with `after=<last id written>` and
+picks up exactly where it stopped, even if rows were added meanwhile.
+
+Filters:
+    since/until  summaries: finalised (or, for drafts, last updated) date;
+                 reviews: submitted date. Both inclusive.
+    status       finalised, draft or all: the state of the cycle's summary
+                 (a cycle with no summary yet counts as a draft)
+    manager      the cycle manager's email
+
+Reviews are exported without the reviewer's name or email, as in search.
+
+Configuration:
+    EXPORT_FETCH_SIZE  Rows fetched from Postgres per round trip (default 2000)
+"""
+import csv
+import io
+import os
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+import orjson
+
+from app.services.summarisation import calculate_weight
+
+EXPORT_FETCH_SIZE = int(os.environ.get("EXPORT_FETCH_SIZE", "2000"))
+STATUSES = ("finalised", "draft", "all")
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Shared by both exports: the cycle with its subject and manager
+_CYCLE_FILTERS = """
+      AND (%(status)s = 'all' OR COALESCE(s.finalised, FALSE) = (%(status)s = 'finalised'))
+      AND (%(manager)s::text IS NULL OR m.email = %(manager)s)
+"""
+
+# Summaries with subject and manager, in id order from the checkpoint
+SUMMARIES_SQL = f"""
+SELECT s.id, s.cycle_id, fc.title AS cycle_title,
+       su.name AS subject_name, su.email AS subject_email,
+       m.name AS manager_name, m.email AS manager_email,
+       COALESCE(s.finalised, FALSE) AS finalised, s.finalised_at, s.updated_at, s.version,
+       s.content, s.weighting_explanation
+FROM summaries s
+JOIN feedback_cycles fc ON fc.id = s.cycle_id
+JOIN users su ON su.id = fc.subject_user_id
+LEFT JOIN users m ON m.id = fc.manager_user_id
+WHERE s.id > %(after)s
+      AND (%(since)s::date IS NULL OR COALESCE(s.finalised_at, s.updated_at) >= %(since)s::date)
+      AND (%(until)s::date IS NULL OR COALESCE(s.finalised_at, s.updated_at) < %(until)s::date)
+{_CYCLE_FILTERS}
+ORDER BY s.id
+"""
+
+# Reviews with their cycle's subject and manager, in id order from the checkpoint
+REVIEWS_SQL = f"""
+SELECT rv.id, r.cycle_id, fc.title AS cycle_title,
+       su.name AS subject_name, su.email AS subject_email,
+       m.name AS manager_name, m.email AS manager_email,
+       r.relationship, r.frequency, rv.submitted_at,
+       rv.start_doing, rv.stop_doing, rv.continue_doing, rv.example, rv.additional
+FROM reviews rv
+JOIN reviewers r ON r.id = rv.reviewer_id
+JOIN feedback_cycles fc ON fc.id = r.cycle_id
+JOIN users su ON su.id = fc.subject_user_id
+LEFT JOIN users m ON m.id = fc.manager_user_id
+LEFT JOIN summaries s ON s.cycle_id = fc.id
+WHERE rv.id > %(after)s
+      AND (%(since)s::date IS NULL OR rv.submitted_at >= %(since)s::date)
+      AND (%(until)s::date IS NULL OR rv.submitted_at < %(until)s::date)
+{_CYCLE_FILTERS}
+ORDER BY rv.id
+"""
+
+# Query and CSV columns per export
+EXPORTS = {
+    "summaries": (SUMMARIES_SQL, (
+        "id", "cycle_id", "cycle_title", "subject_name", "subject_email", "manager_name", "manager_email",
+        "finalised", "finalised_at", "updated_at", "version", "content", "weighting_explanation",
+    )),
+    "reviews": (REVIEWS_SQL, (
+        "id", "cycle_id", "cycle_title", "subject_name", "subject_email", "manager_name", "manager_email",
+        "relationship", "frequency", "weight", "submitted_at",
+        "start_doing", "stop_doing", "continue_doing", "example", "additional",
+    )),
+}
+
+
+def export_params(since: Optional[date] = None, until: Optional[date] = None, status: str = "finalised",
+                  manager: Optional[str] = None, after: int = 0) -> dict:
+    """Parameters for the export queries; until is inclusive."""
+    return {
+        "since": since,
+        "until": until + timedelta(days=1) if until else None,
+        "status": status,
+        "manager": manager,
+        "after": after,
+    }
+
+
+def export_rows(conn, kind: str, params: dict) -> Iterator[list[dict]]:
+    """
+    Batches of export rows, read through a named cursor.
+
+    The cursor lives in the connection's current transaction; the caller owns
+    the connection and closes it (which also drops the cursor) when done.
+    """
+    query, _ = EXPORTS[kind]
+    cur = conn.cursor(name=f"export_{kind}")
+    cur.itersize = EXPORT_FETCH_SIZE
+    try:
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            if kind == "reviews":
+                for row in rows:
+                    row["weight"] = calculate_weight(row["relationship"], row["frequency"])
+            yield rows
+    finally:
+        cur.close()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def encode_batches(batches: Iterator[list[dict]], kind: str, fmt: str, header: bool = True) -> Iterator[tuple[bytes, int]]:
+    """
+    Encode batches of rows as NDJSON lines or CSV records.
+
+    Yields (chunk, id of the batch's last row), so a writer can record its
+    checkpoint once a chunk is safely written. The CSV header is the first
+    chunk (checkpoint 0) when `header` is set.
+    """
+    _, columns = EXPORTS[kind]
+    if fmt == "ndjson":
+        for rows in batches:
+            yield b"".join(orjson.dumps({c: row[c] for c in columns}) + b"\n" for row in rows), rows[-1]["id"]
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+        yield buffer.getvalue().encode(), 0
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row[c]) for c in columns] for row in rows)
+        yield buffer.getvalue().encode(), rows[-1]["id"]
@@ -0,0 +1,165 @@
+"""Outbound calls to Anthropic (Claude) and OpenAI (Whisper).
+
+All AI traffic goes through these helpers so it is admitted by the shared
+per-model governor in app.services.ai_governor and protected by the retry,
+circuit breaker and hedging policies in app.services.resilience. Calls can
+also be recorded to, and replayed from, a cassette (app.services.cassettes).
+"""
+import hashlib
+import io
+import os
+import time
+from typing import Optional
+
+from app import profiling, tracing
+from app.metrics import AI_REQUEST_DURATION, AI_TOKENS
+from app.services import cassettes
+from app.services.ai_governor import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, estimate_tokens, get_governor
+)
+from app.services.resilience import (
+    RETRY_ATTEMPTS_BACKGROUND, RETRY_ATTEMPTS_INTERACTIVE, RetryPolicy,
+    call_with_resilience, call_with_resilience_async
+)
+
+WHISPER_URL = os.environ.get("OPENAI_WHISPER_URL", "https://api.openai.com/v1/audio/transcriptions")
+WHISPER_MODEL = "whisper-1"
+WHISPER_TIMEOUT = float(os.environ.get("WHISPER_TIMEOUT", "30"))
+ANTHROPIC_TIMEOUT = float(os.environ.get("ANTHROPIC_TIMEOUT", "120"))
+
+
+def retry_policy_for(priority: int) -> RetryPolicy:
+    """Fewer attempts when a user is waiting, more for background work."""
+    if priority <= PRIORITY_INTERACTIVE:
+        return RetryPolicy(RETRY_ATTEMPTS_INTERACTIVE)
+    return RetryPolicy(RETRY_ATTEMPTS_BACKGROUND)
+
+
+def create_message(
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: Optional[float] = None,
+    priority: int = PRIORITY_BACKGROUND,
+    hedge: bool = False,
+    replay_key: Optional[str] = None,
+):
+    """
+    Send a single-turn prompt to Claude once the governor admits it.
+
+    Args:
+        hedge: Send a backup request if the first exceeds the p95 latency
+        replay_key: Names the call's inputs in cassettes, so a replay still
+            matches after the prompt template changes (default: the request)
+
+    Returns:
+        The Anthropic message object
+    """
+    from anthropic import Anthropic
+
+    key = f"anthropic:{model}"
+    governor = get_governor("anthropic", model)
+    kwargs = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+
+    def attempt():
+        with tracing.span("llm.call", kind="client", model=model, priority=priority) as span:
+            lease = governor.acquire(priority=priority, tokens=estimate_tokens(prompt, max_tokens))
+            profiling.record_phase("llm_queue", lease.waited)
+            if span is not None:
+                span.set_attribute("governor.wait_ms", round(lease.waited * 1000, 1))
+            tokens_used = None
+            outcome = "error"
+            start = time.perf_counter()
+            try:
+                if cassettes.MODE == "replay":
+                    from anthropic.types import Message
+                    recorded = cassettes.replay("anthropic", model, replay_key, kwargs, len(prompt))
+                    message = Message.model_validate(recorded)
+                else:
+                    # Retries are handled by call_with_resilience, not the SDK
+                    client = Anthropic(
+                        api_key=os.environ.get("ANTHROPIC_API_KEY"),
+                        max_retries=0,
+                        timeout=ANTHROPIC_TIMEOUT,
+                    )
+                    message = client.messages.create(**kwargs)
+                    if cassettes.MODE == "record":
+                        cassettes.record(
+                            "anthropic", model, replay_key, kwargs, message.model_dump(mode="json"),
+                            time.perf_counter() - start, len(prompt)
+                        )
+                outcome = "ok"
+                usage = getattr(message, "usage", None)
+                if usage is not None:
+                    tokens_used = usage.input_tokens + usage.output_tokens
+                    AI_TOKENS.inc(usage.input_tokens, model, "input")
+                    AI_TOKENS.inc(usage.output_tokens, model, "output")
+                    if span is not None:
+                        span.set_attribute("llm.input_tokens", usage.input_tokens)
+                        span.set_attribute("llm.output_tokens", usage.output_tokens)
+                return message
+            finally:
+                elapsed = time.perf_counter() - start
+                AI_REQUEST_DURATION.observe(elapsed, "anthropic", model, outcome)
+                profiling.record_phase("llm", elapsed)
+                lease.release(tokens_used)
+
+    return call_with_resilience(key, attempt, retry_policy_for(priority), hedge=hedge)
+
+
+async def transcribe_audio(
+    filename: str,
+    contents: bytes,
+    api_key: str,
+    priority: int = PRIORITY_INTERACTIVE,
+    hedge: bool = False,
+) -> str:
+    """
+    Transcribe audio with Whisper once the governor admits it.
+
+    Raises the underlying httpx errors so callers can map them to responses.
+    """
+    import httpx
+
+    key = f"openai:{WHISPER_MODEL}"
+    governor = get_governor("openai", WHISPER_MODEL)
+    # What identifies the call in cassettes
+    request = {"model": WHISPER_MODEL, "audio_sha256": hashlib.sha256(contents).hexdigest(), "audio_bytes": len(contents)}
+
+    async def attempt():
+        with tracing.span("whisper.transcribe", kind="client", model=WHISPER_MODEL, audio_bytes=len(contents)):
+            lease = await governor.acquire_async(priority=priority)
+            profiling.record_phase("llm_queue", lease.waited)
+            outcome = "error"
+            start = time.perf_counter()
+            try:
+                if cassettes.MODE == "replay":
+                    transcript = await cassettes.replay_async("openai", WHISPER_MODEL, None, request)
+                    outcome = "ok"
+                    return transcript
+                async with httpx.AsyncClient(timeout=WHISPER_TIMEOUT) as client:
+                    response = await client.post(
+                        WHISPER_URL,
+                        headers={'Authorization': f'Bearer {api_key}'},
+                        files={'file': (filename, io.BytesIO(contents), 'audio/webm')},
+                        data={'model': WHISPER_MODEL, 'response_format': 'text'}
+                    )
+                    response.raise_for_status()
+                    outcome = "ok"
+                    transcript = response.text.strip()
+                if cassettes.MODE == "record":
+                    cassettes.record("openai", WHISPER_MODEL, None, request, transcript, time.perf_counter() - start)
+                return transcript
+            finally:
+                elapsed = time.perf_counter() - start
+                AI_REQUEST_DURATION.observe(elapsed, "openai", WHISPER_MODEL, outcome)
+                profiling.record_phase("llm", elapsed)
+                lease.release()
+
+    return await call_with_resilience_async(key, attempt, retry_policy_for(priority), hedge=hedge)
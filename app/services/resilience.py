@@ -0,0 +1,359 @@
+"""Retries, circuit breaking and request hedging for outbound AI calls.
+
+- Retries use capped exponential backoff with full jitter and only apply to
+  failures that are safe to repeat (timeouts, connection errors, 429, 5xx).
+- A circuit breaker per provider/model fails fast while the provider is down
+  and lets a single probe through after a cool-down.
+- Hedging sends a second copy of a latency-critical call once the first has
+  been outstanding longer than the observed p95, and uses whichever finishes
+  first. A sync call's first copy runs on a thread of its own, so it never
+  waits behind other calls; backups share a pool per provider/model, sized
+  to its governor's concurrency since more could not be sent at once anyway.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = float(os.environ.get("AI_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("AI_RETRY_MAX_DELAY", "8"))
+# Interactive calls have a user waiting, so they get fewer attempts
+RETRY_ATTEMPTS_INTERACTIVE = int(os.environ.get("AI_RETRY_ATTEMPTS_INTERACTIVE", "2"))
+RETRY_ATTEMPTS_BACKGROUND = int(os.environ.get("AI_RETRY_ATTEMPTS_BACKGROUND", "5"))
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("AI_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.environ.get("AI_BREAKER_RESET", "30"))
+
+HEDGE_ENABLED = os.environ.get("AI_HEDGE_ENABLED", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("AI_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("AI_HEDGE_MIN_SAMPLES", "20"))
+# Hedge delay used until enough latency samples have been observed
+HEDGE_DEFAULT_DELAY = float(os.environ.get("AI_HEDGE_DEFAULT_DELAY", "5"))
+# Threads for sync backup requests per provider/model; 0 sizes them from its governor's concurrency
+HEDGE_WORKERS = int(os.environ.get("AI_HEDGE_WORKERS", "0"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"{key}: circuit open, retry in {retry_after:.0f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Whether a failed call is safe and worthwhile to repeat."""
+    import anthropic
+    import httpx
+
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(exc, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    status = _status_code(exc)
+    return status in RETRYABLE_STATUS_CODES
+
+
+def _retry_after_header(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter."""
+
+    def __init__(self, attempts: int, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, exc: Optional[Exception] = None) -> float:
+        """Seconds to sleep before retry number `attempt` (1-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        hinted = _retry_after_header(exc) if exc is not None else None
+        if hinted is not None:
+            delay = max(delay, min(hinted, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        key: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+    ):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be attempted."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.key, max(self.reset_seconds - elapsed, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_neutral(self):
+        """Outcome says nothing about provider health; just free the probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.key}: circuit opened after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures}
+
+
+class LatencyTracker:
+    """Recent successful-call latencies for hedge thresholds."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return HEDGE_DEFAULT_DELAY
+            ordered = sorted(self._samples)
+        index = min(int(HEDGE_PERCENTILE * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_latencies: dict[str, LatencyTracker] = {}
+_hedge_executors: dict[str, ThreadPoolExecutor] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(key: str) -> CircuitBreaker:
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(key)
+        return _breakers[key]
+
+
+def get_latency_tracker(key: str) -> LatencyTracker:
+    with _registry_lock:
+        if key not in _latencies:
+            _latencies[key] = LatencyTracker()
+        return _latencies[key]
+
+
+def get_hedge_executor(key: str) -> ThreadPoolExecutor:
+    """Pool for the backup copies of hedged sync calls to one provider/model."""
+    from app.services.ai_governor import get_governor
+
+    with _registry_lock:
+        if key not in _hedge_executors:
+            provider, _, model = key.partition(":")
+            workers = HEDGE_WORKERS or get_governor(provider, model).concurrency
+            _hedge_executors[key] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-hedge")
+        return _hedge_executors[key]
+
+
+def breaker_stats() -> dict:
+    """Circuit state for every provider/model used in this process."""
+    return {key: breaker.stats() for key, breaker in list(_breakers.items())}
+
+
+def _in_thread(fn: Callable) -> Future:
+    """Run fn on a new thread, as a Future."""
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="ai-hedge-primary", daemon=True).start()
+    return future
+
+
+def _hedged(fn: Callable, delay: float, backups: ThreadPoolExecutor):
+    """Run fn, starting a backup copy on `backups` if it has not finished after `delay`."""
+    # Each copy runs in a copy of the caller's context so trace spans nest correctly.
+    # The primary gets its own thread: a pool slot could be held by calls
+    # queued in the governor, and this call would wait behind them unseen.
+    primary = _in_thread(fn)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    backup = backups.submit(contextvars.copy_context().run, fn)
+    pending = {primary, backup}
+    error = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        # A backup still queued for a pool thread is not sent at all
+        backup.cancel()
+
+
+async def _hedged_async(fn: Callable, delay: float):
+    """Async variant of _hedged for coroutine functions."""
+    primary = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    backup = asyncio.ensure_future(fn())
+    pending = {primary, backup}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def call_with_resilience(key: str, fn: Callable, policy: RetryPolicy, hedge: bool = False):
+    """
+    Call fn() with circuit breaking, retries and optional hedging.
+
+    Args:
+        key: "provider:model" used for the breaker and latency stats
+        fn: Zero-argument callable performing one attempt
+        policy: Retry policy for retryable failures
+        hedge: Send a backup request after the observed p95 latency
+    """
+    breaker = get_breaker(key)
+    latencies = get_latency_tracker(key)
+
+    for attempt in range(1, policy.attempts + 1):
+        breaker.before_call()
+        start = time.monotonic()
+        try:
+            if hedge and HEDGE_ENABLED:
+                result = _hedged(fn, latencies.hedge_delay(), get_hedge_executor(key))
+            else:
+                result = fn()
+        except Exception as e:
+            if not is_retryable(e):
+                # A 4xx means the provider is up; anything else is neutral
+                if _status_code(e) is not None:
+                    breaker.record_success()
+                else:
+                    breaker.record_neutral()
+                raise
+            breaker.record_failure()
+            if attempt == policy.attempts:
+                raise
+            delay = policy.delay(attempt, e)
+            logger.warning(f"{key}: attempt {attempt} failed ({e!r}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        latencies.record(time.monotonic() - start)
+        return result
+
+
+async def call_with_resilience_async(key: str, fn: Callable, policy: RetryPolicy, hedge: bool = False):
+    """Async variant of call_with_resilience; fn returns a coroutine."""
+    breaker = get_breaker(key)
+    latencies = get_latency_tracker(key)
+
+    for attempt in range(1, policy.attempts + 1):
+        breaker.before_call()
+        start = time.monotonic()
+        try:
+            if hedge and HEDGE_ENABLED:
+                result = await _hedged_async(fn, latencies.hedge_delay())
+            else:
+                result = await fn()
+        except Exception as e:
+            if not is_retryable(e):
+                # A 4xx means the provider is up; anything else is neutral
+                if _status_code(e) is not None:
+                    breaker.record_success()
+                else:
+                    breaker.record_neutral()
+                raise
+            breaker.record_failure()
+            if attempt == policy.attempts:
+                raise
+            delay = policy.delay(attempt, e)
+            logger.warning(f"{key}: attempt {attempt} failed ({e!r}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        latencies.record(time.monotonic() - start)
+        return result
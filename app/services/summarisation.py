@@ -1,9 +1,24 @@
 """AI summarisation service using Claude API."""
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app import profiling, tracing
+from app.live import notify_cycle
+from app.metrics import AI_PROMPT_TOKENS_SAVED, BACKGROUND_JOB_DURATION, BACKGROUND_JOBS
+from app.services.ai_governor import PRIORITY_BACKGROUND
+from app.services import cassettes, dedup
+from app.services import themes as theme_extraction
+from app.services.providers import create_message
+from app.services.summary_history import save_summary
 
 logger = logging.getLogger(__name__)
 
+# Review columns that go into the prompt; they identify a summary call in cassettes
+PROMPT_REVIEW_FIELDS = ("reviewer_name", "relationship", "frequency", *dedup.FIELDS)
+
 # Weighting factors
 RELATIONSHIP_WEIGHTS = {
     "manager": 1.0,
@@ -31,6 +46,18 @@ FREQUENCY_LABELS = {
     "rarely": "rarely",
 }
 
+# From this many reviews, answer sentences that belong to a theme are cited as
+# "[theme N]" instead of repeated, so the prompt grows with distinct points
+# rather than with reviewers. Examples are always kept verbatim.
+THEME_COMPACT_REVIEWS = int(os.environ.get("THEME_COMPACT_REVIEWS", "6"))
+
+
+def log_missing_numpy():
+    """Warn (once, at startup) when NumPy is missing, since themes and collapsing then do nothing."""
+    if theme_extraction.np is None:
+        logger.warning("NumPy is not installed: summaries are generated without recurring themes or "
+                       "collapsed repeated answers (pip install -r requirements-optional.txt)")
+
 
 def calculate_weight(relationship: str, frequency: str) -> float:
     """Calculate combined weight from relationship and frequency."""
@@ -39,55 +66,117 @@ def calculate_weight(relationship: str, frequency: str) -> float:
     return round(rel_weight * freq_weight, 2)
 
 
-def generate_summary(employee_name: str, reviews: list[dict]) -> tuple[str, str]:
-    """
-    Generate AI summary from reviews.
+def find_themes(employee_name: str, reviews: list[dict]) -> list[dict]:
+    """Recurring themes across reviews, weighted by calculate_weight (local, no API call)."""
+    start = time.perf_counter()
+    found = theme_extraction.extract_themes(
+        reviews,
+        lambda review: calculate_weight(review["relationship"], review["frequency"]),
+        exclude=employee_name.split(),
+    )
+    profiling.record_phase("prompt", time.perf_counter() - start)
+    return found
 
-    Args:
-        employee_name: Name of the employee being reviewed
-        reviews: List of review dicts with reviewer info
 
-    Returns:
-        Tuple of (summary_content, weighting_explanation)
+def stored_themes(themes: list[dict], reviews: list[dict]) -> list[dict]:
+    """Themes in the form saved with the summary for the dashboard (no reviewer names)."""
+    return theme_extraction.stored(
+        themes, [RELATIONSHIP_LABELS.get(review["relationship"], review["relationship"]) for review in reviews]
+    )
+
+
+def _answer(review_index: int, field: str, text: Optional[str], theme_of: dict, duplicate_of: dict) -> Optional[str]:
+    """
+    An answer as it goes into the prompt: a reference if it was collapsed as a
+    repeated point, otherwise with sentences already covered by a theme
+    replaced by a reference to the theme.
     """
+    duplicate = duplicate_of.get((review_index, field))
+    if duplicate is not None:
+        return dedup.reference(duplicate)
+    if not text or not theme_of:
+        return text
+    parts = []
+    for sentence in theme_extraction.split_sentences(text):
+        number = theme_of.get((review_index, field, sentence))
+        reference = f"[theme {number}]"
+        if number is None:
+            parts.append(sentence)
+        elif not parts or parts[-1] != reference:
+            parts.append(reference)
+    return " ".join(parts)
+
+
+def _build_prompt(employee_name: str, reviews: list[dict], themes: list[dict], duplicates: list[dict]) -> str:
+    """The summary prompt, with themes and repeated points given once up front."""
+    reviewer_names = [review["reviewer_name"] for review in reviews]
+
+    # Collapsed answers, by (review index, field)
+    duplicate_of = {member: number for number, group in enumerate(duplicates, 1) for member in group["members"]}
+    duplicate_digest = dedup.digest(duplicates, reviewer_names)
+    theme_digest = theme_extraction.digest(
+        themes, reviewer_names, {member: dedup.reference(number) for member, number in duplicate_of.items()}
+    )
+
+    # Sentences the digest already carries, by (review index, field, sentence)
+    theme_of = {}
+    if len(reviews) >= THEME_COMPACT_REVIEWS:
+        for number, theme in enumerate(themes, 1):
+            for review_index, field, sentence in theme["sentences"]:
+                if field != "example":
+                    theme_of[(review_index, field, sentence)] = number
+
     # Build feedback section for prompt
     feedback_sections = []
-    weighted_reviews = []
 
-    for review in reviews:
+    for index, review in enumerate(reviews):
         weight = calculate_weight(review["relationship"], review["frequency"])
         rel_label = RELATIONSHIP_LABELS.get(review["relationship"], review["relationship"])
         freq_label = FREQUENCY_LABELS.get(review["frequency"], review["frequency"])
 
-        weighted_reviews.append({
-            "name": review["reviewer_name"],
-            "relationship": rel_label,
-            "frequency": freq_label,
-            "weight": weight,
-        })
-
         section = f"""### Reviewer: {review["reviewer_name"]} ({rel_label}, works together {freq_label})
 **Weight**: {weight} (based on relationship and collaboration frequency)
 
-**Start doing**: {review["start_doing"]}
+**Start doing**: {_answer(index, "start_doing", review["start_doing"], theme_of, duplicate_of)}
 
-**Stop doing**: {review["stop_doing"]}
+**Stop doing**: {_answer(index, "stop_doing", review["stop_doing"], theme_of, duplicate_of)}
 
-**Continue doing**: {review["continue_doing"]}
+**Continue doing**: {_answer(index, "continue_doing", review["continue_doing"], theme_of, duplicate_of)}
 
-**Example**: {review["example"]}
+**Example**: {_answer(index, "example", review["example"], theme_of, duplicate_of)}
 
-**Additional**: {review["additional"] or "N/A"}
+**Additional**: {_answer(index, "additional", review["additional"], theme_of, duplicate_of) or "N/A"}
 """
         feedback_sections.append(section)
 
     feedback_text = "\n---\n".join(feedback_sections)
 
-    prompt = f"""You are summarising 360-degree feedback for an employee performance review.
+    theme_instruction = (
+        "\nTreat the recurring themes as the main candidates for Strengths and Growth Areas; "
+        "a theme raised by several heavily weighted reviewers is high confidence."
+    ) if theme_digest else ""
+    duplicate_instruction = (
+        "\nEach repeated point was written (near) verbatim by the reviewers listed; "
+        "count it once, with its combined weight, and do not quote it as several reviewers' independent words."
+    ) if duplicate_digest else ""
+    themes_text = f"""
+## Recurring Themes
+Found across reviewers before this request (weight is the reviewers' combined weight):
+
+{theme_digest}
+""" if theme_digest else ""
+    duplicates_text = f"""
+## Repeated Points
+Near-identical answers, given once here and referenced as [R#] below:
+
+{duplicate_digest}
+""" if duplicate_digest else ""
+
+    return f"""You are summarising 360-degree feedback for an employee performance review.
 
 ## Employee
 {employee_name}
-
+{themes_text}{duplicates_text}
 ## Feedback Submissions
 
 {feedback_text}
@@ -99,24 +188,77 @@ Synthesise this feedback into a summary with these sections:
 3. **Key Examples** - Specific behaviours observed (quote or paraphrase from feedback)
 4. **Suggested Focus** - 1-2 priority areas for development
 
-Weight feedback from managers and frequent collaborators more heavily than occasional cross-functional contacts.
+Weight feedback from managers and frequent collaborators more heavily than occasional cross-functional contacts.{theme_instruction}{duplicate_instruction}
 
 Keep the tone constructive and actionable. Be concise. Use markdown formatting.
 """
 
-    # Call Claude API
-    from anthropic import Anthropic
-    client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
 
-    message = client.messages.create(
+def generate_summary(
+    employee_name: str,
+    reviews: list[dict],
+    priority: int = PRIORITY_BACKGROUND,
+    themes: Optional[list[dict]] = None,
+) -> tuple[str, str]:
+    """
+    Generate AI summary from reviews.
+
+    Args:
+        employee_name: Name of the employee being reviewed
+        reviews: List of review dicts with reviewer info
+        priority: Governor priority for the Claude call
+        themes: Output of find_themes() for these reviews (computed if not given)
+
+    Returns:
+        Tuple of (summary_content, weighting_explanation)
+    """
+    prompt_start = time.perf_counter()
+
+    if themes is None:
+        themes = find_themes(employee_name, reviews)
+
+    # Near-identical answers go into the prompt once
+    duplicates = dedup.find_duplicates(
+        reviews, lambda review: calculate_weight(review["relationship"], review["frequency"])
+    )
+    prompt = _build_prompt(employee_name, reviews, themes, duplicates)
+
+    if duplicates:
+        # Measured against the prompt as it would be without collapsing (~4 characters per token)
+        uncollapsed = _build_prompt(employee_name, reviews, themes, [])
+        tokens_saved = max(len(uncollapsed) - len(prompt), 0) // 4
+        AI_PROMPT_TOKENS_SAVED.inc(tokens_saved)
+        span = tracing.current_span()
+        if span is not None:
+            span.set_attribute("prompt.duplicate_groups", len(duplicates))
+            span.set_attribute("prompt.tokens_saved", tokens_saved)
+        logger.info(
+            f"{employee_name}: collapsed {sum(len(g['members']) for g in duplicates)} near-duplicate answers "
+            f"into {len(duplicates)}, saving ~{tokens_saved} prompt tokens"
+        )
+
+    profiling.record_phase("prompt", time.perf_counter() - prompt_start)
+
+    # Call Claude API (queued behind the shared governor)
+    message = create_message(
         model="claude-sonnet-4-20250514",
+        prompt=prompt,
         max_tokens=2048,
-        messages=[{"role": "user", "content": prompt}]
+        priority=priority,
+        replay_key=cassettes.fingerprint(
+            "summary", employee_name, [[review[field] for field in PROMPT_REVIEW_FIELDS] for review in reviews]
+        ),
     )
 
     summary_content = message.content[0].text
 
     # Generate weighting explanation
+    weighted_reviews = [{
+        "name": review["reviewer_name"],
+        "relationship": RELATIONSHIP_LABELS.get(review["relationship"], review["relationship"]),
+        "frequency": FREQUENCY_LABELS.get(review["frequency"], review["frequency"]),
+        "weight": calculate_weight(review["relationship"], review["frequency"]),
+    } for review in reviews]
     highest_weight_reviewer = max(weighted_reviews, key=lambda x: x["weight"])
     weighting_explanation = (
         f"This summary weights feedback based on reviewer relationship "
@@ -129,19 +271,53 @@ Keep the tone constructive and actionable. Be concise. Use markdown formatting.
     return summary_content, weighting_explanation
 
 
-def regenerate_summary_for_cycle(cycle_id: int):
+# Regenerations run on their own threads rather than Starlette's threadpool:
+# one can wait minutes for a governor slot, and sync endpoints share that pool
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "4"))
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+
+
+async def _submit_regeneration(cycle_id: int, **kwargs):
+    _summary_executor.submit(regenerate_summary_for_cycle, cycle_id, **kwargs)
+
+
+def schedule_summary_regeneration(background_tasks, cycle_id: int, review_id: Optional[int] = None):
+    """Queue regenerate_summary_for_cycle after the response and count it as pending."""
+    BACKGROUND_JOBS.inc(1, "regenerate_summary")
+    background_tasks.add_task(
+        _submit_regeneration, cycle_id,
+        traceparent=tracing.current_traceparent(), review_id=review_id
+    )
+
+
+def regenerate_summary_for_cycle(cycle_id: int, traceparent: Optional[str] = None, review_id: Optional[int] = None):
     """
     Background task to regenerate summary after review submission.
 
     Conditions:
     - At least 2 reviews must exist
     - Summary must NOT be finalised
+
+    Args:
+        traceparent: Trace context of the request that scheduled the job
+        review_id: Submission that triggered the regeneration (for tracing)
     """
+    with tracing.continue_trace(
+        traceparent, "regenerate_summary", cycle_id=cycle_id, triggered_by_review_id=review_id
+    ):
+        _regenerate_summary_for_cycle(cycle_id)
+
+
+def _regenerate_summary_for_cycle(cycle_id: int):
     from app.database import get_connection
-    from datetime import datetime
 
     conn = None
+    outcome = "error"
+    start = time.perf_counter()
     try:
+        # Read what the prompt needs, then let the connection go: the Claude
+        # call can wait minutes for a governor slot, and must not hold a
+        # connection (idle in transaction) while it does
         conn = get_connection()
         cur = conn.cursor()
 
@@ -156,6 +332,7 @@ def regenerate_summary_for_cycle(cycle_id: int):
 
         if review_count < 2:
             logger.info(f"Cycle {cycle_id}: Only {review_count} reviews, skipping regeneration")
+            outcome = "skipped"
             return
 
         # Check if summary exists and is finalised
@@ -167,6 +344,7 @@ def regenerate_summary_for_cycle(cycle_id: int):
 
         if existing_summary and existing_summary["finalised"]:
             logger.info(f"Cycle {cycle_id}: Summary is finalised, skipping regeneration")
+            outcome = "skipped"
             return
 
         # Get subject name for generation
@@ -189,27 +367,27 @@ def regenerate_summary_for_cycle(cycle_id: int):
             (cycle_id,)
         )
         reviews = [dict(row) for row in cur.fetchall()]
+        conn.commit()
+        conn.close()
+        conn = None
 
         # Generate summary
-        summary_content, weighting_explanation = generate_summary(subject_name, reviews)
-
-        # Save or update summary
-        now = datetime.now()
-        if existing_summary:
-            cur.execute(
-                """UPDATE summaries
-                   SET content = %s, weighting_explanation = %s, updated_at = %s
-                   WHERE cycle_id = %s""",
-                (summary_content, weighting_explanation, now, cycle_id)
-            )
-        else:
-            cur.execute(
-                """INSERT INTO summaries (cycle_id, content, weighting_explanation, updated_at)
-                   VALUES (%s, %s, %s, %s)""",
-                (cycle_id, summary_content, weighting_explanation, now)
-            )
+        themes = find_themes(subject_name, reviews)
+        with tracing.span("summary.generate", review_count=len(reviews), theme_count=len(themes)):
+            summary_content, weighting_explanation = generate_summary(subject_name, reviews, themes=themes)
+
+        # Save as the new current version (unless it was finalised meanwhile)
+        conn = get_connection()
+        cur = conn.cursor()
+        if not save_summary(cur, cycle_id, summary_content, weighting_explanation,
+                            themes=stored_themes(themes, reviews)):
+            logger.info(f"Cycle {cycle_id}: Summary was finalised during generation, discarding")
+            outcome = "skipped"
+            return
 
+        notify_cycle(cur, "summary_updated", cycle_id)
         conn.commit()
+        outcome = "ok"
         logger.info(f"Cycle {cycle_id}: Summary regenerated successfully")
 
     except Exception as e:
@@ -218,3 +396,5 @@ def regenerate_summary_for_cycle(cycle_id: int):
     finally:
         if conn:
             conn.close()
+        BACKGROUND_JOBS.dec(1, "regenerate_summary")
+        BACKGROUND_JOB_DURATION.observe(time.perf_counter() - start, "regenerate_summary", outcome)
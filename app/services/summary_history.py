@@ -0,0 +1,151 @@
+"""Summary persistence: one current row per cycle plus an append-only version history.
+
+`summaries` holds exactly one row per cycle (unique cycle_id), so reading the
+current summary stays a single index lookup. Every content change is one
+statement that upserts the current row and appends the new version to
+`summary_versions`. Concurrent regenerations therefore serialise on the row
+lock instead of leaving duplicates, and a finalised summary is never
+overwritten.
+
+Version sources: "ai" (generated), "edit" (manager edit), "restore" (an
+earlier version brought back) and "legacy" (rows from before history was kept).
+"""
+import difflib
+import json
+from datetime import datetime
+from typing import Optional
+
+# Appends the row written by the `saved` CTE to the history
+_APPEND_VERSION = """
+history AS (
+    INSERT INTO summary_versions (cycle_id, version, source, content, weighting_explanation, created_at)
+    SELECT cycle_id, version, %(source)s, content, weighting_explanation, updated_at FROM saved
+)
+SELECT * FROM saved
+"""
+
+# New AI output: insert, or replace the current summary unless it is finalised
+SAVE_SUMMARY_SQL = """
+WITH saved AS (
+    INSERT INTO summaries (cycle_id, content, weighting_explanation, themes, updated_at, version)
+    VALUES (%(cycle_id)s, %(content)s, %(weighting_explanation)s, %(themes)s::jsonb, %(now)s, 1)
+    ON CONFLICT (cycle_id) DO UPDATE
+        SET content = EXCLUDED.content,
+            weighting_explanation = EXCLUDED.weighting_explanation,
+            themes = EXCLUDED.themes,
+            updated_at = EXCLUDED.updated_at,
+            version = summaries.version + 1
+        WHERE NOT COALESCE(summaries.finalised, FALSE)
+    RETURNING *
+),""" + _APPEND_VERSION
+
+# Manager edit of an existing, unfinalised summary
+EDIT_SUMMARY_SQL = """
+WITH saved AS (
+    UPDATE summaries
+    SET content = %(content)s, updated_at = %(now)s, version = version + 1
+    WHERE cycle_id = %(cycle_id)s AND NOT COALESCE(finalised, FALSE)
+    RETURNING *
+),""" + _APPEND_VERSION
+
+# Bring an earlier version back as the newest one
+RESTORE_VERSION_SQL = """
+WITH restored AS (
+    SELECT content, weighting_explanation FROM summary_versions
+    WHERE cycle_id = %(cycle_id)s AND version = %(version)s
+),
+saved AS (
+    UPDATE summaries s
+    SET content = restored.content, weighting_explanation = restored.weighting_explanation,
+        updated_at = %(now)s, version = s.version + 1
+    FROM restored
+    WHERE s.cycle_id = %(cycle_id)s AND NOT COALESCE(s.finalised, FALSE)
+    RETURNING s.*
+),""" + _APPEND_VERSION
+
+# Finalisation locks the current version; the content does not change
+FINALISE_SUMMARY_SQL = """
+UPDATE summaries
+SET finalised = TRUE, finalised_at = %(now)s, updated_at = %(now)s
+WHERE cycle_id = %(cycle_id)s AND NOT COALESCE(finalised, FALSE)
+RETURNING *
+"""
+
+# Newest first, without content (uses the (cycle_id, version) unique index)
+LIST_VERSIONS_SQL = """
+SELECT version, source, length(content) AS length, created_at
+FROM summary_versions
+WHERE cycle_id = %s
+ORDER BY version DESC
+"""
+
+GET_VERSION_SQL = """
+SELECT version, source, length(content) AS length, created_at, content, weighting_explanation
+FROM summary_versions
+WHERE cycle_id = %s AND version = %s
+"""
+
+# Most recent AI output, the default baseline for "what did I change?"
+LATEST_AI_VERSION_SQL = """
+SELECT max(version) AS version FROM summary_versions WHERE cycle_id = %s AND source = 'ai'
+"""
+
+
+def save_summary(cur, cycle_id: int, content: str, weighting_explanation: Optional[str],
+                 source: str = "ai", themes: Optional[list] = None) -> Optional[dict]:
+    """
+    Write a new current summary and record it as a version. None if the summary is finalised.
+
+    `themes` are the recurring themes the summary was generated from (see
+    app.services.themes); they describe the reviews, so edits keep them.
+    """
+    cur.execute(SAVE_SUMMARY_SQL, {
+        "cycle_id": cycle_id, "content": content, "weighting_explanation": weighting_explanation,
+        "themes": json.dumps(themes) if themes is not None else None,
+        "now": datetime.now(), "source": source,
+    })
+    return cur.fetchone()
+
+
+def edit_summary(cur, cycle_id: int, content: str) -> Optional[dict]:
+    """Replace the content of an existing summary. None if it is missing or finalised."""
+    cur.execute(EDIT_SUMMARY_SQL, {"cycle_id": cycle_id, "content": content, "now": datetime.now(), "source": "edit"})
+    return cur.fetchone()
+
+
+def restore_version(cur, cycle_id: int, version: int) -> Optional[dict]:
+    """Make an earlier version current again. None if the version or summary is missing, or finalised."""
+    cur.execute(RESTORE_VERSION_SQL, {"cycle_id": cycle_id, "version": version, "now": datetime.now(), "source": "restore"})
+    return cur.fetchone()
+
+
+def finalise_summary(cur, cycle_id: int) -> Optional[dict]:
+    """Lock the current summary. None if it is missing or already finalised."""
+    cur.execute(FINALISE_SUMMARY_SQL, {"cycle_id": cycle_id, "now": datetime.now()})
+    return cur.fetchone()
+
+
+def list_versions(cur, cycle_id: int) -> list[dict]:
+    cur.execute(LIST_VERSIONS_SQL, (cycle_id,))
+    return cur.fetchall()
+
+
+def get_version(cur, cycle_id: int, version: int) -> Optional[dict]:
+    cur.execute(GET_VERSION_SQL, (cycle_id, version))
+    return cur.fetchone()
+
+
+def latest_ai_version(cur, cycle_id: int) -> Optional[int]:
+    cur.execute(LATEST_AI_VERSION_SQL, (cycle_id,))
+    return cur.fetchone()["version"]
+
+
+def diff_versions(old: dict, new: dict) -> str:
+    """Unified line diff between two versions' content."""
+    return "\n".join(difflib.unified_diff(
+        old["content"].splitlines(),
+        new["content"].splitlines(),
+        fromfile=f"v{old['version']} ({old['source']})",
+        tofile=f"v{new['version']} ({new['source']})",
+        lineterm="",
+    ))
@@ -0,0 +1,250 @@
+"""Local theme extraction: recurring points across a cycle's reviews, found without an AI call.
+
+Review answers are split into sentences and turned into TF-IDF vectors
+(sublinear term frequency, smoothed IDF, L2-normalised). Sentences are then
+grouped by average-linkage agglomerative clustering on cosine similarity,
+and merging stops once no two groups are similar enough. A group becomes a
+theme when at least two different reviewers raised it. Themes are scored by
+the summed calculate_weight() of those reviewers, so a point made by the
+manager and a weekly peer outranks one from two occasional contacts.
+
+The whole pipeline is a few small NumPy matrix operations, a few
+milliseconds for a typical cycle. The result is used in two places:
+    - a compact digest in the summary prompt (see digest()), and
+    - summaries.themes, shown on the manager dashboard without reviewer names.
+
+NumPy is optional: without it extract_themes() returns no themes and the
+prompt is built as before.
+
+Configuration:
+    THEME_SIMILARITY  Minimum average cosine similarity for sentences to share a theme (default 0.3)
+"""
+import os
+import re
+from collections import Counter
+from typing import Callable, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # Optional: no themes
+    np = None
+
+THEME_SIMILARITY = float(os.environ.get("THEME_SIMILARITY", "0.3"))
+MAX_THEMES = 6
+MIN_REVIEWERS = 2
+LABEL_TERMS = 3
+QUOTES_PER_THEME = 2
+MIN_SENTENCE_TOKENS = 3
+
+# Answer fields in prompt order, with how the digest describes them
+FIELDS = {
+    "start_doing": "start",
+    "stop_doing": "stop",
+    "continue_doing": "continue",
+    "example": "example",
+    "additional": "additional",
+}
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_TOKEN_RE = re.compile(r"[a-z][a-z'-]*[a-z]|[a-z]")
+
+# Common English words plus words every piece of feedback uses
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing done down during each few for from further
+get gets getting got had has have having he her here hers him his how i if in into is it its
+itself just lot lots me more most much my no nor not now of off on once only or other our ours out
+over own really same she should so some such than that the their theirs them then there these they
+this those through to too under until up us very was we were what when where which while who whom
+why will with would you your yours
+always sometimes often make makes making made keep keeps thing things way ways time times
+start starting stop stopping continue continuing doing feedback
+""".split())
+
+
+# Suffix -> replacement, longest first
+_SUFFIXES = (
+    ("ations", "ate"), ("ation", "ate"), ("ingly", ""), ("ings", ""), ("ing", ""),
+    ("edly", ""), ("ed", ""), ("ies", "y"), ("es", ""), ("s", ""),
+)
+
+
+def _stem(word: str) -> str:
+    """Light suffix stripping so "delegate", "delegating" and "delegation" share a term."""
+    for suffix, replacement in _SUFFIXES:
+        if suffix == "s" and word.endswith(("ss", "us", "is")):
+            break
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[: -len(suffix)] + replacement
+            break
+    return word.rstrip("e") if len(word) > 4 else word
+
+
+def tokenise(text: str, surface: Counter = None, exclude: frozenset = frozenset()) -> list[str]:
+    """Stemmed content words of a sentence; optionally counts the words each stem came from."""
+    terms = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if word in STOPWORDS or word in exclude or len(word) < 3:
+            continue
+        term = _stem(word)
+        terms.append(term)
+        if surface is not None:
+            surface[(term, word)] += 1
+    return terms
+
+
+def split_sentences(text: str) -> list[str]:
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+
+def _sentences(reviews: list[dict], weight_of: Callable[[dict], float]) -> list[dict]:
+    sentences = []
+    for index, review in enumerate(reviews):
+        weight = weight_of(review)
+        for field in FIELDS:
+            for text in split_sentences(review.get(field) or ""):
+                sentences.append({"reviewer": index, "field": field, "text": text, "weight": weight})
+    return sentences
+
+
+def _tfidf(documents: list[list[str]]):
+    """Row-normalised TF-IDF matrix and its vocabulary."""
+    vocabulary = {term: i for i, term in enumerate(sorted({t for doc in documents for t in doc}))}
+    counts = np.zeros((len(documents), len(vocabulary)))
+    for row, doc in enumerate(documents):
+        for term, count in Counter(doc).items():
+            counts[row, vocabulary[term]] = count
+    present = counts > 0
+    tf = np.where(present, 1 + np.log(np.where(present, counts, 1)), 0)
+    idf = np.log((1 + len(documents)) / (1 + present.sum(axis=0))) + 1
+    vectors = tf * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms), vocabulary
+
+
+def _cluster(vectors, threshold: float) -> list[list[int]]:
+    """Average-linkage agglomerative clustering on cosine similarity."""
+    n = len(vectors)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+    sizes = np.ones(n)
+    members = [[i] for i in range(n)]
+    for _ in range(n - 1):
+        flat = int(np.argmax(similarity))
+        i, j = divmod(flat, n)
+        if similarity[i, j] < threshold:
+            break
+        # Average linkage: the merged group's similarity to each other group is the size-weighted mean
+        merged = (sizes[i] * similarity[i] + sizes[j] * similarity[j]) / (sizes[i] + sizes[j])
+        similarity[i, :] = merged
+        similarity[:, i] = merged
+        similarity[i, i] = -np.inf
+        similarity[j, :] = -np.inf
+        similarity[:, j] = -np.inf
+        sizes[i] += sizes[j]
+        members[i].extend(members[j])
+        members[j] = []
+    return [group for group in members if group]
+
+
+def extract_themes(reviews: list[dict], weight_of: Callable[[dict], float], exclude: Iterable[str] = ()) -> list[dict]:
+    """
+    Recurring themes across reviews, highest weight first.
+
+    Each theme has a short label, its key terms, the reviewers (by index into
+    `reviews`) who raised it with their summed weight, how often it came up
+    under each answer field, and up to QUOTES_PER_THEME representative
+    sentences. `exclude` lists words to ignore, such as the subject's name,
+    which would otherwise make unrelated sentences look alike.
+    """
+    if np is None or len(reviews) < MIN_REVIEWERS:
+        return []
+
+    exclude = frozenset(word.lower() for word in exclude)
+    surface = Counter()
+    sentences = [s for s in _sentences(reviews, weight_of)
+                 if len(tokenise(s["text"], exclude=exclude)) >= MIN_SENTENCE_TOKENS]
+    documents = [tokenise(s["text"], surface, exclude) for s in sentences]
+    if len(documents) < 2:
+        return []
+
+    vectors, vocabulary = _tfidf(documents)
+    terms = sorted(vocabulary, key=vocabulary.get)
+    # Most common original word for each stem, for readable labels
+    words = {}
+    for (term, word), _ in surface.most_common():
+        words.setdefault(term, word)
+
+    themes = []
+    for group in _cluster(vectors, THEME_SIMILARITY):
+        reviewers = {sentences[i]["reviewer"]: sentences[i]["weight"] for i in group}
+        if len(reviewers) < MIN_REVIEWERS:
+            continue
+        centroid = vectors[group].mean(axis=0)
+        top_terms = [words[terms[k]] for k in np.argsort(-centroid)[:LABEL_TERMS] if centroid[k] > 0]
+        # Quotes: closest to the centroid, one per reviewer, heavier reviewers first on ties
+        closeness = vectors[group] @ centroid
+        order = sorted(range(len(group)), key=lambda k: (-round(float(closeness[k]), 3), -sentences[group[k]]["weight"]))
+        quotes, quoted = [], set()
+        for k in order:
+            sentence = sentences[group[k]]
+            if sentence["reviewer"] not in quoted:
+                quoted.add(sentence["reviewer"])
+                quotes.append({"reviewer": sentence["reviewer"], "field": sentence["field"], "text": sentence["text"]})
+            if len(quotes) == QUOTES_PER_THEME:
+                break
+        themes.append({
+            "label": ", ".join(top_terms),
+            "terms": top_terms,
+            "weight": round(sum(reviewers.values()), 2),
+            "reviewers": sorted(reviewers),
+            "fields": dict(Counter(sentences[i]["field"] for i in group)),
+            "quotes": quotes,
+            "sentences": [(sentences[i]["reviewer"], sentences[i]["field"], sentences[i]["text"]) for i in group],
+        })
+
+    themes.sort(key=lambda t: (-t["weight"], -len(t["reviewers"]), t["label"]))
+    return themes[:MAX_THEMES]
+
+
+def digest(themes: list[dict], reviewer_names: list[str], cited: dict = None) -> str:
+    """
+    Compact prompt section listing the themes, who raised them and where.
+
+    `cited` maps (reviewer index, field) to a reference for answers the prompt
+    already gives elsewhere; quotes from those answers become the reference.
+    """
+    cited = cited or {}
+    lines = []
+    for n, theme in enumerate(themes, 1):
+        names = ", ".join(reviewer_names[r] for r in theme["reviewers"])
+        fields = ", ".join(f"{FIELDS[f]} x{count}" for f, count in
+                           sorted(theme["fields"].items(), key=lambda item: -item[1]))
+        lines.append(f"{n}. **{theme['label']}** (weight {theme['weight']}; {names}; {fields})")
+        references = set()
+        for quote in theme["quotes"]:
+            reference = cited.get((quote["reviewer"], quote["field"]))
+            if reference is None:
+                lines.append(f'   - "{quote["text"]}" ({reviewer_names[quote["reviewer"]]}, {FIELDS[quote["field"]]})')
+            elif reference not in references:
+                references.add(reference)
+                lines.append(f"   - {reference}")
+    return "\n".join(lines)
+
+
+def stored(themes: list[dict], relationships: list[str]) -> list[dict]:
+    """
+    Themes as kept with the summary for the dashboard, which the subject's
+    manager can open: how many reviewers raised each one and their
+    relationship mix, with quotes unattributed. Names stay in the prompt only.
+    """
+    return [{
+        "label": theme["label"],
+        "terms": theme["terms"],
+        "weight": theme["weight"],
+        "reviewer_count": len(theme["reviewers"]),
+        "relationships": dict(Counter(relationships[r] for r in theme["reviewers"])),
+        "fields": theme["fields"],
+        # Without names, the same sentence from two reviewers would read as a repeat
+        "quotes": list({q["text"]: {"field": q["field"], "text": q["text"]} for q in theme["quotes"]}.values()),
+    } for theme in themes]
@@ -0,0 +1,331 @@
+"""Lightweight distributed tracing.
+
+Spans are tracked in a context variable, so DB statements, commits and AI
+calls made while handling a request are recorded as children of that
+request's span. Background work continues the trace through an explicit W3C
+`traceparent` string, so a summary regeneration can be tied back to the
+review submission that triggered it.
+
+Configuration:
+    TRACE_EXPORT       "file:/path/to/spans.ndjson" or "otlp:http://localhost:4318/v1/traces"
+                       (tracing is disabled when unset)
+    TRACE_SAMPLE_RATE  Fraction of new traces to record (default 1.0)
+
+Unsampled requests create no span objects, so the per-statement cost is one
+context variable lookup.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "360-feedback-tool")
+
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL = 1.0
+EXPORT_QUEUE_SIZE = 10000
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str = "internal", attributes: dict = None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)[:500]
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter.submit(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "service": TRACE_SERVICE_NAME,
+        }
+
+
+def enabled() -> bool:
+    return bool(TRACE_EXPORT)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent for the active span, for handing to background work."""
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+def _parse_traceparent(header: Optional[str]):
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, int(flags, 16) & 1 == 1
+
+
+def start_root_span(name: str, traceparent: Optional[str] = None, kind: str = "server", **attributes) -> Optional[Span]:
+    """
+    Start a span that begins or continues a trace, honouring the incoming
+    sampling decision. Returns None when the trace is not sampled.
+    """
+    if not enabled():
+        return None
+    parsed = _parse_traceparent(traceparent)
+    if parsed:
+        trace_id, parent_id, sampled = parsed
+        if not sampled:
+            return None
+    else:
+        if random.random() >= TRACE_SAMPLE_RATE:
+            return None
+        trace_id, parent_id = _new_id(128), None
+    return Span(name, trace_id, parent_id, kind, attributes)
+
+
+@contextmanager
+def _activate(span: Span):
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def span(name: str, kind: str = "internal", **attributes):
+    """
+    Context manager recording a child of the active span.
+
+    Yields the Span, or None when there is no sampled trace in progress.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return nullcontext()
+    return _activate(Span(name, parent.trace_id, parent.span_id, kind, attributes))
+
+
+def continue_trace(traceparent: Optional[str], name: str, **attributes):
+    """Context manager for background work continuing a request's trace."""
+    root = start_root_span(name, traceparent, kind="consumer", **attributes)
+    if root is None:
+        return nullcontext()
+    return _activate(root)
+
+
+class _Exporter:
+    """Batches finished spans on a daemon thread and writes them to the configured sink."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, span: Span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._export([s.to_dict() for s in batch])
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+    def flush(self, timeout: float = 5.0):
+        """Export everything queued so far (used by scripts before exiting)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export([s.to_dict() for s in batch], timeout=timeout)
+
+    def _export(self, spans: list[dict], timeout: float = 5.0):
+        if TRACE_EXPORT.startswith("file:"):
+            with open(TRACE_EXPORT[len("file:"):], "a") as f:
+                for item in spans:
+                    f.write(json.dumps(item, default=str) + "\n")
+        elif TRACE_EXPORT.startswith("otlp:"):
+            import httpx
+            httpx.post(TRACE_EXPORT[len("otlp:"):], json=_to_otlp(spans), timeout=timeout)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+
+
+def _to_otlp(spans: list[dict]) -> dict:
+    """OTLP/HTTP JSON payload for a batch of spans."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "app.tracing"},
+                "spans": [{
+                    "traceId": s["trace_id"],
+                    "spanId": s["span_id"],
+                    "parentSpanId": s["parent_id"] or "",
+                    "name": s["name"],
+                    "kind": _OTLP_KINDS.get(s["kind"], 1),
+                    "startTimeUnixNano": str(s["start_ns"]),
+                    "endTimeUnixNano": str(s["end_ns"]),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+                    "status": {"code": 2 if s["status"] == "error" else 1},
+                } for s in spans],
+            }],
+        }],
+    }
+
+
+_exporter = _Exporter()
+
+
+def flush():
+    _exporter.flush()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request.
+
+    The span ends when the last body chunk is sent, so background tasks that
+    run after the response show up as separate (linked) spans.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        root = start_root_span(f"{scope['method']} {scope['path']}", traceparent, method=scope["method"])
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        def finish(status: Optional[int] = None):
+            if root.end_ns is not None:
+                return
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            root.name = f"{scope['method']} {template}"
+            root.set_attribute("http.route", template)
+            if status is not None:
+                root.set_attribute("http.status_code", status)
+                if status >= 500:
+                    root.status = "error"
+            root.end()
+
+        status_holder = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"traceparent", root.traceparent.encode())]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish(status_holder[0])
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            finish(status_holder[0])
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Benchmark the single-query user dashboard against the previous multi-query version.
+
+Seeds a throwaway user with 10, 100 and 1000 cycles (as subject, as manager
+and as reviewer) inside a transaction that is rolled back afterwards, then
+times both implementations end to end, including building the response body.
+The legacy version returns every row; the current one returns the first page
+of each list.
+
+Usage:
+    python scripts/benchmark_dashboard.py [--sizes 10 100 1000] [--runs 50]
+"""
+import argparse
+import statistics
+import sys
+import os
+import time
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+from psycopg2.extras import execute_values
+
+from app.database import get_connection
+from app.models import DashboardCycle, InboxItem, UserDashboard, UserResponse
+from app.review_tokens import fill_tokens, issue
+from app.routes.auth import DASHBOARD_SQL, dashboard_params
+
+# The dashboard as it was before it became one statement: demo fix-up,
+# user lookup, three list queries and per-row Pydantic models.
+LEGACY_FIXUP_SQL = """
+    UPDATE feedback_cycles fc
+    SET manager_user_id = (SELECT id FROM users WHERE email = 'sam@demo.360feedback')
+    WHERE fc.subject_user_id IN (SELECT id FROM users WHERE email = 'alex@demo.360feedback')
+    AND fc.manager_user_id IS NULL
+"""
+
+LEGACY_CYCLES_SQL = """SELECT fc.id, fc.title, fc.status, fc.created_at, u.name as subject_name,
+              m.name as manager_name,
+              (SELECT COUNT(*) FROM reviewers r WHERE r.cycle_id = fc.id) as total_reviewers,
+              (SELECT COUNT(*) FROM reviewers r
+               JOIN reviews rev ON r.id = rev.reviewer_id
+               WHERE r.cycle_id = fc.id) as submitted_count
+       FROM feedback_cycles fc
+       JOIN users u ON fc.subject_user_id = u.id
+       LEFT JOIN users m ON fc.manager_user_id = m.id
+       WHERE fc.{column} = %s
+       ORDER BY fc.created_at DESC"""
+
+LEGACY_PENDING_SQL = """SELECT r.id, r.cycle_id, r.relationship, r.frequency,
+              u.name as employee_name,
+              (SELECT COUNT(*) FROM reviews WHERE reviewer_id = r.id) as has_review
+       FROM reviewers r
+       JOIN feedback_cycles fc ON r.cycle_id = fc.id
+       JOIN users u ON fc.subject_user_id = u.id
+       WHERE r.email = %s
+       ORDER BY r.created_at DESC"""
+
+
+def legacy_dashboard(cur, email: str) -> bytes:
+    cur.execute(LEGACY_FIXUP_SQL)
+    cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+    user = cur.fetchone()
+
+    def cycles(column):
+        cur.execute(LEGACY_CYCLES_SQL.format(column=column), (user["id"],))
+        return [
+            DashboardCycle(
+                id=row["id"], title=row["title"], subject_name=row["subject_name"],
+                manager_name=row.get("manager_name"), status=row["status"],
+                submitted_count=row["submitted_count"], total_reviewers=row["total_reviewers"],
+                created_at=row["created_at"]
+            )
+            for row in cur.fetchall()
+        ]
+
+    my_cycles = cycles("subject_user_id")
+    managed_cycles = cycles("manager_user_id")
+
+    cur.execute(LEGACY_PENDING_SQL, (email,))
+    pending = [
+        InboxItem(
+            employee_name=row["employee_name"], cycle_id=row["cycle_id"],
+            relationship=row["relationship"], frequency=row["frequency"], token=issue(row["id"]),
+            status="submitted" if row["has_review"] > 0 else "pending"
+        )
+        for row in cur.fetchall()
+    ]
+
+    dashboard = UserDashboard(
+        user=UserResponse(
+            id=user["id"], email=user["email"], name=user["name"],
+            is_demo=user["is_demo"], created_at=user["created_at"]
+        ),
+        my_cycles=my_cycles, managed_cycles=managed_cycles, pending_reviews=pending
+    )
+    # FastAPI re-validates through response_model before encoding
+    return UserDashboard.model_validate(dashboard.model_dump()).model_dump_json().encode()
+
+
+def aggregated_dashboard(cur, email: str) -> bytes:
+    cur.execute(DASHBOARD_SQL, dashboard_params(email))
+    return fill_tokens(cur.fetchone()["dashboard"]).encode()
+
+
+def seed(cur, size: int) -> str:
+    """Create a user with `size` cycles as subject, as manager and as reviewer."""
+    tag = uuid.uuid4().hex[:8]
+    email = f"bench-{tag}@bench.360feedback"
+    cur.execute("INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id", (email, f"Bench {tag}"))
+    user_id = cur.fetchone()["id"]
+    cur.execute("INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id", (f"other-{tag}@bench.360feedback", "Other"))
+    other_id = cur.fetchone()["id"]
+
+    cycle_rows = [(user_id, user_id, other_id, f"Cycle {i}") for i in range(size)]
+    cycle_rows += [(other_id, other_id, user_id, f"Managed {i}") for i in range(size)]
+    cycle_ids = [r["id"] for r in execute_values(
+        cur,
+        "INSERT INTO feedback_cycles (subject_user_id, created_by_user_id, manager_user_id, title) VALUES %s RETURNING id",
+        cycle_rows, fetch=True, page_size=1000
+    )]
+
+    reviewer_rows = []
+    for i, cycle_id in enumerate(cycle_ids):
+        for j in range(4):
+            reviewer_email = email if (j == 0 and i >= size) else f"r{j}-{tag}@bench.360feedback"
+            reviewer_rows.append((cycle_id, f"Reviewer {j}", reviewer_email, "peer", "weekly"))
+    reviewer_ids = [r["id"] for r in execute_values(
+        cur,
+        "INSERT INTO reviewers (cycle_id, name, email, relationship, frequency) VALUES %s RETURNING id",
+        reviewer_rows, fetch=True, page_size=1000
+    )]
+
+    review_rows = [(rid, "Start", "Stop", "Continue", "Example", None) for rid in reviewer_ids[::2]]
+    execute_values(
+        cur,
+        "INSERT INTO reviews (reviewer_id, start_doing, stop_doing, continue_doing, example, additional) VALUES %s",
+        review_rows, page_size=1000
+    )
+    cur.execute("ANALYZE feedback_cycles; ANALYZE reviewers; ANALYZE reviews; ANALYZE users")
+    return email
+
+
+def time_runs(fn, cur, email: str, runs: int) -> list[float]:
+    fn(cur, email)  # warm up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(cur, email)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def describe(timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+    return f"p50 {statistics.median(ordered):8.2f}ms  p95 {p95:8.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        for size in args.sizes:
+            email = seed(cur, size)
+            legacy = time_runs(legacy_dashboard, cur, email, args.runs)
+            aggregated = time_runs(aggregated_dashboard, cur, email, args.runs)
+            speedup = statistics.median(legacy) / statistics.median(aggregated)
+            print(f"{size:>5} cycles/user  legacy: {describe(legacy)}   single query: {describe(aggregated)}   ({speedup:.1f}x)")
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
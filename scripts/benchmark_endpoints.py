@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Benchmark the main endpoints end to end, with baselines and a regression gate.
+
+Starts the real app (uvicorn on a loopback port, in this process) against the
+database in POSTGRES_URL, which should hold a synthetic org from
+scripts/generate_synthetic_org.py. Claude is replaced by a stub that answers
+every prompt after --llm-latency seconds (default 0), so the timings are the
+app's own; the governor, retries and metrics still run as in production,
+with budgets lifted so they never queue. With --cassette, Claude is
+answered from a recorded cassette instead, at the recorded latencies (see
+app.services.cassettes). Rate limiting is switched off.
+
+Each scenario is driven at every --concurrency level in turn, and reports
+p50/p95/p99 latency and throughput:
+    dashboard        GET  /api/auth/dashboard/{email}   subjects and managers
+    inbox            GET  /api/inbox/{email}            reviewers
+    manager          GET  /api/manager/{id}             any cycle
+    review           GET  /api/review/{token}           any reviewer
+    review_submit    POST /api/review/{token}           pending reviewers, each once
+    summary          POST /api/manager/{id}/regenerate  cycles with 2+ reviews, not finalised
+
+Targets are sampled from the synthetic org with --seed, so runs are
+comparable. The reviews the benchmark submits, and the summaries it
+regenerates, are put back as they were afterwards.
+
+--save-baseline stores the results. Otherwise they are compared with the
+stored baseline: the run fails (exit 1) if any request fails, or if any
+percentile is more than --threshold slower (and at least --noise-ms) or
+throughput more than --threshold lower. Baselines only compare on the same
+machine with the same dataset and options.
+
+Usage:
+    python scripts/benchmark_endpoints.py --save-baseline
+    python scripts/benchmark_endpoints.py [--threshold 0.2] [--concurrency 1 4 16 64] [--requests 200]
+    python scripts/benchmark_endpoints.py --scenarios dashboard inbox --llm-latency 0.5
+    python scripts/benchmark_endpoints.py --scenarios summary --cassette cassettes/synthetic.ndjson
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Read at import time, so they are set before the app is imported. Every
+# request comes from 127.0.0.1, and the stub has no quota to protect.
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["AI_GOVERNOR_LIMITS"] = json.dumps({
+    "anthropic:claude-sonnet-4-20250514": {"rpm": 1_000_000, "tpm": None, "concurrency": 1000},
+})
+
+import anthropic
+import httpx
+import uvicorn
+
+from app.database import get_connection
+from app.main import app
+from app.review_tokens import issue
+from app.services import analytics, cassettes
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+SYNTHETIC_PATTERN = "%@synthetic.360feedback"  # Emails of scripts/generate_synthetic_org.py users
+PERCENTILES = ("p50", "p95", "p99")
+WARMUP_REQUESTS = 10
+STUB_SUMMARY = (
+    "## Strengths\nConsistently unblocks the team and explains decisions clearly.\n\n"
+    "## Areas for Growth\nDelegate more of the delivery work and share context earlier.\n"
+)
+
+# Synthetic cycles with their people, summary state and number of reviews
+CYCLES_SQL = """
+SELECT fc.id, su.email AS subject_email, m.email AS manager_email,
+       COALESCE(s.finalised, FALSE) AS finalised, count(rv.id) AS reviews
+FROM feedback_cycles fc
+JOIN users su ON su.id = fc.subject_user_id
+LEFT JOIN users m ON m.id = fc.manager_user_id
+LEFT JOIN summaries s ON s.cycle_id = fc.id
+LEFT JOIN reviewers r ON r.cycle_id = fc.id
+LEFT JOIN reviews rv ON rv.reviewer_id = r.id
+WHERE su.email LIKE %(pattern)s
+GROUP BY fc.id, su.email, m.email, s.finalised
+ORDER BY fc.id
+"""
+
+# Reviewers of synthetic cycles, and whether they have submitted
+REVIEWERS_SQL = """
+SELECT r.id, r.cycle_id, r.email, rv.id IS NOT NULL AS submitted
+FROM reviewers r
+JOIN feedback_cycles fc ON fc.id = r.cycle_id
+JOIN users su ON su.id = fc.subject_user_id
+LEFT JOIN reviews rv ON rv.reviewer_id = r.id
+WHERE su.email LIKE %(pattern)s
+ORDER BY r.id
+"""
+
+# Copy of the summaries the run may rewrite (a temp table, kept for this session)
+SNAPSHOT_SQL = """
+CREATE TEMP TABLE benchmark_summaries AS
+    SELECT cycle_id, content, weighting_explanation, themes, updated_at, version
+    FROM summaries WHERE cycle_id = ANY(%(cycles)s);
+SELECT COALESCE(max(id), 0) AS last_version FROM summary_versions;
+"""
+
+# Put the touched cycles back as they were before the run (the reviewers were all pending)
+RESTORE_SQL = """
+DELETE FROM reviews WHERE reviewer_id = ANY(%(reviewers)s);
+DELETE FROM summary_versions WHERE id > %(last_version)s AND cycle_id = ANY(%(cycles)s);
+DELETE FROM summaries
+WHERE cycle_id = ANY(%(cycles)s) AND cycle_id NOT IN (SELECT cycle_id FROM benchmark_summaries);
+UPDATE summaries s
+SET content = b.content, weighting_explanation = b.weighting_explanation, themes = b.themes,
+    updated_at = b.updated_at, version = b.version
+FROM benchmark_summaries b
+WHERE s.cycle_id = b.cycle_id;
+DROP TABLE benchmark_summaries;
+"""
+
+
+def stub_anthropic(latency: float):
+    """A stand-in for anthropic.Anthropic that answers every prompt after `latency` seconds."""
+
+    class StubAnthropic:
+        def __init__(self, **kwargs):
+            self.messages = self
+
+        def create(self, model, max_tokens, messages, **kwargs):
+            time.sleep(latency)
+            return SimpleNamespace(
+                content=[SimpleNamespace(type="text", text=STUB_SUMMARY)],
+                usage=SimpleNamespace(input_tokens=len(messages[0]["content"]) // 4, output_tokens=len(STUB_SUMMARY) // 4),
+            )
+
+    return StubAnthropic
+
+
+def load_targets(cur, rng: random.Random, needs: dict) -> dict:
+    """Sample what each scenario requests from the synthetic org; needs maps scenario to request count."""
+    cur.execute(CYCLES_SQL, {"pattern": SYNTHETIC_PATTERN})
+    cycles = cur.fetchall()
+    cur.execute(REVIEWERS_SQL, {"pattern": SYNTHETIC_PATTERN})
+    reviewers = cur.fetchall()
+    if not cycles or not reviewers:
+        raise ValueError("No synthetic org found; load one with scripts/generate_synthetic_org.py")
+
+    def sample(rows, count):
+        return rng.sample(rows, min(count, len(rows)))
+
+    people = sorted({c["subject_email"] for c in cycles} | {c["manager_email"] for c in cycles if c["manager_email"]})
+    pending = [r for r in reviewers if not r["submitted"]]
+    ready = [c for c in cycles if c["reviews"] >= 2 and not c["finalised"]]
+    # Repeated targets cycle through a sample; submissions need one reviewer each
+    return {
+        "dashboard": sample(people, 500),
+        "inbox": sample(sorted({r["email"] for r in reviewers}), 500),
+        "manager": [c["id"] for c in sample(cycles, 500)],
+        "review": [issue(r["id"]) for r in sample(reviewers, 500)],
+        "review_submit": [(issue(r["id"]), r["id"], r["cycle_id"]) for r in sample(pending, needs.get("review_submit", 0))],
+        "summary": [c["id"] for c in sample(ready, 200)],
+    }
+
+
+def review_body(i: int) -> dict:
+    return {
+        "start_doing": f"Share the roadmap trade-offs with the wider team earlier in the quarter ({i}).",
+        "stop_doing": "Taking on every escalation personally instead of routing it to the on-call owner.",
+        "continue_doing": "Writing clear design docs and running calm, well-prepared incident reviews.",
+        "example": f"The migration plan for project {i} was easy to follow and landed on schedule.",
+        "additional": None,
+    }
+
+
+# Scenario: name -> request i as (method, path, JSON body)
+SCENARIOS = {
+    "dashboard": lambda t, i: ("GET", f"/api/auth/dashboard/{t['dashboard'][i % len(t['dashboard'])]}", None),
+    "inbox": lambda t, i: ("GET", f"/api/inbox/{t['inbox'][i % len(t['inbox'])]}", None),
+    "manager": lambda t, i: ("GET", f"/api/manager/{t['manager'][i % len(t['manager'])]}", None),
+    "review": lambda t, i: ("GET", f"/api/review/{t['review'][i % len(t['review'])]}", None),
+    "review_submit": lambda t, i: ("POST", f"/api/review/{t['review_submit'][i][0]}", review_body(i)),
+    "summary": lambda t, i: ("POST", f"/api/manager/{t['summary'][i % len(t['summary'])]}/regenerate", None),
+}
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarise(timings: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(timings)
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "p50": round(percentile(ordered, 0.50), 2),
+        "p95": round(percentile(ordered, 0.95), 2),
+        "p99": round(percentile(ordered, 0.99), 2),
+        "rps": round(len(timings) / elapsed, 1),
+    }
+
+
+async def drive(client: httpx.AsyncClient, make, first: int, count: int, concurrency: int) -> dict:
+    """Send `count` requests from `concurrency` workers; latencies in ms."""
+    requests = iter(range(first, first + count))
+    timings, failures = [], []
+
+    async def worker():
+        for i in requests:
+            method, path, body = make(i)
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                failures.append(f"{method} {path}: {response.status_code} {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarise(timings, len(failures), time.perf_counter() - start)
+    for failure in failures[:3]:
+        print(f"     {failure}")
+    return result
+
+
+async def run_scenarios(base_url: str, targets: dict, args) -> dict:
+    """Results per scenario and concurrency level."""
+    results = {}
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for name in args.scenarios:
+            if not targets[name]:
+                print(f"  {name:<14} skipped: nothing to target in the synthetic org")
+                continue
+            make = SCENARIOS[name]
+            count = args.summary_requests if name == "summary" else args.requests
+            if name == "review_submit":
+                # Each submission uses up a pending reviewer
+                count = min(count, (len(targets[name]) - WARMUP_REQUESTS) // len(args.concurrency))
+                if count < 1:
+                    print(f"  {name:<14} skipped: not enough pending reviewers")
+                    continue
+            results[name] = {}
+            await drive(client, lambda i: make(targets, i), 0, WARMUP_REQUESTS, 1)
+            offset = WARMUP_REQUESTS
+            for concurrency in args.concurrency:
+                result = await drive(client, lambda i: make(targets, i), offset, count, concurrency)
+                offset += count
+                results[name][str(concurrency)] = result
+                print(f"  {name:<14} c={concurrency:<3} {describe(result)}")
+    return results
+
+
+def describe(result: dict) -> str:
+    errors = f"  {result['errors']} errors" if result["errors"] else ""
+    latencies = "  ".join(f"{p} {result[p]:8.2f}ms" for p in PERCENTILES)
+    return f"{latencies}  {result['rps']:8.1f} req/s  ({result['requests']} requests){errors}"
+
+
+def compare(results: dict, baseline: dict, threshold: float, noise_ms: float) -> list[str]:
+    """Regressions against the baseline, as readable lines."""
+    regressions = []
+    for name, levels in results.items():
+        for concurrency, result in levels.items():
+            label = f"{name} c={concurrency}"
+            if result["errors"]:
+                regressions.append(f"{label}: {result['errors']} failed requests")
+            before = baseline.get(name, {}).get(concurrency)
+            if before is None:
+                continue
+            for p in PERCENTILES:
+                if result[p] > before[p] * (1 + threshold) and result[p] - before[p] >= noise_ms:
+                    regressions.append(f"{label}: {p} {before[p]:.2f}ms -> {result[p]:.2f}ms "
+                                       f"(+{result[p] / before[p] - 1:.0%})")
+            if result["rps"] < before["rps"] * (1 - threshold):
+                regressions.append(f"{label}: throughput {before['rps']:.1f} -> {result['rps']:.1f} req/s "
+                                   f"({result['rps'] / before['rps'] - 1:.0%})")
+    return regressions
+
+
+def start_server() -> tuple[uvicorn.Server, threading.Thread, str]:
+    """Serve the app on a free loopback port from a background thread."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    host, port = sock.getsockname()
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The app failed to start")
+        time.sleep(0.05)
+    return server, thread, f"http://{host}:{port}"
+
+
+def benchmark(args) -> int:
+    if args.cassette:
+        cassettes.MODE = "replay"
+        cassettes.CASSETTE_PATH = args.cassette
+        cassettes.REPLAY_LATENCY = 1.0
+    else:
+        anthropic.Anthropic = stub_anthropic(args.llm_latency)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    rng = random.Random(args.seed)
+    submissions = WARMUP_REQUESTS + args.requests * len(args.concurrency)
+    targets = load_targets(cur, rng, {"review_submit": submissions if "review_submit" in args.scenarios else 0})
+
+    # Cycles whose summaries the run may rewrite, directly or by submitting a review
+    touched = sorted(set(targets["summary"]) | {cycle_id for _, _, cycle_id in targets["review_submit"]})
+    reviewers = [reviewer_id for _, reviewer_id, _ in targets["review_submit"]]
+    cur.execute(SNAPSHOT_SQL, {"cycles": touched})
+    last_version = cur.fetchone()["last_version"]
+    conn.commit()
+
+    server, thread, base_url = start_server()
+    try:
+        llm = f"cassette {args.cassette}" if args.cassette else f"stub latency {args.llm_latency}s"
+        print(f"Benchmarking {base_url} (LLM {llm})")
+        results = asyncio.run(run_scenarios(base_url, targets, args))
+    finally:
+        # Shutting down waits for in-flight requests and background regenerations
+        server.should_exit = True
+        thread.join()
+        cur.execute(RESTORE_SQL, {"reviewers": reviewers, "last_version": last_version, "cycles": touched})
+        analytics.rebuild(cur)
+        conn.commit()
+        cur.close()
+        conn.close()
+        print(f"✓ Removed the submitted reviews and restored {len(touched)} cycles' summaries")
+
+    settings = {
+        "concurrency": args.concurrency, "requests": args.requests, "summary_requests": args.summary_requests,
+        "llm_latency": args.llm_latency, "cassette": args.cassette, "seed": args.seed,
+    }
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"created_at": datetime.now().isoformat(timespec="seconds"), "settings": settings,
+                       "results": results}, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {"settings": settings, "results": {}}
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+    if baseline["settings"] != settings:
+        print(f"⚠️  The baseline was recorded with different options: {baseline['settings']}")
+
+    regressions = compare(results, baseline["results"], args.threshold, args.noise_ms)
+    if regressions:
+        print(f"❌ {len(regressions)} regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"✓ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--summary-requests", type=int, default=50, help="Requests per level for summary")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the Claude stub takes to answer")
+    parser.add_argument("--cassette", help="Replay Claude from this cassette instead of the stub")
+    parser.add_argument("--seed", type=int, default=360, help="Seed for sampling targets")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, as a fraction")
+    parser.add_argument("--noise-ms", type=float, default=2.0, help="Latency changes smaller than this never fail")
+    args = parser.parse_args()
+
+    if min(args.concurrency) < 1 or args.requests < 1 or args.summary_requests < 1:
+        parser.error("--concurrency, --requests and --summary-requests must be positive")
+
+    try:
+        sys.exit(benchmark(args))
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
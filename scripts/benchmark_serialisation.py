@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Microbenchmark v1 (Pydantic models + response_model) against v2 (rows + orjson) serialisation.
+
+No database needed: rows are synthesised in the shape RealDictCursor returns.
+v1 is measured the way FastAPI handles it: build a model per row, re-validate
+through response_model, dump to JSON-compatible data, then json.dumps. v2
+encodes the rows with FastJSONResponse, in full and with a sparse fieldset.
+
+Usage:
+    python scripts/benchmark_serialisation.py [--rows 10 100 1000] [--runs 200]
+"""
+import argparse
+import statistics
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models import EmployeeResponse, InboxItem, ManagerDashboard, ReviewerWithStatus, SummaryResponse
+from app.routes.v2 import CYCLE_FIELDS, INBOX_ITEM_FIELDS
+from app.serialization import FastJSONResponse, apply_fields, parse_fields
+
+NOW = datetime(2025, 1, 15, 9, 30, 0, 123456)
+SUMMARY_TEXT = "## Strengths\n" + "Consistently unblocks the team and writes clear design docs. " * 40
+
+
+def inbox_rows(n: int) -> list[dict]:
+    return [
+        {
+            "employee_name": f"Employee {i}", "cycle_id": i, "relationship": "peer",
+            "frequency": "weekly", "token": f"token-{i:032d}",
+            "status": "submitted" if i % 2 else "pending",
+            "created_at": NOW - timedelta(minutes=i),
+        }
+        for i in range(n)
+    ]
+
+
+def cycle_row(reviewers: int) -> dict:
+    return {
+        "id": 1, "title": "Q1 Review", "status": "active", "created_at": NOW,
+        "subject_user_id": 2, "subject_name": "Alex Chen", "subject_email": "alex@example.com",
+        "manager_user_id": 3, "manager_name": "Sam Taylor", "manager_email": "sam@example.com",
+        "reviewers": [
+            {"id": i, "name": f"Reviewer {i}", "email": f"r{i}@example.com",
+             "relationship": "peer", "frequency": "weekly", "status": "submitted" if i % 2 else "pending"}
+            for i in range(reviewers)
+        ],
+        "summary": {
+            "id": 1, "cycle_id": 1, "content": SUMMARY_TEXT, "weighting_explanation": "Equal weighting",
+            "finalised": False, "finalised_at": None, "updated_at": NOW,
+        },
+        "submitted_count": reviewers // 2,
+        "total_reviewers": reviewers,
+    }
+
+
+_INBOX_ADAPTER = TypeAdapter(list[InboxItem])
+
+
+def v1_inbox(rows: list[dict]) -> bytes:
+    items = [InboxItem(**{k: v for k, v in row.items() if k != "created_at"}) for row in rows]
+    validated = _INBOX_ADAPTER.validate_python([item.model_dump() for item in items])
+    return JSONResponse(_INBOX_ADAPTER.dump_python(validated, mode="json")).body
+
+
+def v1_cycle(cycle: dict) -> bytes:
+    dashboard = ManagerDashboard(
+        employee=EmployeeResponse(
+            id=cycle["id"], name=cycle["subject_name"], email=cycle["subject_email"],
+            created_at=cycle["created_at"]
+        ),
+        subject_email=cycle["subject_email"],
+        manager_name=cycle["manager_name"],
+        manager_email=cycle["manager_email"],
+        reviewers=[ReviewerWithStatus(**r) for r in cycle["reviewers"]],
+        summary=SummaryResponse(**cycle["summary"]),
+        submitted_count=cycle["submitted_count"],
+        total_reviewers=cycle["total_reviewers"],
+    )
+    validated = ManagerDashboard.model_validate(dashboard.model_dump())
+    return JSONResponse(validated.model_dump(mode="json")).body
+
+
+def v2(value, fields=None, allowed=None) -> bytes:
+    return FastJSONResponse(apply_fields(value, parse_fields(fields, allowed))).body
+
+
+def time_runs(fn, runs: int) -> list[float]:
+    fn()  # warm up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def describe(timings: list[float]) -> str:
+    return f"p50 {statistics.median(timings):8.3f}ms"
+
+
+def report(label: str, runs: int, v1_fn, v2_fn, v2_sparse_fn, sizes: tuple):
+    v1 = time_runs(v1_fn, runs)
+    full = time_runs(v2_fn, runs)
+    sparse = time_runs(v2_sparse_fn, runs)
+    speedup = statistics.median(v1) / statistics.median(full)
+    print(
+        f"{label:<24} v1: {describe(v1)} ({sizes[0]:>7}B)   "
+        f"v2: {describe(full)} ({sizes[1]:>7}B, {speedup:4.1f}x)   "
+        f"v2 sparse: {describe(sparse)} ({sizes[2]:>7}B)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    for n in args.rows:
+        rows = inbox_rows(n)
+        sparse = "employee_name,status,token"
+        sizes = (len(v1_inbox(rows)), len(v2(rows)), len(v2(rows, sparse, INBOX_ITEM_FIELDS)))
+        report(
+            f"inbox, {n} rows", args.runs,
+            lambda: v1_inbox(rows), lambda: v2(rows),
+            lambda: v2(rows, sparse, INBOX_ITEM_FIELDS), sizes,
+        )
+
+    for n in args.rows:
+        cycle = cycle_row(n)
+        sparse = "title,submitted_count,total_reviewers,reviewers.name,reviewers.status"
+        sizes = (len(v1_cycle(cycle)), len(v2(cycle)), len(v2(cycle, sparse, CYCLE_FIELDS)))
+        report(
+            f"cycle, {n} reviewers", args.runs,
+            lambda: v1_cycle(cycle), lambda: v2(cycle),
+            lambda: v2(cycle, sparse, CYCLE_FIELDS), sizes,
+        )
+
+
+if __name__ == "__main__":
+    main()
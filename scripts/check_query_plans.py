@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Snapshot query plans for the hot dashboard/inbox queries and fail on seq-scan regressions.
+
+Usage:
+    python scripts/check_query_plans.py --seed --update   # record snapshot
+    python scripts/check_query_plans.py                   # check against snapshot
+
+Plans are taken with enable_seqscan=off by default, so on a small seeded
+dataset a Seq Scan only appears when no usable index exists for that table.
+A query regresses when its plan scans a table sequentially that the snapshot
+did not (or, with no snapshot entry, when it scans any table sequentially).
+"""
+import argparse
+import json
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.database import get_connection, init_db, seed_demo_data
+from app.routes import auth, inbox, manager, search
+from app.routes.auth import dashboard_params
+
+DEFAULT_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans.json")
+
+# Sample parameters, chosen as the busiest value so plans reflect the worst case
+SAMPLE_PARAMS = {
+    "subject_user_id": "SELECT subject_user_id AS value FROM feedback_cycles GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    "manager_user_id": "SELECT manager_user_id AS value FROM feedback_cycles WHERE manager_user_id IS NOT NULL GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    "user_email": "SELECT u.email AS value FROM feedback_cycles fc JOIN users u ON fc.subject_user_id = u.id GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    "reviewer_email": "SELECT email AS value FROM reviewers GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    "cycle_id": "SELECT cycle_id AS value FROM reviewers GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    "subject_name": "SELECT u.name AS value FROM feedback_cycles fc JOIN users u ON fc.subject_user_id = u.id GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    "subject_slug": "SELECT u.slug AS value FROM feedback_cycles fc JOIN users u ON fc.subject_user_id = u.id GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1",
+    # A cursor part-way through the busiest reviewer's inbox
+    "reviewer_after_ts": "SELECT MAX(created_at) AS value FROM reviewers",
+    "reviewer_after_id": "SELECT MAX(id) AS value FROM reviewers",
+    "search_term": "SELECT word AS value FROM ts_stat('SELECT search_vector FROM reviews') ORDER BY ndoc DESC LIMIT 1",
+}
+
+# Bound for every named-parameter query unless it maps them itself: the
+# first page of paginated lists, with no status filter, and an org-wide search
+PAGE_PARAMS = {**search.search_params(None), **dashboard_params(None)}
+
+# Named hot queries: (SQL, sample parameter names). A list is bound to %s
+# placeholders in order; a dict maps %(name)s placeholders to sample names.
+HOT_QUERIES = {
+    "auth.dashboard": (auth.DASHBOARD_SQL, {"email": "user_email"}),
+    "auth.my_cycles": (auth.MY_CYCLES_SQL, {"email": "user_email"}),
+    "inbox.inbox": (inbox.INBOX_SQL, {"email": "reviewer_email"}),
+    "inbox.inbox_after_cursor": (inbox.INBOX_SQL, {
+        "email": "reviewer_email", "after_ts": "reviewer_after_ts", "after_id": "reviewer_after_id"
+    }),
+    "manager.dashboard_by_id": (manager.MANAGER_DASHBOARD_BY_ID_SQL, {"cycle_id": "cycle_id"}),
+    "manager.dashboard_by_slug": (manager.MANAGER_DASHBOARD_BY_SLUG_SQL, {"name": "subject_name", "slug": "subject_slug"}),
+    "search.org_wide": (search.SEARCH_SQL, {"q": "search_term"}),
+}
+
+
+def scan_nodes(plan: dict) -> list[dict]:
+    """Flatten a JSON plan into its scan nodes (type, table, index)."""
+    nodes = []
+    node_type = plan.get("Node Type", "")
+    if "Scan" in node_type and plan.get("Relation Name"):
+        nodes.append({
+            "type": node_type,
+            "relation": plan["Relation Name"],
+            "index": plan.get("Index Name"),
+        })
+    for child in plan.get("Plans", []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+def seq_scanned(nodes: list[dict]) -> set[str]:
+    return {n["relation"] for n in nodes if n["type"] == "Seq Scan"}
+
+
+def capture_plans(allow_seqscan: bool) -> dict:
+    """EXPLAIN every hot query and return {name: [scan nodes]}."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    params = {}
+    for key, sql in SAMPLE_PARAMS.items():
+        cur.execute(sql)
+        row = cur.fetchone()
+        params[key] = row["value"] if row else None
+
+    if not allow_seqscan:
+        cur.execute("SET enable_seqscan = off")
+
+    plans = {}
+    for name, (sql, param_names) in HOT_QUERIES.items():
+        if isinstance(param_names, dict):
+            values = {**PAGE_PARAMS, **{key: params[p] for key, p in param_names.items()}}
+        else:
+            values = tuple(params[p] for p in param_names)
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, values)
+        plan = cur.fetchone()["QUERY PLAN"][0]["Plan"]
+        plans[name] = scan_nodes(plan)
+
+    conn.rollback()
+    cur.close()
+    conn.close()
+    return plans
+
+
+def check(plans: dict, snapshot: dict) -> list[str]:
+    """Return a description of every query that regressed to a seq scan."""
+    failures = []
+    for name, nodes in plans.items():
+        now = seq_scanned(nodes)
+        before = seq_scanned(snapshot.get(name, []))
+        new = now - before
+        if new:
+            failures.append(f"{name}: sequential scan on {', '.join(sorted(new))}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshot", default=DEFAULT_SNAPSHOT, help="Snapshot file path")
+    parser.add_argument("--update", action="store_true", help="Write the current plans as the new snapshot")
+    parser.add_argument("--seed", action="store_true", help="Create schema and demo data first")
+    parser.add_argument("--allow-seqscan", action="store_true", help="Plan with enable_seqscan on")
+    args = parser.parse_args()
+
+    if args.seed:
+        init_db()
+        seed_demo_data()
+
+    plans = capture_plans(args.allow_seqscan)
+
+    if args.update:
+        with open(args.snapshot, "w") as f:
+            json.dump(plans, f, indent=2, sort_keys=True)
+        print(f"✓ Wrote plans for {len(plans)} queries to {args.snapshot}")
+        return
+
+    snapshot = {}
+    if os.path.exists(args.snapshot):
+        with open(args.snapshot) as f:
+            snapshot = json.load(f)
+    else:
+        print(f"No snapshot at {args.snapshot}; failing on any sequential scan")
+
+    failures = check(plans, snapshot)
+    for name, nodes in plans.items():
+        marker = "❌" if any(f.startswith(name + ":") for f in failures) else "✓"
+        scans = ", ".join(f"{n['type']} {n['relation']}" + (f" ({n['index']})" if n["index"] else "") for n in nodes)
+        print(f"{marker} {name}: {scans}")
+
+    if failures:
+        print("\nPlan regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+    print("\n✅ No plan regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Export summaries or reviews to an NDJSON or CSV file for HRIS ingestion.
+
+Streams from a server-side cursor, like GET /api/export/{kind}, so memory
+stays flat for any number of rows. After every chunk is written and synced
+to disk, the last exported id and the file length are saved to a checkpoint
+file. Run the same command again after an interruption and it truncates the
+output back to the checkpoint and carries on from there. The checkpoint is
+removed once the export completes.
+
+Usage:
+    python scripts/export_feedback.py summaries --output q3.ndjson --since 2026-07-01 --until 2026-09-30
+    python scripts/export_feedback.py reviews --format csv --status all --manager sam@example.com --output reviews.csv
+
+Options:
+    --format ndjson|csv             (default ndjson)
+    --status finalised|draft|all    state of the cycle's summary (default finalised)
+    --since/--until YYYY-MM-DD      inclusive date range
+    --manager EMAIL                 cycles managed by this person
+    --checkpoint PATH               (default <output>.checkpoint)
+    --restart                       ignore an existing checkpoint and start over
+"""
+import argparse
+import json
+import sys
+import os
+import time
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.database import read_connection
+from app.services import export
+
+
+def _load_checkpoint(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, export_of: dict, after: int, offset: int):
+    # Write-then-rename, so a crash leaves either the old checkpoint or the new one
+    with open(path + ".tmp", "w") as f:
+        json.dump({"export": export_of, "after": after, "offset": offset}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def export_feedback(args):
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    checkpoint = None if args.restart else _load_checkpoint(checkpoint_path)
+    # What is being exported; a checkpoint only resumes the same export
+    export_of = {name: str(getattr(args, name)) for name in ("kind", "format", "status", "since", "until", "manager")}
+
+    if checkpoint:
+        if checkpoint["export"] != export_of:
+            raise ValueError(f"{checkpoint_path} is from a different export ({checkpoint['export']}); "
+                             "use the same options, or --restart")
+        # Drop anything written after the last checkpoint (a partly written chunk)
+        out = open(args.output, "r+b")
+        out.truncate(checkpoint["offset"])
+        out.seek(checkpoint["offset"])
+        print(f"Resuming after id {checkpoint['after']} ({checkpoint['offset']} bytes already written)")
+    else:
+        out = open(args.output, "wb")
+        checkpoint = {"after": 0, "offset": 0}
+
+    params = export.export_params(args.since, args.until, args.status, args.manager, checkpoint["after"])
+    conn = read_connection()
+    start = time.perf_counter()
+    try:
+        batches = export.export_rows(conn, args.kind, params)
+        # Header only at the very start of the file
+        for chunk, last_id in export.encode_batches(batches, args.kind, args.format, header=checkpoint["offset"] == 0):
+            out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint["after"] = last_id or checkpoint["after"]
+            _save_checkpoint(checkpoint_path, export_of, checkpoint["after"], out.tell())
+    finally:
+        out.close()
+        conn.close()
+
+    os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start
+    print(f"✓ Exported {args.kind} to {args.output} in {elapsed:.1f}s (last id {checkpoint['after']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export summaries or reviews as NDJSON or CSV")
+    parser.add_argument("kind", choices=list(export.EXPORTS))
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--format", choices=list(export.FORMATS), default="ndjson")
+    parser.add_argument("--status", choices=export.STATUSES, default="finalised")
+    parser.add_argument("--since", type=date.fromisoformat)
+    parser.add_argument("--until", type=date.fromisoformat)
+    parser.add_argument("--manager")
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--restart", action="store_true")
+    args = parser.parse_args()
+
+    if args.since and args.until and args.since > args.until:
+        parser.error("--since must not be after --until")
+
+    try:
+        export_feedback(args)
+    except Exception as e:
+        print(f"❌ Export failed (run the same command again to resume): {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
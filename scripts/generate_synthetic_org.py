@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""Generate a synthetic organisation for scale testing.
+
+Builds an org of --users people and loads --cycles feedback cycles,
+--reviewers reviewer invitations and --reviews submitted reviews, with
+summaries, so production-sized query plans and benchmarks can be reproduced
+locally. The data is shaped like the real thing:
+    - an org tree whose spans of control are skewed (a few large teams)
+    - reviewers per cycle skewed (most cycles 3-8, a long tail past 20),
+      drawn from the subject's manager, team, reports and elsewhere
+    - frequency depending on relationship (managers weekly, cross-functional
+      contacts mostly monthly or rarely)
+    - submission rates depending on relationship, and time-to-submit with a
+      long tail
+    - answer lengths log-normal, words drawn with a Zipf skew from a
+      vocabulary of workplace terms, so full-text search behaves realistically
+
+Everything is derived from --seed and --end-date, so the same arguments
+give the same data on any machine and any day. Only the id offsets depend
+on what is already in the database. Rows are streamed into COPY without
+being built in memory first. Generated users have @synthetic.360feedback
+emails, and --replace removes a previous run first.
+
+Usage:
+    python scripts/generate_synthetic_org.py                      # 100k users, 50k cycles, 300k reviewers, 200k reviews
+    python scripts/generate_synthetic_org.py --scale 0.01         # 1% of that, for a quick run
+    python scripts/generate_synthetic_org.py --users 20000 --cycles 10000 --reviewers 60000 --reviews 40000 --seed 7
+"""
+import argparse
+import bisect
+import csv
+import heapq
+import io
+import itertools
+import math
+import random
+import sys
+import os
+import time
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.database import get_connection
+from app.services import analytics
+from app.services.summarisation import RELATIONSHIP_LABELS, calculate_weight
+
+EMAIL_DOMAIN = "synthetic.360feedback"
+DEFAULT_END_DATE = "2026-09-30"  # Fixed, so a seed gives the same data on any day
+COPY_BATCH_ROWS = 1000
+COPY_READ_SIZE = 1 << 16
+
+MANAGER_SHARE = 0.12  # Of users, how many manage a team
+SUMMARY_SHARE = 0.75  # Of cycles with 2+ reviews, how many have a summary
+FINALISED_SHARE = 0.6  # Of summaries, how many are finalised
+ADDITIONAL_SHARE = 0.45  # Of reviews, how many fill in "additional"
+
+# Reviewer mix after the subject's manager (invited first, most of the time)
+MANAGER_INVITED = 0.9
+RELATIONSHIP_MIX = {"peer": 0.55, "direct_report": 0.25, "xfn": 0.20}
+
+# How often each relationship works with the subject
+FREQUENCY_MIX = {
+    "manager": {"weekly": 0.85, "monthly": 0.13, "rarely": 0.02},
+    "peer": {"weekly": 0.55, "monthly": 0.35, "rarely": 0.10},
+    "direct_report": {"weekly": 0.70, "monthly": 0.25, "rarely": 0.05},
+    "xfn": {"weekly": 0.15, "monthly": 0.45, "rarely": 0.40},
+}
+
+# Relative likelihood that an invitation is answered
+SUBMIT_PROPENSITY = {"manager": 0.85, "peer": 0.70, "direct_report": 0.65, "xfn": 0.50}
+
+# Median words per answer and log-normal spread
+ANSWER_WORDS = {
+    "start_doing": (14, 0.6),
+    "stop_doing": (12, 0.6),
+    "continue_doing": (14, 0.6),
+    "example": (35, 0.7),
+    "additional": (18, 0.8),
+}
+
+FIRST_NAMES = """
+Alex Sam Jordan Casey Riley Morgan Taylor Jamie Avery Quinn Harper Rowan Skyler Drew Emerson Finley
+Priya Arjun Mei Wei Hana Kenji Sofia Mateo Lucia Diego Amara Kwame Zara Omar Leila Yusuf Ingrid Lars
+Freya Nils Chloe Hugo Elena Marco Aisha Tariq Nadia Ivan Olga Tomas Maya Noah Ella Leo Isla Finn
+""".split()
+
+LAST_NAMES = """
+Chen Taylor Lee Morgan Kumar Patel Singh Nguyen Garcia Rodriguez Smith Jones Brown Williams Wilson
+Okafor Mensah Haddad Rahman Tanaka Sato Kim Park Novak Kowalski Jensen Larsen Dubois Martin Rossi
+Ferrari Silva Costa Murphy Kelly Walsh Schmidt Fischer Weber Cohen Levi Ali Hassan Ahmed Ivanova
+""".split()
+
+# Workplace vocabulary, most common first (drawn with a Zipf skew)
+VOCABULARY = """
+team work project code review more time meetings feedback communication delivery help clear
+planning context decisions design ownership quality sprint engineers stakeholders priorities
+support documentation customers goals roadmap testing deadlines estimates mentoring questions
+process incidents collaboration updates tickets architecture production releases focus scope
+ideas problems solutions examples data progress results impact risk tradeoffs trust standups
+pairing onboarding juniors seniors leadership delegation direction strategy alignment handoffs
+retrospectives reliability performance debugging outages alerts monitoring metrics dashboards
+reviews comments pull requests deploys migrations refactoring technical debt backlog grooming
+interviews hiring presentations demos workshops written proposals specs research users product
+design partners sales marketing finance legal security compliance budget launch experiments
+thoughtful proactive patient direct calm responsive organised detailed consistent reliable
+early late often always again quickly carefully openly regularly especially together
+""".split()
+
+OPENERS = {
+    "start_doing": ("Start", "Try", "Consider", "Please start", "It would help to start"),
+    "stop_doing": ("Stop", "Avoid", "Try not", "Less", "Please stop"),
+    "continue_doing": ("Keep", "Continue", "Keep up", "Please keep", "Really value"),
+    "example": ("For example, last quarter", "During the launch", "In one sprint", "When we had the outage",
+                "In our planning sessions", "On the migration project"),
+    "additional": ("Overall", "Generally", "Also", "One more thing", "Thanks for"),
+}
+
+
+class Words:
+    """Seeded text from VOCABULARY, words weighted 1/rank^1.1."""
+
+    POOL = 1 << 17
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        # Drawing words one by one dominates generation time; answers are
+        # slices of one long Zipf-distributed draw instead
+        cum_weights = list(itertools.accumulate(1 / (rank ** 1.1) for rank in range(1, len(VOCABULARY) + 1)))
+        self.pool = rng.choices(VOCABULARY, cum_weights=cum_weights, k=self.POOL)
+
+    def count(self, median: float, sigma: float) -> int:
+        return max(3, min(int(self.rng.lognormvariate(math.log(median), sigma)), self.POOL // 2))
+
+    def sentence(self, opener: str, words: int) -> str:
+        start = self.rng.randrange(self.POOL - words)
+        body = self.pool[start:start + words]
+        # Split long answers into sentences of 8-20 words
+        parts, start = [], 0
+        while start < len(body):
+            end = start + self.rng.randint(8, 20)
+            parts.append(" ".join(body[start:end]))
+            start = end
+        text = ". ".join(p[0].upper() + p[1:] for p in parts[1:])
+        return f"{opener} {parts[0]}." + (f" {text}." if text else "")
+
+    def answer(self, field: str) -> str:
+        median, sigma = ANSWER_WORDS[field]
+        return self.sentence(self.rng.choice(OPENERS[field]), self.count(median, sigma))
+
+
+class CopySource:
+    """File-like object feeding rows to COPY ... FROM STDIN as CSV, a batch at a time."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = ""
+        self._offset = 0
+        self.count = 0
+
+    def _fill(self) -> bool:
+        batch = list(itertools.islice(self._rows, COPY_BATCH_ROWS))
+        if not batch:
+            return False
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffer.write(self._pending[self._offset:])
+        self._writer.writerows(batch)  # None is written unquoted and empty: NULL in CSV COPY
+        self.count += len(batch)
+        self._pending, self._offset = self._buffer.getvalue(), 0
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while (size < 0 or len(self._pending) - self._offset < size) and self._fill():
+            pass
+        end = len(self._pending) if size < 0 else self._offset + size
+        chunk = self._pending[self._offset:end]
+        self._offset += len(chunk)
+        return chunk
+
+    readline = read
+
+
+def _pick(rng: random.Random, mix: dict) -> str:
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def _allocate(rng: random.Random, total: int, slots: int, sigma: float) -> list[int]:
+    """Split `total` over `slots` (at least 1 each) in log-normally skewed shares that sum exactly."""
+    weights = [rng.lognormvariate(0, sigma) for _ in range(slots)]
+    scale = (total - slots) / sum(weights)
+    shares = [w * scale for w in weights]
+    counts = [1 + int(s) for s in shares]
+    # Hand out what rounding down left over to the largest remainders
+    short = total - sum(counts)
+    for i in heapq.nlargest(short, range(slots), key=lambda i: shares[i] - int(shares[i])):
+        counts[i] += 1
+    return counts
+
+
+def build_org(args, rng: random.Random) -> dict:
+    """People, teams, cycles, reviewers and which reviewers submitted, as plain lists (ids from 0)."""
+    end = datetime.combine(args.end_date, datetime.min.time())
+    users = []
+    for i in range(args.users):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        joined = end - timedelta(days=args.days * 2 * rng.random())
+        users.append((f"{first} {last}", f"{first}.{last}.{i}@{EMAIL_DOMAIN}".lower(), joined))
+
+    # Org tree: managers report to earlier managers; everyone else joins a team,
+    # team sizes Pareto-distributed
+    order = rng.sample(range(args.users), args.users)
+    managers = order[:max(1, int(args.users * MANAGER_SHARE))]
+    manager_of = {managers[0]: None}
+    for k, m in enumerate(managers[1:], 1):
+        manager_of[m] = managers[int(k * rng.random() ** 2)]
+    team_weights = list(itertools.accumulate(rng.paretovariate(2.0) for _ in managers))
+    for person in order[len(managers):]:
+        manager_of[person] = managers[bisect.bisect_left(team_weights, rng.random() * team_weights[-1])]
+    reports = {}
+    for person, manager in manager_of.items():
+        if manager is not None:
+            reports.setdefault(manager, []).append(person)
+
+    cycles = []
+    for _ in range(args.cycles):
+        subject = rng.randrange(args.users)
+        created = end - timedelta(days=args.days * rng.random(), seconds=rng.randrange(86400))
+        creator = subject if rng.random() < 0.8 or manager_of[subject] is None else manager_of[subject]
+        quarter = f"Q{(created.month - 1) // 3 + 1} {created.year} Review"
+        cycles.append((subject, creator, manager_of[subject], quarter, created))
+
+    def someone_else(exclude: set) -> int:
+        if len(exclude) >= args.users:  # Tiny org: everyone is already reviewing
+            return rng.randrange(args.users)
+        while True:
+            person = rng.randrange(args.users)
+            if person not in exclude:
+                return person
+
+    reviewers = []  # (cycle, person, relationship, frequency, invited_at)
+    for cycle_index, count in enumerate(_allocate(rng, args.reviewers, args.cycles, 0.5)):
+        subject, _, manager, _, created = cycles[cycle_index]
+        team = reports.get(manager, []) if manager is not None else []
+        own_reports = reports.get(subject, [])
+        taken = {subject}
+        for n in range(count):
+            if n == 0 and manager is not None and rng.random() < MANAGER_INVITED:
+                relationship, person = "manager", manager
+            else:
+                relationship = _pick(rng, RELATIONSHIP_MIX)
+                pool = {"peer": team, "direct_report": own_reports}.get(relationship, [])
+                if relationship == "direct_report" and not pool:
+                    relationship, pool = "peer", team
+                person = rng.choice(pool) if pool else None
+                if person is None or person in taken:
+                    person = someone_else(taken)
+            taken.add(person)
+            invited = min(created + timedelta(minutes=rng.randrange(1, 60 * 24 * 3)), end)
+            reviewers.append((cycle_index, person, relationship, _pick(rng, FREQUENCY_MIX[relationship]), invited))
+
+    # Which invitations were answered: a weighted sample without replacement
+    # (Efraimidis-Spirakis keys), so each relationship's rate follows its propensity
+    keys = [rng.random() ** (1 / SUBMIT_PROPENSITY[r[2]]) for r in reviewers]
+    submitted = sorted(heapq.nlargest(args.reviews, range(len(reviewers)), key=keys.__getitem__))
+    return {"users": users, "manager_of": manager_of, "cycles": cycles, "reviewers": reviewers,
+            "submitted": submitted, "end": end}
+
+
+def _submitted_at(rng: random.Random, invited: datetime, end: datetime) -> datetime:
+    # Median about a day and a half, with a tail of weeks
+    return min(invited + timedelta(hours=rng.lognormvariate(math.log(36), 1.1)), end)
+
+
+def user_rows(org: dict, base: int):
+    for i, (name, email, joined) in enumerate(org["users"]):
+        yield (base + i, email, name, False, joined)
+
+
+def cycle_rows(org: dict, base: int, user_base: int):
+    for i, (subject, creator, manager, title, created) in enumerate(org["cycles"]):
+        yield (base + i, user_base + subject, user_base + creator,
+               None if manager is None else user_base + manager, title, created)
+
+
+def reviewer_rows(org: dict, base: int, cycle_base: int):
+    users = org["users"]
+    for i, (cycle, person, relationship, frequency, invited) in enumerate(org["reviewers"]):
+        name, email, _ = users[person]
+        yield (base + i, cycle_base + cycle, name, email, relationship, frequency, invited)
+
+
+def review_rows(org: dict, base: int, reviewer_base: int, rng: random.Random, words: Words, submitted_by_cycle: dict):
+    for i, reviewer in enumerate(org["submitted"]):
+        cycle, _, _, _, invited = org["reviewers"][reviewer]
+        at = _submitted_at(rng, invited, org["end"])
+        submitted_by_cycle.setdefault(cycle, []).append((reviewer, at))
+        yield (base + i, reviewer_base + reviewer,
+               words.answer("start_doing"), words.answer("stop_doing"), words.answer("continue_doing"),
+               words.answer("example"), words.answer("additional") if rng.random() < ADDITIONAL_SHARE else None, at)
+
+
+def summary_rows(org: dict, base: int, cycle_base: int, rng: random.Random, words: Words, submitted_by_cycle: dict):
+    users = org["users"]
+    number = 0
+    for cycle in sorted(submitted_by_cycle):
+        submissions = submitted_by_cycle[cycle]
+        if len(submissions) < 2 or rng.random() >= SUMMARY_SHARE:
+            continue
+        updated = min(max(at for _, at in submissions) + timedelta(hours=rng.uniform(0.1, 48)), org["end"])
+        finalised = rng.random() < FINALISED_SHARE
+        finalised_at = min(updated + timedelta(days=rng.uniform(0, 10)), org["end"]) if finalised else None
+        content = "\n\n".join(
+            f"## {heading}\n{words.sentence(opener, words.count(45, 0.4))}"
+            for heading, opener in (("Strengths", "Reviewers value"), ("Growth Areas", "Several reviewers suggest"),
+                                    ("Key Examples", "One reviewer described"), ("Suggested Focus", "Focus on"))
+        )
+        top = max((org["reviewers"][r] for r, _ in submissions), key=lambda r: calculate_weight(r[2], r[3]))
+        explanation = (
+            "This summary weights feedback based on reviewer relationship (manager feedback weighted highest) "
+            "and collaboration frequency (weekly interactions weighted highest). "
+            f"{users[top[1]][0]}'s feedback as a {RELATIONSHIP_LABELS[top[2]].lower()} with "
+            f"{top[3]} interaction carried the most weight."
+        )
+        yield (base + number, cycle_base + cycle, content, explanation, finalised, finalised_at, updated, 1)
+        number += 1
+
+
+# Tables in load order: columns COPY fills, and the sequence behind the id
+TABLES = {
+    "users": ("id, email, name, is_demo, created_at", "users_id_seq"),
+    "feedback_cycles": ("id, subject_user_id, created_by_user_id, manager_user_id, title, created_at",
+                        "feedback_cycles_id_seq"),
+    "reviewers": ("id, cycle_id, name, email, relationship, frequency, created_at", "reviewers_id_seq"),
+    "reviews": ("id, reviewer_id, start_doing, stop_doing, continue_doing, example, additional, submitted_at",
+                "reviews_id_seq"),
+    "summaries": ("id, cycle_id, content, weighting_explanation, finalised, finalised_at, updated_at, version",
+                  "summaries_id_seq"),
+}
+
+# Each generated summary is its own first (AI) version
+SUMMARY_VERSIONS_SQL = """
+INSERT INTO summary_versions (cycle_id, version, source, content, weighting_explanation, created_at)
+SELECT cycle_id, version, 'ai', content, weighting_explanation, updated_at FROM summaries WHERE id >= %s
+"""
+
+# A previous run's rows, children first
+DELETE_SYNTHETIC_SQL = """
+CREATE TEMP TABLE synthetic_cycles ON COMMIT DROP AS
+    SELECT fc.id FROM feedback_cycles fc JOIN users u ON u.id = fc.subject_user_id WHERE u.email LIKE %(pattern)s;
+DELETE FROM reviews WHERE reviewer_id IN (SELECT id FROM reviewers WHERE cycle_id IN (SELECT id FROM synthetic_cycles));
+DELETE FROM reviewers WHERE cycle_id IN (SELECT id FROM synthetic_cycles);
+DELETE FROM summary_versions WHERE cycle_id IN (SELECT id FROM synthetic_cycles);
+DELETE FROM summaries WHERE cycle_id IN (SELECT id FROM synthetic_cycles);
+DELETE FROM feedback_cycles WHERE id IN (SELECT id FROM synthetic_cycles);
+DELETE FROM analytics_manager WHERE manager_user_id IN (SELECT id FROM users WHERE email LIKE %(pattern)s);
+DELETE FROM users WHERE email LIKE %(pattern)s;
+"""
+
+
+def copy_table(cur, table: str, rows) -> int:
+    columns, _ = TABLES[table]
+    start = time.perf_counter()
+    source = CopySource(rows)
+    cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", source, size=COPY_READ_SIZE)
+    elapsed = time.perf_counter() - start
+    print(f"  {table:<17} {source.count:>9,} rows in {elapsed:6.1f}s ({source.count / max(elapsed, 1e-9):,.0f}/s)")
+    return source.count
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    org = build_org(args, rng)
+    print(f"Built org (seed {args.seed}) in {time.perf_counter() - start:.1f}s")
+
+    conn = get_connection()
+    cur = conn.cursor()
+    pattern = f"%@{EMAIL_DOMAIN}"
+    cur.execute("SELECT count(*) AS existing FROM users WHERE email LIKE %s", (pattern,))
+    if cur.fetchone()["existing"]:
+        if not args.replace:
+            raise SystemExit(f"Synthetic data already loaded (users @{EMAIL_DOMAIN}); pass --replace to regenerate it")
+        cur.execute(DELETE_SYNTHETIC_SQL, {"pattern": pattern})
+        print("✓ Removed the previous synthetic org")
+
+    # Reserve id ranges: the structure is then identical for a seed, only offset
+    bases = {}
+    for table in TABLES:
+        cur.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(f"SELECT COALESCE(max(id), 0) + 1 AS base FROM {table}")
+        bases[table] = cur.fetchone()["base"]
+
+    words = Words(rng)
+    submitted_by_cycle = {}
+    print("Loading:")
+    copy_table(cur, "users", user_rows(org, bases["users"]))
+    copy_table(cur, "feedback_cycles", cycle_rows(org, bases["feedback_cycles"], bases["users"]))
+    copy_table(cur, "reviewers", reviewer_rows(org, bases["reviewers"], bases["feedback_cycles"]))
+    copy_table(cur, "reviews", review_rows(org, bases["reviews"], bases["reviewers"], rng, words, submitted_by_cycle))
+    copy_table(cur, "summaries", summary_rows(org, bases["summaries"], bases["feedback_cycles"], rng, words,
+                                              submitted_by_cycle))
+    cur.execute(SUMMARY_VERSIONS_SQL, (bases["summaries"],))
+
+    for table, (_, sequence) in TABLES.items():
+        cur.execute(f"SELECT setval('{sequence}', (SELECT max(id) FROM {table}))")
+
+    step = time.perf_counter()
+    analytics.rebuild(cur)
+    conn.commit()
+    print(f"✓ Rebuilt analytics in {time.perf_counter() - step:.1f}s")
+
+    # Fresh statistics, so the planner sees the new row counts straight away
+    conn.autocommit = True
+    for table in (*TABLES, "summary_versions"):
+        cur.execute(f"ANALYZE {table}")
+    cur.close()
+    conn.close()
+    print(f"\n✅ Synthetic org loaded in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a synthetic organisation for scale testing")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--cycles", type=int, default=50_000)
+    parser.add_argument("--reviewers", type=int, default=300_000)
+    parser.add_argument("--reviews", type=int, default=200_000)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all four counts")
+    parser.add_argument("--days", type=int, default=730, help="Span of history before --end-date")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.fromisoformat(DEFAULT_END_DATE))
+    parser.add_argument("--seed", type=int, default=360)
+    parser.add_argument("--replace", action="store_true", help="Remove a previous synthetic org first")
+    args = parser.parse_args()
+
+    for name in ("users", "cycles", "reviewers", "reviews"):
+        setattr(args, name, max(1, int(getattr(args, name) * args.scale)))
+    if args.users < 2:
+        parser.error("--users must be at least 2")
+    if args.reviewers < args.cycles:
+        parser.error("--reviewers must be at least --cycles (every cycle invites someone)")
+    if args.reviews > args.reviewers:
+        parser.error("--reviews cannot exceed --reviewers (one review per reviewer)")
+
+    try:
+        generate(args)
+    except Exception as e:
+        print(f"❌ Error generating synthetic org: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
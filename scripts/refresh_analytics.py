@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Recompute the org-wide analytics aggregates from the base tables.
+
+The aggregates are kept up to date as reviews come in; run this on a
+schedule (e.g. nightly cron) to fold in anything changed outside the app,
+such as manual data fixes or deletions.
+
+Usage:
+    python scripts/refresh_analytics.py
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.database import get_connection
+from app.services import analytics
+
+
+def refresh_analytics():
+    conn = get_connection()
+    cur = conn.cursor()
+
+    start = time.perf_counter()
+    analytics.rebuild(cur)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+
+    cur.execute("SELECT count(*) AS rows FROM analytics_relationship_monthly")
+    months = cur.fetchone()["rows"]
+    cur.execute("SELECT count(*) AS rows FROM analytics_manager")
+    managers = cur.fetchone()["rows"]
+    cur.close()
+    conn.close()
+
+    print(f"✓ Rebuilt analytics in {elapsed:.2f}s ({months} month/relationship rows, {managers} managers)")
+
+
+if __name__ == "__main__":
+    try:
+        refresh_analytics()
+    except Exception as e:
+        print(f"❌ Error refreshing analytics: {e}")
+        sys.exit(1)
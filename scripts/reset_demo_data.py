@@ -11,13 +11,14 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app.database import get_connection
+from app.services import analytics
 
 
 def reset_demo_data():
     """
     Reset demo accounts by:
     1. Deleting all reviews for demo reviewers
-    2. Deleting all summaries for demo cycles
+    2. Deleting all summaries (and their version history) for demo cycles
     3. Keeping users, cycles, and reviewers (tokens still work)
     """
     conn = get_connection()
@@ -83,6 +84,13 @@ def reset_demo_data():
         )
         print(f"✓ Deleted {summary_count} summaries")
 
+    cur.execute(
+        "DELETE FROM summary_versions WHERE cycle_id = ANY(%s)",
+        (demo_cycle_ids,)
+    )
+    if cur.rowcount > 0:
+        print(f"✓ Deleted {cur.rowcount} summary versions")
+
     # Fix manager_user_id on demo cycles if not set
     # (ensures Sam Taylor is set as manager for Alex Chen's cycle)
     cur.execute("""
@@ -94,6 +102,10 @@ def reset_demo_data():
     if cur.rowcount > 0:
         print(f"✓ Fixed manager_user_id on {cur.rowcount} cycle(s)")
 
+    # Deleted reviews no longer count towards the analytics aggregates
+    analytics.rebuild(cur)
+    print("✓ Rebuilt analytics")
+
     # Commit changes
     conn.commit()
     cur.close()
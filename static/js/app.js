@@ -111,21 +111,69 @@ async function apiFetch(endpoint, options = {}) {
     const response = await fetch(url, config);
 
     if (!response.ok) {
-        const error = await response.json().catch(() => ({ detail: 'An error occurred' }));
-        // Handle FastAPI validation errors (422) which return detail as an array
-        let message = 'An error occurred';
-        if (typeof error.detail === 'string') {
-            message = error.detail;
-        } else if (Array.isArray(error.detail)) {
-            // FastAPI validation error format
-            message = error.detail.map(e => `${e.loc?.join('.')}: ${e.msg}`).join(', ');
-        }
-        throw new Error(message);
+        throw await apiError(response);
     }
 
     return response.json();
 }
 
+// Fetch one page of a paginated list. Returns { items, nextCursor }, where
+// nextCursor (from the X-Next-Cursor header) is null on the last page.
+async function apiFetchPage(endpoint, cursor = null) {
+    let url = `${API_BASE}${endpoint}`;
+    if (cursor) {
+        url += `${url.includes('?') ? '&' : '?'}cursor=${encodeURIComponent(cursor)}`;
+    }
+
+    const response = await fetch(url);
+
+    if (!response.ok) {
+        throw await apiError(response);
+    }
+
+    return {
+        items: await response.json(),
+        nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+}
+
+// Live updates over Server-Sent Events (/api/live/...). Calls onChange,
+// debounced, after any change; EventSource reconnects by itself, and a
+// reconnect or "resync" also triggers onChange since events may have been missed.
+function subscribeLive(path, onChange, delay = 300) {
+    if (!window.EventSource) return null;
+
+    const source = new EventSource(`${API_BASE}/live/${path}`);
+    let timer = null;
+    let connected = false;
+    const schedule = () => {
+        clearTimeout(timer);
+        timer = setTimeout(onChange, delay);
+    };
+
+    source.addEventListener('ready', () => {
+        if (connected) schedule();
+        connected = true;
+    });
+    ['review_submitted', 'reviewer_added', 'cycle_created', 'summary_updated', 'summary_finalised', 'resync']
+        .forEach(type => source.addEventListener(type, schedule));
+
+    return source;
+}
+
+async function apiError(response) {
+    const error = await response.json().catch(() => ({ detail: 'An error occurred' }));
+    // Handle FastAPI validation errors (422) which return detail as an array
+    let message = 'An error occurred';
+    if (typeof error.detail === 'string') {
+        message = error.detail;
+    } else if (Array.isArray(error.detail)) {
+        // FastAPI validation error format
+        message = error.detail.map(e => `${e.loc?.join('.')}: ${e.msg}`).join(', ');
+    }
+    return new Error(message);
+}
+
 function showMessage(container, message, type = 'info') {
     const messageEl = document.createElement('div');
     messageEl.className = `message ${type}`;
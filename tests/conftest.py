@@ -0,0 +1,109 @@
+"""Shared fixtures: a fake Anthropic/OpenAI server on loopback, and fast resilience settings."""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+# Read at import time by app.services.resilience and ai_governor, so set first
+os.environ.update({
+    "ANTHROPIC_API_KEY": "test-key",
+    "AI_RETRY_BASE_DELAY": "0.01",
+    "AI_RETRY_MAX_DELAY": "0.05",
+    "AI_BREAKER_THRESHOLD": "3",
+    "AI_BREAKER_RESET": "0.5",
+    "AI_HEDGE_ENABLED": "1",
+    "AI_HEDGE_DEFAULT_DELAY": "0.2",
+    # One Whisper call at a time, so a hedged backup has to queue behind the primary;
+    # Claude calls are limited only by what a test sends
+    "AI_GOVERNOR_LIMITS": '{"openai:whisper-1": {"rpm": 10000, "concurrency": 1}, '
+                          '"anthropic:claude-test": {"rpm": 10000, "tpm": null, "concurrency": 32}}',
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from app.services import ai_governor, providers, resilience
+
+
+class FakeProvider:
+    """
+    Scripted stand-in for the Anthropic messages and Whisper endpoints.
+
+    Each path answers with its scripted (status, delay) responses in order,
+    then keeps repeating the last one; unscripted paths answer 200 at once.
+    `peak` is the most requests that were in progress at the same time.
+    """
+
+    def __init__(self):
+        self.scripts = {}
+        self.calls = {}
+        self.peak = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.app = Starlette(routes=[
+            Route("/v1/messages", self.messages, methods=["POST"]),
+            Route("/v1/audio/transcriptions", self.transcriptions, methods=["POST"]),
+        ])
+
+    def script(self, path: str, *responses: tuple):
+        self.scripts[path] = list(responses)
+
+    async def _next(self, path: str) -> int:
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+            script = self.scripts.get(path) or [(200, 0)]
+            status, delay = script.pop(0) if len(script) > 1 else script[0]
+            self._in_flight += 1
+            self.peak = max(self.peak, self._in_flight)
+        await asyncio.sleep(delay)
+        with self._lock:
+            self._in_flight -= 1
+        return status
+
+    async def messages(self, request):
+        status = await self._next("/v1/messages")
+        if status != 200:
+            return JSONResponse({"type": "error", "error": {"type": "api_error", "message": "scripted"}}, status)
+        body = await request.json()
+        return JSONResponse({
+            "id": "msg_test", "type": "message", "role": "assistant", "model": body["model"],
+            "content": [{"type": "text", "text": "A summary"}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 3},
+        })
+
+    async def transcriptions(self, request):
+        status = await self._next("/v1/audio/transcriptions")
+        return PlainTextResponse("A transcript of the recording" if status == 200 else "scripted", status)
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """A FakeProvider served on a free loopback port, with providers pointed at it."""
+    fake = FakeProvider()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    host, port = sock.getsockname()
+    server = uvicorn.Server(uvicorn.Config(fake.app, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", f"http://{host}:{port}")
+    monkeypatch.setattr(providers, "WHISPER_URL", f"http://{host}:{port}/v1/audio/transcriptions")
+    # Fresh breakers, latency history and governors for every test
+    resilience._breakers.clear()
+    resilience._latencies.clear()
+    ai_governor._governors.clear()
+    yield fake
+
+    server.should_exit = True
+    thread.join()
@@ -0,0 +1,81 @@
+"""Near-duplicate answer collapsing (app.services.dedup)."""
+from app.services import dedup
+
+NAMES = ["Sam Taylor", "Jordan Lee", "Casey Morgan"]
+WEIGHTS = [1.0, 0.8, 0.56]
+
+AGREED = "Delegate more of the technical design decisions to the senior engineers on the team"
+
+
+def review(name, **answers):
+    return {"reviewer_name": name, **{field: answers.get(field) for field in dedup.FIELDS}}
+
+
+def weight_of(review):
+    return WEIGHTS[NAMES.index(review["reviewer_name"])]
+
+
+def test_shingles_ignore_case_punctuation_and_spacing():
+    grams = dedup.shingles("Ship  smaller PRs, and review them often!")
+
+    assert grams == dedup.shingles("ship smaller prs and review them often")
+    assert "ship smaller prs" in grams and len(grams) == 5
+    # Too short to be worth a reference
+    assert dedup.shingles("Nothing to add") == frozenset()
+
+
+def test_pasted_answers_are_grouped_with_the_heaviest_wording():
+    reviews = [
+        review("Casey Morgan", start_doing=AGREED.lower() + "."),
+        review("Sam Taylor", start_doing=AGREED + "!", stop_doing="Stop booking status meetings late on Friday afternoons"),
+        review("Jordan Lee", continue_doing="Keep running the incident reviews with clear written follow ups"),
+    ]
+
+    groups = dedup.find_duplicates(reviews, weight_of)
+
+    assert len(groups) == 1
+    group = groups[0]
+    assert group["text"] == AGREED + "!"
+    assert group["members"] == [(0, "start_doing"), (1, "start_doing")]
+    assert group["reviewers"] == [0, 1]
+    assert group["weight"] == 1.56
+
+
+def test_one_reviewer_pasting_into_two_fields_counts_once():
+    reviews = [
+        review("Sam Taylor", start_doing=AGREED, additional=AGREED),
+        review("Jordan Lee", stop_doing="Stop booking status meetings late on Friday afternoons"),
+    ]
+
+    groups = dedup.find_duplicates(reviews, weight_of)
+
+    assert [(group["reviewers"], group["weight"]) for group in groups] == [([0], 1.0)]
+    assert dedup.digest(groups, NAMES) == (
+        f'R1. "{AGREED}" (1 reviewer, several answers: Sam Taylor; start, additional; combined weight 1.0)'
+    )
+
+
+def test_short_and_distinct_answers_are_kept():
+    reviews = [
+        review("Sam Taylor", start_doing="Nothing to add", stop_doing="Stop booking status meetings late on Fridays"),
+        review("Jordan Lee", start_doing="Nothing to add", stop_doing="Stop skipping the weekly one to one sessions"),
+    ]
+
+    assert dedup.find_duplicates(reviews, weight_of) == []
+
+
+def test_digest_lists_each_group_once_with_its_reviewers():
+    reviews = [review(name, start_doing=AGREED) for name in NAMES]
+
+    groups = dedup.find_duplicates(reviews, weight_of)
+
+    assert dedup.digest(groups, NAMES) == (
+        f'R1. "{AGREED}" (3 reviewers: Sam Taylor, Jordan Lee, Casey Morgan; start; combined weight 2.36)'
+    )
+    assert dedup.reference(1) == "[R1]"
+
+
+def test_without_numpy_nothing_is_collapsed(monkeypatch):
+    monkeypatch.setattr(dedup, "np", None)
+
+    assert dedup.find_duplicates([review(name, start_doing=AGREED) for name in NAMES], weight_of) == []
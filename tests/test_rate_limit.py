@@ -0,0 +1,20 @@
+"""Sliding-window rate limiting with the in-process backend."""
+from app.rate_limit import LocalBackend
+
+WINDOW = 60
+
+
+def test_rejected_requests_use_no_budget():
+    backend = LocalBackend()
+
+    assert backend.hit([("submit:ip:1", 3), ("submit:subject:a", 1)], WINDOW) is None
+    # Over the subject limit: the IP budget is left alone
+    for _ in range(5):
+        position, retry_after = backend.hit([("submit:ip:1", 3), ("submit:subject:a", 1)], WINDOW)
+        assert position == 1 and retry_after > 0
+
+    assert backend.hit([("submit:ip:1", 3), ("submit:subject:b", 1)], WINDOW) is None
+    assert backend.hit([("submit:ip:1", 3), ("submit:subject:c", 1)], WINDOW) is None
+    assert backend.hit([("submit:ip:1", 3), ("submit:subject:d", 1)], WINDOW)[0] == 0
+    # Rejected by the IP limit, so subject d was not counted either
+    assert backend.hit([("submit:ip:2", 3), ("submit:subject:d", 1)], WINDOW) is None
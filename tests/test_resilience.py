@@ -0,0 +1,129 @@
+"""Retries, circuit breaking and hedging of AI calls, against the fake provider in conftest."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import anthropic
+import pytest
+
+from app.services import ai_governor, providers, resilience
+from app.services.ai_governor import PRIORITY_BACKGROUND
+from app.services.resilience import CircuitOpenError
+
+MODEL = "claude-test"
+MESSAGES = "/v1/messages"
+TRANSCRIPTIONS = "/v1/audio/transcriptions"
+
+
+def create_message(**kwargs):
+    return providers.create_message(model=MODEL, prompt="Summarise this", max_tokens=64, **kwargs)
+
+
+def test_retries_transient_errors_until_success(fake_provider):
+    fake_provider.script(MESSAGES, (503, 0), (529, 0), (200, 0))
+
+    message = create_message(priority=PRIORITY_BACKGROUND)
+
+    assert message.content[0].text == "A summary"
+    assert fake_provider.calls[MESSAGES] == 3
+    assert resilience.breaker_stats()[f"anthropic:{MODEL}"] == {"state": "closed", "consecutive_failures": 0}
+
+
+def test_client_errors_are_not_retried(fake_provider):
+    fake_provider.script(MESSAGES, (400, 0))
+
+    with pytest.raises(anthropic.BadRequestError):
+        create_message()
+
+    assert fake_provider.calls[MESSAGES] == 1
+    assert resilience.breaker_stats()[f"anthropic:{MODEL}"]["state"] == "closed"
+
+
+def test_breaker_opens_then_recovers_through_a_probe(fake_provider):
+    fake_provider.script(MESSAGES, (503, 0))
+
+    # Background calls get 5 attempts, but the breaker opens after 3 failures
+    with pytest.raises(CircuitOpenError):
+        create_message(priority=PRIORITY_BACKGROUND)
+    assert fake_provider.calls[MESSAGES] == 3
+    assert resilience.breaker_stats()[f"anthropic:{MODEL}"]["state"] == "open"
+
+    # Open: rejected without reaching the provider
+    with pytest.raises(CircuitOpenError):
+        create_message()
+    assert fake_provider.calls[MESSAGES] == 3
+
+    # After the reset period one probe is let through, and its success closes the circuit
+    fake_provider.script(MESSAGES, (200, 0))
+    time.sleep(0.6)
+    assert create_message().content[0].text == "A summary"
+    assert fake_provider.calls[MESSAGES] == 4
+    assert resilience.breaker_stats()[f"anthropic:{MODEL}"]["state"] == "closed"
+
+
+def test_failed_probe_reopens_the_circuit(fake_provider):
+    fake_provider.script(MESSAGES, (503, 0))
+    with pytest.raises(CircuitOpenError):
+        create_message(priority=PRIORITY_BACKGROUND)
+
+    time.sleep(0.6)
+    with pytest.raises(CircuitOpenError):
+        create_message(priority=PRIORITY_BACKGROUND)
+
+    # The probe failed (one more call) and the retry was refused
+    assert fake_provider.calls[MESSAGES] == 4
+    assert resilience.breaker_stats()[f"anthropic:{MODEL}"]["state"] == "open"
+
+
+def test_hedged_call_returns_the_faster_backup(fake_provider):
+    fake_provider.script(MESSAGES, (200, 2.0), (200, 0))
+
+    start = time.monotonic()
+    message = create_message(hedge=True)
+
+    assert message.content[0].text == "A summary"
+    assert time.monotonic() - start < 1.5
+    assert fake_provider.calls[MESSAGES] == 2
+
+
+def test_hedged_calls_do_not_queue_behind_each_other(fake_provider, monkeypatch):
+    # More concurrent hedged calls than any fixed thread pool in front of them,
+    # all answered before a backup is due
+    monkeypatch.setattr(resilience, "HEDGE_DEFAULT_DELAY", 5)
+    fake_provider.script(MESSAGES, (200, 1.5))
+
+    with ThreadPoolExecutor(max_workers=12) as callers:
+        messages = list(callers.map(lambda _: create_message(hedge=True), range(12)))
+
+    assert all(message.content[0].text == "A summary" for message in messages)
+    assert fake_provider.calls[MESSAGES] == 12
+    assert fake_provider.peak == 12
+
+
+def test_hedged_async_call_releases_the_backups_governor_slot(fake_provider):
+    # Whisper is limited to one call at a time in conftest: the backup queues
+    # behind the slow primary, and is cancelled once the primary answers
+    fake_provider.script(TRANSCRIPTIONS, (200, 0.5))
+
+    async def transcribe():
+        return await providers.transcribe_audio("a.webm", b"audio", "test-key", hedge=True)
+
+    assert asyncio.run(transcribe()) == "A transcript of the recording"
+
+    governor = ai_governor.get_governor("openai", providers.WHISPER_MODEL)
+    # The cancelled backup's worker thread is admitted, then hands its lease back
+    deadline = time.monotonic() + 2
+    while governor.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert governor.stats()["in_flight"] == 0
+    assert governor.stats()["queue_depth"] == 0
+    assert fake_provider.calls[TRANSCRIPTIONS] == 1
+
+
+def test_async_retries_transient_errors(fake_provider):
+    fake_provider.script(TRANSCRIPTIONS, (502, 0), (200, 0))
+
+    transcript = asyncio.run(providers.transcribe_audio("a.webm", b"audio", "test-key"))
+
+    assert transcript == "A transcript of the recording"
+    assert fake_provider.calls[TRANSCRIPTIONS] == 2
@@ -0,0 +1,85 @@
+"""Local theme extraction (app.services.themes)."""
+import orjson
+
+from app.services import themes
+
+NAMES = ["Sam Taylor", "Jordan Lee", "Casey Morgan"]
+RELATIONSHIPS = ["Manager", "Peer", "Peer"]
+WEIGHTS = [1.0, 0.8, 0.56]
+
+
+def review(name, start="", stop="", cont=""):
+    return {"reviewer_name": name, "start_doing": start, "stop_doing": stop, "continue_doing": cont,
+            "example": None, "additional": None}
+
+
+REVIEWS = [
+    review("Sam Taylor",
+           start="Delegate more technical design decisions to the senior engineers.",
+           cont="Alex writes clear sprint planning documents for everyone."),
+    review("Jordan Lee",
+           start="Delegate technical design decisions to senior engineers more often.",
+           stop="Stop scheduling recurring status meetings late on Friday afternoons."),
+    review("Casey Morgan",
+           cont="Alex keeps writing clear sprint planning documents for the team."),
+]
+
+
+def weight_of(review):
+    return WEIGHTS[NAMES.index(review["reviewer_name"])]
+
+
+def test_points_raised_by_several_reviewers_become_themes():
+    found = themes.extract_themes(REVIEWS, weight_of, exclude=["Alex"])
+
+    assert [theme["reviewers"] for theme in found] == [[0, 1], [0, 2]]
+    delegate, planning = found
+    assert "delegate" in delegate["terms"]
+    assert delegate["weight"] == 1.8
+    assert delegate["fields"] == {"start_doing": 2}
+    assert planning["weight"] == 1.56
+    assert {quote["reviewer"] for quote in planning["quotes"]} == {0, 2}
+    # Raised by one reviewer only
+    assert not any("meeting" in " ".join(theme["terms"]) for theme in found)
+
+
+def test_the_subjects_name_does_not_make_sentences_alike():
+    alike = [review(name, cont=f"Alex {text}.") for name, text in zip(NAMES, (
+        "answers pager alerts quickly overnight",
+        "mentors new hires through onboarding",
+        "documents database migrations thoroughly",
+    ))]
+
+    assert themes.extract_themes(alike, weight_of, exclude=["Alex"]) == []
+
+
+def test_stored_themes_never_name_reviewers():
+    found = themes.extract_themes(REVIEWS, weight_of, exclude=["Alex"])
+
+    stored = themes.stored(found, RELATIONSHIPS)
+
+    assert stored[0]["reviewer_count"] == 2
+    assert stored[0]["relationships"] == {"Manager": 1, "Peer": 1}
+    assert all(set(quote) == {"field", "text"} for theme in stored for quote in theme["quotes"])
+    text = orjson.dumps(stored).decode()
+    for name in NAMES:
+        assert name not in text
+        assert name.split()[0] not in text
+
+
+def test_digest_names_reviewers_and_cites_answers_already_in_the_prompt():
+    found = themes.extract_themes(REVIEWS, weight_of, exclude=["Alex"])
+
+    text = themes.digest(found, NAMES, cited={(0, "start_doing"): "[R1]", (1, "start_doing"): "[R1]"})
+
+    first = text.splitlines()[0]
+    assert first.startswith("1. **") and "weight 1.8; Sam Taylor, Jordan Lee; start x2" in first
+    # Both quotes of theme 1 were cited: the reference appears once instead
+    assert text.count("[R1]") == 1
+    assert '"Alex keeps writing clear sprint planning documents for the team." (Casey Morgan, continue)' in text
+
+
+def test_without_numpy_there_are_no_themes(monkeypatch):
+    monkeypatch.setattr(themes, "np", None)
+
+    assert themes.extract_themes(REVIEWS, weight_of) == []